@@ -0,0 +1,277 @@
+#----------------------------------------------------------------------------#
+# JSON API, version 1.
+#
+# Mirrors the HTML pages on the same queries, without template rendering.
+# List endpoints are cursor paginated: pass the returned `next_cursor` as
+# ?after= to get the next page. ?fields=id,name keeps only the listed keys
+# of each item, and ?genre= restricts venue and artist lists and searches
+# to one genre. /venues/<id>/free-slots lists when a venue can be booked.
+#----------------------------------------------------------------------------#
+import datetime as dt
+import json
+from flask import Blueprint, Response, current_app, request, stream_with_context
+from app_bootstrapping import db
+from booking import free_slots
+from bulk import FORMATS, KINDS, delete_records, export_rows, guess_format, import_rows, read_rows
+from models import Artist, Venue, SHOW_DURATION
+from queries import entity_page, venue_detail, artist_detail, show_listing
+from search import search_entities
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+def _default(value):
+    if isinstance(value, (dt.datetime, dt.date)):
+        return value.isoformat()
+    raise TypeError('%r is not JSON serializable' % (value,))
+
+
+def dumps(payload):
+    """Compact JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(payload, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def json_response(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+def error_response(status, message):
+    return json_response({'error': message}, status=status)
+
+
+def sparse(items):
+    # Keep only the keys requested with ?fields=, if any.
+    fields = request.args.get('fields')
+    if not fields:
+        return items
+    keep = set(field.strip() for field in fields.split(','))
+    return [{key: value for key, value in item.items() if key in keep} for item in items]
+
+
+def page_size():
+    default = current_app.config['API_PAGE_SIZE']
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        limit = default
+    return max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+
+
+def listing(model):
+    after = request.args.get('after', type=int)
+    rows, next_cursor = entity_page(model, after=after, limit=page_size(), genre=request.args.get('genre'))
+    data = [{'id': row.id,
+             'name': row.name,
+             'city': row.city,
+             'state': row.state,
+             'num_upcoming_shows': row.num_upcoming_shows,
+             } for row in rows]
+    return json_response({'data': sparse(data), 'next_cursor': next_cursor})
+
+
+def venue_show(show):
+    # A show listed on its venue: who plays, and when.
+    return {'artist_id': show.artist.id,
+            'artist_name': show.artist.name,
+            'artist_image_link': show.artist.image_link,
+            'start_time': show.start_time,
+            }
+
+
+def artist_show(show):
+    # A show listed on its artist: where it plays, and when.
+    return {'venue_id': show.venue.id,
+            'venue_name': show.venue.name,
+            'venue_image_link': show.venue.image_link,
+            'start_time': show.start_time,
+            }
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@api.route('/venues')
+def venues():
+    return listing(Venue)
+
+
+@api.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    detail = venue_detail(venue_id)
+    if detail is None:
+        return error_response(404, 'Venue %d not found' % venue_id)
+    the_venue, past_shows, next_shows = detail
+    data = {
+        'id': the_venue.id,
+        'name': the_venue.name,
+        'genres': the_venue.genre_names,
+        'address': the_venue.address,
+        'city': the_venue.city,
+        'state': the_venue.state,
+        'phone': the_venue.phone,
+        'website': the_venue.website_link,
+        'facebook_link': the_venue.facebook_link,
+        'seeking_talent': the_venue.seeking_talent,
+        'seeking_description': the_venue.seeking_description,
+        'image_link': the_venue.image_link,
+        'past_shows': [venue_show(show) for show in past_shows],
+        'upcoming_shows': [venue_show(show) for show in next_shows],
+        'past_shows_count': len(past_shows),
+        'upcoming_shows_count': len(next_shows),
+    }
+    return json_response({'data': sparse([data])[0]})
+
+
+def _datetime_arg(name, default):
+    # Show times are stored without a UTC offset, so none is accepted here.
+    value = request.args.get(name)
+    if not value:
+        return default
+    value = dt.datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        raise ValueError('%s should have no UTC offset' % name)
+    return value
+
+
+@api.route('/venues/<int:venue_id>/free-slots')
+def venue_free_slots(venue_id):
+    # Free periods of a venue between ?start= and ?end= (ISO 8601, default:
+    # the next two weeks) at least ?min_minutes= long (default: one show).
+    if db.session.query(Venue.id).filter(Venue.id == venue_id).first() is None:
+        return error_response(404, 'Venue %d not found' % venue_id)
+    try:
+        start = _datetime_arg('start', dt.datetime.today().replace(minute=0, second=0, microsecond=0))
+        end = _datetime_arg('end', start + dt.timedelta(days=14))
+        min_length = dt.timedelta(minutes=int(request.args['min_minutes'])) \
+            if 'min_minutes' in request.args else SHOW_DURATION
+    except ValueError as exc:
+        return error_response(400, str(exc))
+    max_days = current_app.config['FREE_SLOTS_MAX_DAYS']
+    if not start < end <= start + dt.timedelta(days=max_days):
+        return error_response(400, 'end should be after start, by at most %d days' % max_days)
+    data = [{'start_time': slot_start, 'end_time': slot_end}
+            for slot_start, slot_end in free_slots(venue_id, start, end, min_length)]
+    return json_response({'data': data})
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@api.route('/artists')
+def artists():
+    return listing(Artist)
+
+
+@api.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    detail = artist_detail(artist_id)
+    if detail is None:
+        return error_response(404, 'Artist %d not found' % artist_id)
+    the_artist, past_shows, next_shows = detail
+    data = {
+        'id': the_artist.id,
+        'name': the_artist.name,
+        'genres': the_artist.genre_names,
+        'city': the_artist.city,
+        'state': the_artist.state,
+        'phone': the_artist.phone,
+        'website': the_artist.website_link,
+        'facebook_link': the_artist.facebook_link,
+        'seeking_venue': the_artist.seeking_venue,
+        'seeking_description': the_artist.seeking_description,
+        'image_link': the_artist.image_link,
+        'available_start_time': the_artist.available_start_time,
+        'available_end_time': the_artist.available_end_time,
+        'past_shows': [artist_show(show) for show in past_shows],
+        'upcoming_shows': [artist_show(show) for show in next_shows],
+        'past_shows_count': len(past_shows),
+        'upcoming_shows_count': len(next_shows),
+    }
+    return json_response({'data': sparse([data])[0]})
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@api.route('/shows')
+def shows():
+    rows, next_cursor = show_listing(after=request.args.get('after'), limit=page_size())
+    data = [{'id': row.id,
+             'venue_id': row.venue_id,
+             'venue_name': row.venue_name,
+             'artist_id': row.artist_id,
+             'artist_name': row.artist_name,
+             'artist_image_link': row.artist_image_link,
+             'start_time': row.start_time,
+             } for row in rows]
+    return json_response({'data': sparse(data), 'next_cursor': next_cursor})
+
+
+#  Search
+#  ----------------------------------------------------------------
+
+@api.route('/search/venues')
+def search_venues():
+    results = search_entities(Venue, request.args.get('q', ''), genre=request.args.get('genre'))
+    results['data'] = sparse(results['data'])
+    return json_response(results)
+
+
+@api.route('/search/artists')
+def search_artists():
+    results = search_entities(Artist, request.args.get('q', ''), genre=request.args.get('genre'))
+    results['data'] = sparse(results['data'])
+    return json_response(results)
+
+
+#  Bulk import, export and delete
+#  ----------------------------------------------------------------
+
+@api.route('/<kind>/import', methods=['POST'])
+def import_records(kind):
+    # The file is a multipart upload named 'file', or the raw request body
+    # with a text/csv or application/x-ndjson content type.
+    if kind not in KINDS:
+        return error_response(404, 'Cannot import %s' % kind)
+    upload = request.files.get('file')
+    if upload is not None:
+        stream, fmt = upload.stream, guess_format(upload.filename)
+    else:
+        stream, fmt = request.stream, 'ndjson' if 'json' in (request.mimetype or '') else 'csv'
+    fmt = request.args.get('format', fmt)
+    if fmt not in FORMATS:
+        return error_response(400, 'Unknown format %s' % fmt)
+    report = import_rows(kind, read_rows(stream, fmt))
+    return json_response(report.as_dict(), status=200 if not report.failed else 422)
+
+
+@api.route('/<kind>/delete', methods=['POST'])
+def delete_records_endpoint(kind):
+    # Takes {"ids": [...]}; deleting a venue or artist deletes its shows too.
+    if kind not in KINDS:
+        return error_response(404, 'Cannot delete %s' % kind)
+    payload = request.get_json(silent=True)
+    ids = payload.get('ids') if isinstance(payload, dict) else None
+    if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return error_response(400, 'Expected a JSON body like {"ids": [1, 2, 3]}')
+    return json_response({'deleted': delete_records(kind, ids)})
+
+
+@api.route('/<kind>/export')
+def export_records(kind):
+    if kind not in KINDS:
+        return error_response(404, 'Cannot export %s' % kind)
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return error_response(400, 'Unknown format %s' % fmt)
+    response = Response(stream_with_context(export_rows(kind, fmt)),
+                        mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson')
+    response.headers['Content-Disposition'] = 'attachment; filename=%s.%s' % (kind, fmt)
+    return response
@@ -1,10 +1,91 @@
+#----------------------------------------------------------------------------#
+# Application factory.
+#
+# Extensions are created unbound here, so that modules can import `db`
+# without building an application; create_app() builds one:
+#
+#   app = create_app('production')
+#
+# app.py builds the default one for `flask` and `python app.py`; WSGI
+# servers can call the factory themselves, e.g.
+# gunicorn --preload 'app_bootstrapping:create_app()'.
+#----------------------------------------------------------------------------#
+import logging
+import os
+import weakref
+from logging import Formatter, FileHandler
 from flask import Flask
+from flask_migrate import Migrate
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
-app = Flask(__name__)
-moment = Moment(app)
-from flask_migrate import Migrate
+from config import get_config
+
+db = SQLAlchemy()
+migrate = Migrate()
+moment = Moment()
+
+# Applications of this process, whose connections a forked child must not reuse.
+_apps = weakref.WeakSet()
+
+
+def create_app(config=None):
+    """The Fyyur application, configured by `config`.
+
+    `config` is a config class, a name of config.py ('development',
+    'testing', 'production'), or None for FYYUR_CONFIG. The views and
+    their modules are imported here, on the first call, rather than when
+    this module is imported.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config if isinstance(config, type) else get_config(config))
+    if not app.config['SECRET_KEY']:
+        raise RuntimeError('SECRET_KEY must be set in the environment for this configuration.')
+    db.init_app(app)
+    migrate.init_app(app, db)
+    moment.init_app(app)
+
+    import assets
+    import bulk
+    import cache
+    import compression
+    import jobs
+    import metrics
+    import profiling
+    import seeding
+    import show_counts
+    from api import api
+    from artists import artist_pages
+    from pages import pages
+    from shows import show_pages
+    from venues import venue_pages
+
+    # metrics first: its after_request hook runs last, timing the others too.
+    for module in (metrics, cache, jobs, profiling, compression, assets, bulk, seeding, show_counts):
+        module.init_app(app)
+    for blueprint in (pages, venue_pages, artist_pages, show_pages, api):
+        app.register_blueprint(blueprint)
+
+    if not app.debug and not app.testing:
+        file_handler = FileHandler('error.log')
+        file_handler.setFormatter(
+            Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+        )
+        app.logger.setLevel(logging.INFO)
+        file_handler.setLevel(logging.INFO)
+        app.logger.addHandler(file_handler)
+        app.logger.info('errors')
+
+    _apps.add(app)
+    return app
+
+
+def _after_fork_in_child():
+    # A forked worker, e.g. of gunicorn --preload, inherits the connection
+    # pools of its parent: drop them, without closing the parent's sockets,
+    # so that the worker opens connections of its own.
+    for app in list(_apps):
+        with app.app_context():
+            db.engine.dispose(close=False)
+
 
-app.config.from_object('config')
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
\ No newline at end of file
+os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,310 @@
+#----------------------------------------------------------------------------#
+# Artist pages.
+#----------------------------------------------------------------------------#
+import sys
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
+from app_bootstrapping import db
+from forms import ArtistForm
+from models import Artist
+from queries import artist_detail, artist_listing, table_state, entity_state, genre_ids, genres_named
+from conditional import conditional_get
+from cache import view_cache
+from search import search_entities
+from pages import enqueue_follow_ups
+
+artist_pages = Blueprint('artists', __name__)
+
+#  Artists
+#  ----------------------------------------------------------------
+@artist_pages.route('/artists')
+@conditional_get(lambda: table_state(Artist))
+def artists():
+    genre = request.args.get('genre')
+    data = view_cache.get_or_set('artists:%s' % genre, lambda: artist_listing(genre=genre))
+
+    return render_template('pages/artists.html', artists=data, genre=genre, genres=list(genre_ids()))
+
+@artist_pages.route('/artists/search', methods=['POST'])
+def search_artists():
+    # Implement search on artists with partial string search. Ensure it is case-insensitive.
+    # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+    # search for "band" should return "The Wild Sax Band".
+    search_term = request.form.get('search_term', '')
+    response = search_entities(Artist, search_term, genre=request.args.get('genre'))
+    return render_template('pages/search_artists.html', results=response, search_term=search_term)
+
+@artist_pages.route('/artists/<int:artist_id>')
+@conditional_get(lambda artist_id: entity_state(Artist, artist_id))
+def show_artist(artist_id):
+    # shows the artist page with the given artist_id
+    error = False
+    data = None
+    try:
+        the_artist, past_shows, next_shows = artist_detail(artist_id)
+        data = {
+            "id": the_artist.id,
+            "name": the_artist.name,
+            "genres": the_artist.genre_names,
+            "city": the_artist.city,
+            "state": the_artist.state,
+            "phone": the_artist.phone,
+            "website": the_artist.website_link,
+            "facebook_link": the_artist.facebook_link,
+            "seeking_venue": the_artist.seeking_venue,
+            "image_link": the_artist.image_link,
+            "available_start_time": the_artist.available_start_time,
+            "available_end_time": the_artist.available_end_time,
+            "past_shows": [{'venue_id': p_sh.venue.id,
+                            'venue_name': p_sh.venue.name,
+                            'venue_image_link': p_sh.venue.image_link,
+                            'start_time': p_sh.start_time,
+                            } for p_sh in past_shows],
+
+            'upcoming_shows': [{'venue_id': n_sh.venue.id,
+                                'venue_name': n_sh.venue.name,
+                                'venue_image_link': n_sh.venue.image_link,
+                                'start_time': n_sh.start_time,
+                                } for n_sh in next_shows],
+            'past_shows_count': len(past_shows),
+            'upcoming_shows_count': len(next_shows),
+        }
+    except:
+        error = True
+        db.session.rollback()
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+        if error:
+            flash('An error occurred: Error during db reading. Artist could not be displayed.', 'error')
+            return redirect(url_for('.artists'))
+            # abort(404)
+        else:
+            flash('Artist ' + the_artist.name + ' was successfully displayed!')
+            # return redirect(url_for('shows.shows'))
+            # return render_template('pages/home.html')
+            # return redirect(url_for('pages.index'))
+            return render_template('pages/show_artist.html', artist=data)
+    # data1={
+    #     "id": 4,
+    #     "name": "Guns N Petals",
+    #     "genres": ["Rock n Roll"],
+    #     "city": "San Francisco",
+    #     "state": "CA",
+    #     "phone": "326-123-5000",
+    #     "website": "https://www.gunsnpetalsband.com",
+    #     "facebook_link": "https://www.facebook.com/GunsNPetals",
+    #     "seeking_venue": True,
+    #     "seeking_description": "Looking for shows to perform at in the San Francisco Bay Area!",
+    #     "image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
+    #     "past_shows": [{
+    #         "venue_id": 1,
+    #         "venue_name": "The Musical Hop",
+    #         "venue_image_link": "https://images.unsplash.com/photo-1543900694-133f37abaaa5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=400&q=60",
+    #         "start_time": "2019-05-21T21:30:00.000Z"
+    #     }],
+    #     "upcoming_shows": [],
+    #     "past_shows_count": 1,
+    #     "upcoming_shows_count": 0,
+    # }
+
+#  Update
+#  ----------------------------------------------------------------
+@artist_pages.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+    error=False
+    artist = None
+    form = None
+    try:
+        the_artist = Artist.query.get(artist_id)
+        artist={
+            "id": the_artist.id,
+            "name": the_artist.name,
+            "genres": the_artist.genre_names,
+            "city": the_artist.city,
+            "state": the_artist.state,
+            "phone": the_artist.phone,
+            "website": the_artist.website_link,
+            "facebook_link": the_artist.facebook_link,
+            "seeking_venue": the_artist.seeking_venue,
+            "seeking_description": the_artist.seeking_description,
+            "image_link": the_artist.image_link,
+        }
+        form = ArtistForm(obj=the_artist)
+        form.genres.data = the_artist.genre_names
+    except:
+        error = True
+        db.session.rollback()
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+        if error:
+            flash('An error occurred: Error during db reading. Artist could not be displayed.', 'error')
+            return redirect(url_for('.artists'))
+            # abort(404)
+        else:
+            flash('Artist ' + the_artist.name + ' was successfully displayed!')
+            # return redirect(url_for('shows.shows'))
+            # return render_template('pages/home.html')
+            # return redirect(url_for('pages.index'))
+            return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+@artist_pages.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    # Take values from the form submitted, and update existing
+    # artist record with ID <artist_id> using the new attributes
+    error = False
+    form = ArtistForm(formdata=request.form)
+    bad_availability = False
+    try:
+        the_artist = Artist.query.get(artist_id)
+        artist = {
+            "id": the_artist.id,
+            "name": the_artist.name,
+            "genres": the_artist.genre_names,
+            "city": the_artist.city,
+            "state": the_artist.state,
+            "phone": the_artist.phone,
+            "website": the_artist.website_link,
+            "facebook_link": the_artist.facebook_link,
+            "seeking_venue": the_artist.seeking_venue,
+            "seeking_description": the_artist.seeking_description,
+            "image_link": the_artist.image_link,
+        }
+        if form.validate_on_submit():
+            the_artist.name = form.name.data
+            the_artist.genres = genres_named(form.genres.data)
+            the_artist.city = form.city.data
+            the_artist.state = form.state.data
+            the_artist.phone = form.phone.data
+            the_artist.website_link = form.website_link.data
+            the_artist.facebook_link = form.facebook_link.data
+            the_artist.seeking_venue = form.seeking_venue.data
+            the_artist.seeking_description = form.seeking_description.data
+            the_artist.image_link = form.image_link.data
+            the_artist.available_start_time = form.available_start_time.data
+            the_artist.available_end_time = form.available_end_time.data
+            if the_artist.is_period_validity_incorrect():
+                bad_availability = True
+                raise Exception('Bad availability format')
+            db.session.commit()
+        else:
+            flash('An error occurred: Your form is invalid. Artist ' +
+                  the_artist.name + ' could not be updated.', 'error')
+            return render_template('forms/edit_artist.html', form=form, artist=artist)
+            # return redirect(url_for('.edit_artist', artist_id=artist_id))
+    except:
+        error = True
+        db.session.rollback()
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+        if error:
+            flash('An error occurred: Error during db updating. Artist could not be updated.', 'error')
+            if bad_availability:
+                flash('An error occurred: The availability period is not correcty set', 'error')
+            return redirect(url_for('.artists'))
+            # abort(404)
+        else:
+            enqueue_follow_ups('artist', artist_id, form.image_link.data)
+            flash('Artist ' + form.name.data + ' was successfully updated!')
+            # return redirect(url_for('shows.shows'))
+            # return render_template('pages/home.html')
+            # return redirect(url_for('pages.index'))
+            return redirect(url_for('.show_artist', artist_id=artist_id))
+
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@artist_pages.route('/artists/create', methods=['GET'])
+def create_artist_form():
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+@artist_pages.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    # called upon submitting the new artist listing form
+    # Insert form data as a new Artist record in the db, instead
+    # modify data to be the data object returned from db insertion
+    form = ArtistForm()
+    bad_availability = False
+    if form.validate_on_submit():
+        # on successful db insert, flash success
+        error = False
+        artist_data = {}
+        try:
+            new_artist = Artist(name=form.name.data, city=form.city.data, state=form.state.data,
+                                phone=form.phone.data, genres=genres_named(form.genres.data),
+                                facebook_link=form.facebook_link.data, image_link=form.image_link.data,
+                                website_link=form.website_link.data, seeking_venue=form.seeking_venue.data,
+                                seeking_description=form.seeking_description.data,
+                                available_start_time=form.available_start_time.data,
+                                available_end_time=form.available_end_time.data,)
+
+            ## Should put this in ArtistForm's validate method
+            if new_artist.is_period_validity_incorrect():
+                bad_availability = True
+                raise Exception('Bad availabity format')
+            ############
+
+
+            db.session.add(new_artist)
+            db.session.commit()
+            artist_data['name'] = new_artist.name
+            artist_data['id'] = new_artist.id
+        except:
+            error = True
+            db.session.rollback()
+            print(sys.exc_info())
+        finally:
+            db.session.close()
+            if error:
+                flash('An error occurred: Error during db insertion. Artist '
+                      + form.name.data + ' could not be listed.', 'error')
+
+                if bad_availability:
+                    flash('An error occurred: The availability period is not correcty set', 'error')
+
+                return render_template('forms/new_artist.html', form=form)
+                # return redirect(url_for('.artists'))
+                # abort(400)
+            else:
+                enqueue_follow_ups('artist', artist_data['id'], form.image_link.data)
+                flash('Artist ' + artist_data['name'] + ' was successfully listed!')
+                # return redirect(url_for('.artists'))
+                # return render_template('pages/home.html')
+                return redirect(url_for('pages.index'))
+    else:
+        # On unsuccessful db insert, flash an error instead.
+        # e.g., flash('An error occurred. Artist ' + data.name + ' could not be listed.')
+        # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+        flash('An error occurred: Your form is invalid. Artist ' +
+              form.name.data + ' could not be listed.', 'error')
+        return render_template('forms/new_artist.html', form=form)
+
+@artist_pages.route('/artists/<artist_id>', methods=['DELETE'])
+def delete_artist(artist_id):
+    # Like delete_venue: its shows and genre links are deleted by the
+    # database, not loaded.
+    artist = Artist.query.get_or_404(artist_id)
+    error = False
+    artist_data = {}
+    try:
+        artist_data['name'] = artist.name
+        artist_data['js_redirect'] = url_for('pages.index')
+        db.session.delete(artist)
+        db.session.commit()
+    except:
+        error = True
+        db.session.rollback()
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+        if error:
+            flash('An error occurred: Error during db deletion. Artist '
+                  + artist_data['name'] + ' could not be deleted.', 'error')
+            return redirect(url_for('.artists'))
+        else:
+            enqueue_follow_ups()
+            flash('Artist ' + artist_data['name'] + ' was successfully deleted!')
+            return jsonify(artist_data)
@@ -0,0 +1,214 @@
+#----------------------------------------------------------------------------#
+# Async serving.
+#
+# An ASGI application around the Flask one, for an ASGI server:
+#
+#   uvicorn --factory asgi:create_asgi_app --workers 4
+#
+# The read-only pages (ASYNC_ENDPOINTS) are served on the event loop. Their
+# views are the usual ones, called through AsyncSession.run_sync(): each
+# statement they issue is awaited on SQLAlchemy's asyncio engine (asyncpg or
+# aiosqlite), so a process keeps serving other requests while the database
+# answers instead of holding a thread per request. Every other request
+# (forms, writes, the JSON API, asset bundles) goes to the WSGI application
+# on a thread pool, as under a threaded WSGI server.
+#
+# Limitation: only the statements are awaited. The rest of a view, template
+# rendering included, runs on the event loop and holds it, so a process
+# renders one page at a time; run a worker per core. This pays off when
+# requests mostly wait for the database: with 30 ms per statement and 64
+# clients on 10,000 shows, one uvicorn process served 144 requests/s against
+# 116 for 8 threads (`python benchmarks.py serving`). On a local SQLite
+# file, rendering dominates and the threaded server is slightly faster.
+#----------------------------------------------------------------------------#
+import asyncio
+import sys
+import tempfile
+from flask import g, request, request_started
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from werkzeug.exceptions import HTTPException
+from app_bootstrapping import create_app
+from database import async_database_uri
+from fanout import in_session
+
+# Endpoints served on the event loop: their views only read.
+ASYNC_ENDPOINTS = frozenset([
+    'pages.index',
+    'venues.venues', 'venues.search_venues', 'venues.show_venue',
+    'artists.artists', 'artists.search_artists', 'artists.show_artist',
+    'shows.shows',
+])
+
+# Request bodies larger than this are spooled to a temporary file.
+MAX_BODY_IN_MEMORY = 1024 * 1024
+
+
+def create_asgi_app(config=None):
+    """The ASGI application of create_app(`config`), with its asyncio engine."""
+    app = create_app(config)
+    url = app.config.get('ASYNC_DATABASE_URL') or async_database_uri(app.config['SQLALCHEMY_DATABASE_URI'])
+    engine = create_async_engine(url, **app.config.get('ASYNC_ENGINE_OPTIONS', {}))
+    return AsyncApp(app, engine)
+
+
+#  WSGI environ from an ASGI scope
+#  ----------------------------------------------------------------
+
+async def read_body(receive):
+    body = tempfile.SpooledTemporaryFile(max_size=MAX_BODY_IN_MEMORY)
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        body.write(message.get('body', b''))
+        more_body = message.get('more_body', False)
+    body.seek(0)
+    return body
+
+
+def wsgi_environ(scope, body):
+    """The WSGI environ of the HTTP request `scope`, reading its body from `body`."""
+    script_name = scope.get('root_path', '')
+    path = scope['path']
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        # WSGI strings are bytes decoded as latin-1.
+        'SCRIPT_NAME': script_name.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': 'HTTP/%s' % scope['http_version'],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else 'HTTP_' + name
+        value = value.decode('latin-1')
+        if key in environ:
+            value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ', ') + value
+        environ[key] = value
+    return environ
+
+
+def response_start(status, headers):
+    return {'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]}
+
+
+#  Application
+#  ----------------------------------------------------------------
+
+class AsyncApp:
+    """ASGI application serving `app`, its read-only pages on the asyncio `engine`."""
+
+    def __init__(self, app, engine):
+        self.app = app
+        self.engine = engine
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError('Unsupported ASGI scope type %r.' % scope['type'])
+        environ = wsgi_environ(scope, await read_body(receive))
+        if self.endpoint(environ) in ASYNC_ENDPOINTS:
+            await self.serve_async(environ, send)
+        else:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.serve_wsgi, environ, send, loop)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def endpoint(self, environ):
+        try:
+            return self.app.url_map.bind_to_environ(environ).match()[0]
+        except HTTPException:
+            # Not found, redirects and the like: left to the WSGI application.
+            return None
+
+    async def serve_async(self, environ, send):
+        # Flask's wsgi_app() and full_dispatch_request(), awaiting the view.
+        app = self.app
+        with app.request_context(environ):
+            try:
+                try:
+                    app.try_trigger_before_first_request_functions()
+                    request_started.send(app)
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        rv = await self.dispatch_request()
+                except Exception as error:
+                    rv = app.handle_user_exception(error)
+                response = app.finalize_request(rv)
+            except Exception as error:
+                response = app.handle_exception(error)
+            # Streamed bodies are produced here, with the request still available.
+            body, status, headers = response.get_wsgi_response(environ)
+            await send(response_start(status, headers))
+            try:
+                for chunk in body:
+                    if chunk:
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+            await send({'type': 'http.response.body', 'body': b''})
+
+    async def dispatch_request(self):
+        if request.routing_exception is not None:
+            self.app.raise_routing_exception(request)
+        view = self.app.view_functions[request.url_rule.endpoint]
+        # fan_out() runs the view's concurrent queries on this engine too.
+        g.async_engine = self.engine
+        async with AsyncSession(self.engine) as session:
+            return await session.run_sync(in_session, view, **request.view_args)
+
+    def serve_wsgi(self, environ, send, loop):
+        # Runs on a thread of the loop's executor, from the call of the WSGI
+        # application to the end of its body: streamed responses expect to
+        # be iterated in the thread that started them.
+        def send_from_thread(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        started = list()
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+
+        body = self.app(environ, start_response)
+        try:
+            sent_start = False
+            for chunk in body:
+                if not sent_start:
+                    send_from_thread(response_start(*started))
+                    sent_start = True
+                if chunk:
+                    send_from_thread({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not sent_start:
+                send_from_thread(response_start(*started))
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        send_from_thread({'type': 'http.response.body', 'body': b''})
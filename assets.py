@@ -0,0 +1,246 @@
+#----------------------------------------------------------------------------#
+# Static asset bundles.
+#
+# The layout's CSS and JS files are concatenated and minified into a few
+# bundles, written to ASSETS_DIR under names holding a hash of their content,
+# with gzip and, when the brotli package is installed, brotli versions next
+# to them. No build step: each process builds the bundles the first time
+# they are needed (`flask assets build` prebuilds them). Templates link them
+# like any endpoint:
+#
+#   <link rel="stylesheet" href="{{ url_for('assets', filename='main.css') }}">
+#
+# which gives /assets/main.<hash>.css. As a bundle's URL changes with its
+# content, browsers may keep it for a year without revalidating it.
+#----------------------------------------------------------------------------#
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+import click
+from flask import abort, current_app, request, send_file
+from flask.cli import AppGroup
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+# Bundle name: source files, relative to the static folder, in load order.
+BUNDLES = {
+    'main.css': ['css/bootstrap.min.css', 'css/layout.main.css', 'css/main.css', 'css/main.responsive.css',
+                 'css/main.quickfix.css'],
+    # Needed before the page renders.
+    'head.js': ['js/libs/modernizr-2.8.2.min.js', 'js/libs/moment.min.js'],
+    # Deferred, at the end of the body.
+    'main.js': ['js/libs/jquery-1.11.1.min.js', 'js/libs/bootstrap-3.1.1.min.js', 'js/plugins.js',
+                'js/script.js'],
+}
+
+# Encodings written next to each bundle, best first: (name, suffix).
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+ONE_YEAR = 365 * 24 * 3600
+
+# Written to ASSETS_DIR by build(): the hashed names, and the sources they were built from.
+MANIFEST = 'manifest.json'
+
+
+#  Minifying
+#  ----------------------------------------------------------------
+
+_CSS_STRING = r'"(?:\\.|[^"\\])*"' + r"|'(?:\\.|[^'\\])*'"
+_CSS_COMMENT_OR_STRING = re.compile(r'(%s)|/\*.*?\*/' % _CSS_STRING, re.S)
+_CSS_STRINGS = re.compile(r'(%s)' % _CSS_STRING)
+_CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def minify_css(text):
+    """`text` without comments and needless whitespace; strings are kept as is."""
+    text = _CSS_COMMENT_OR_STRING.sub(lambda match: match.group(1) or ' ', text)
+    # Odd parts are strings.
+    parts = _CSS_STRINGS.split(text)
+    return ''.join(part if i % 2 else _squeeze_css(part) for i, part in enumerate(parts)).strip()
+
+
+def _squeeze_css(text):
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r' ?([{};,>]) ?', r'\1', text)
+    # Not before a colon: "a :hover" and "a:hover" differ.
+    return text.replace(': ', ':').replace(';}', '}')
+
+
+def rebase_css_urls(text, source):
+    """Point relative url()s of the CSS file `source` (relative to the static
+    folder) at the static folder, as the bundle is served from elsewhere."""
+    base = posixpath.dirname(posixpath.join(current_app.static_url_path, source))
+
+    def rebase(match):
+        url = match.group(2).strip()
+        if url.startswith(('data:', '/', 'http:', 'https:', '#')):
+            return match.group(0)
+        return 'url("%s")' % posixpath.normpath(posixpath.join(base, url))
+
+    return _CSS_URL.sub(rebase, text)
+
+
+def minify_js(text):
+    # Without rjsmin, JS is only concatenated: most sources are minified already.
+    return rjsmin.jsmin(text) if rjsmin is not None else text
+
+
+#  Building
+#  ----------------------------------------------------------------
+
+def bundle_content(name):
+    """The concatenated, minified content of the bundle `name`, as bytes."""
+    parts = list()
+    for source in BUNDLES[name]:
+        with open(os.path.join(current_app.static_folder, source), encoding='utf-8') as file:
+            text = file.read()
+        if name.endswith('.css'):
+            parts.append(minify_css(rebase_css_urls(text, source)))
+        else:
+            # The ; ends a source missing its last one.
+            parts.append(minify_js(text).rstrip() + ';')
+    return '\n'.join(parts).encode('utf-8')
+
+
+def _write(path, content):
+    # Through a temporary file, so that concurrent builds never serve half a file.
+    temporary = '%s.%d.tmp' % (path, os.getpid())
+    with open(temporary, 'wb') as file:
+        file.write(content)
+    os.replace(temporary, path)
+
+
+def sources_stamp(static_folder):
+    # [source, size, mtime] of every source file: a few stat calls.
+    stamp = list()
+    for sources in BUNDLES.values():
+        for source in sources:
+            info = os.stat(os.path.join(static_folder, source))
+            stamp.append([source, info.st_size, info.st_mtime_ns])
+    return stamp
+
+
+def build(directory=None):
+    """Write every bundle and its compressed versions; return {name: hashed file name}."""
+    directory = directory or current_app.config['ASSETS_DIR']
+    os.makedirs(directory, exist_ok=True)
+    files = dict()
+    for name in BUNDLES:
+        content = bundle_content(name)
+        stem, extension = os.path.splitext(name)
+        hashed = '%s.%s%s' % (stem, hashlib.sha256(content).hexdigest()[:12], extension)
+        path = os.path.join(directory, hashed)
+        if not os.path.exists(path):
+            # The compressed versions first: a bundle is built once it exists.
+            _write(path + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write(path + '.br', brotli.compress(content, quality=11))
+            _write(path, content)
+        files[name] = hashed
+    manifest = {'sources': sources_stamp(current_app.static_folder), 'files': files}
+    _write(os.path.join(directory, MANIFEST), json.dumps(manifest).encode('utf-8'))
+    return files
+
+
+class Manifest:
+    """Hashed file names of the bundles of `app`, built once per process.
+
+    A process reads them from the manifest of `flask assets build` when it
+    was made from the current sources, rather than bundling them again. In
+    debug mode, the bundles are built again when a source file changes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._files = None
+        self._stamp = None
+
+    def files(self):
+        if self._files is None or self.app.debug:
+            stamp = sources_stamp(self.app.static_folder)
+        else:
+            stamp = self._stamp
+        if self._files is None or stamp != self._stamp:
+            with self._lock:
+                if self._files is None or stamp != self._stamp:
+                    files = self._built(stamp)
+                    if files is None:
+                        with self.app.app_context():
+                            files = build()
+                    self._files, self._stamp = files, stamp
+        return self._files
+
+    def _built(self, stamp):
+        try:
+            with open(os.path.join(self.app.config['ASSETS_DIR'], MANIFEST), encoding='utf-8') as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return None
+        return manifest['files'] if manifest.get('sources') == stamp else None
+
+
+def manifest():
+    return current_app.extensions['assets']
+
+
+#  Serving
+#  ----------------------------------------------------------------
+
+def _hashed_asset_name(endpoint, values):
+    # url_for('assets', filename='main.css') -> /assets/main.<hash>.css
+    if endpoint == 'assets' and values.get('filename') in BUNDLES:
+        values['filename'] = manifest().files()[values['filename']]
+
+
+def assets(filename):
+    # Serves the best encoding the client accepts, and lets it keep the
+    # file for a year without asking again.
+    if filename not in manifest().files().values():
+        abort(404)
+    path = os.path.join(current_app.config['ASSETS_DIR'], filename)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+    for name, suffix in ENCODINGS:
+        if request.accept_encodings[name] and os.path.exists(path + suffix):
+            encoding, path = name, path + suffix
+            break
+    response = send_file(path, mimetype=mimetype, max_age=ONE_YEAR, conditional=True)
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.content_encoding = encoding
+    return response
+
+
+#  Commands
+#  ----------------------------------------------------------------
+
+assets_cli = AppGroup('assets', help='Static asset bundles.')
+
+
+@assets_cli.command('build')
+def build_command():
+    """Build the bundles ahead of the first request, e.g. when deploying."""
+    for name, hashed in build().items():
+        click.echo('%s -> %s' % (name, os.path.join(current_app.config['ASSETS_DIR'], hashed)))
+
+
+def init_app(app):
+    app.extensions['assets'] = Manifest(app)
+    app.url_defaults(_hashed_asset_name)
+    app.add_url_rule('/assets/<filename>', 'assets', assets)
+    app.cli.add_command(assets_cli)
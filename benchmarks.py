@@ -0,0 +1,537 @@
+#----------------------------------------------------------------------------#
+# Benchmarks.
+#
+# Run against a scratch database, never the application one: tables are
+# created, seeded and dropped again.
+#
+#   python benchmarks.py plans --database-url postgresql://postgres@localhost:5432/fyyur_bench
+#   python benchmarks.py requests --sizes 1000,10000 --max-queries 5
+#   python benchmarks.py --shows 10000 compression --levels 1,6,9
+#   python benchmarks.py --shows 10000 startup --runs 5
+#   python benchmarks.py --shows 10000 serving --concurrency 1,8,32,128
+#----------------------------------------------------------------------------#
+import argparse
+import asyncio
+import datetime as dt
+import json
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import os
+from urllib.parse import urlencode
+import babel.dates
+import dateutil.parser
+from flask import current_app
+from sqlalchemy import event, func, text
+from sqlalchemy.orm import joinedload
+from app_bootstrapping import create_app, db
+from assets import build as build_assets
+from booking import overlapping
+from database import engine_options
+from models import Artist, Venue, Show, SHOW_DURATION
+from seeding import seed_database
+
+
+def explain(query):
+    # Query plan of an ORM query, as text, on the current database.
+    engine = db.engine
+    compiled = query.statement.compile(dialect=engine.dialect)
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(prefix + str(compiled), params).fetchall()
+    return '\n'.join('    ' + str(row[-1]) for row in rows)
+
+
+def hot_queries(venue_id, artist_id, now):
+    return [
+        ('show_venue', Venue.query.options(joinedload(Venue.shows).joinedload(Show.artist))
+            .filter(Venue.id == venue_id)),
+        ('show_artist', Artist.query.options(joinedload(Artist.shows).joinedload(Show.venue))
+            .filter(Artist.id == artist_id)),
+        ('search_venues count', db.session.query(func.count(Show.id))
+            .filter(Show.venue_id == venue_id, Show.start_time >= now)),
+        ('search_artists count', db.session.query(func.count(Show.id))
+            .filter(Show.artist_id == artist_id, Show.start_time >= now)),
+        ('booking overlap', db.session.query(Show.id)
+            .filter(overlapping(venue_id, now, now + SHOW_DURATION))),
+        ('free slots', db.session.query(Show.start_time, Show.end_time)
+            .filter(overlapping(venue_id, now, now + dt.timedelta(days=14))).order_by(Show.start_time)),
+    ]
+
+
+def plans(args):
+    # Plans of the hot queries without, then with, the Show indexes.
+    db.create_all()
+    try:
+        seed_database(args.venues, args.artists, args.shows)
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+        queries = hot_queries(venue_id=1, artist_id=1, now=dt.datetime.today())
+        indexes = list(Show.__table__.indexes)
+        for index in indexes:
+            index.drop(bind=db.engine)
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+        without = [(name, explain(query)) for name, query in queries]
+        for index in indexes:
+            index.create(bind=db.engine)
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+        with_indexes = [(name, explain(query)) for name, query in queries]
+        for (name, before), (_, after) in zip(without, with_indexes):
+            print('%s\n  without indexes:\n%s\n  with indexes:\n%s\n' % (name, before, after))
+    finally:
+        db.session.remove()
+        db.drop_all()
+
+
+def legacy_format_datetime(value, format='medium'):
+    # The datetime filter as it was before it accepted datetime objects.
+    try:
+        date = dateutil.parser.parse(value)
+        if format == 'full':
+            format="EEEE MMMM, d, y 'at' h:mma"
+        elif format == 'medium':
+            format="EE MM, dd, y h:mma"
+        return babel.dates.format_datetime(date, format, locale='en')
+    except:
+        pass
+
+
+def datetime_filter(args):
+    # Throughput of the datetime filter over a /shows-like page of start times.
+    from pages import format_datetime
+    rng = random.Random(42)
+    now = dt.datetime.today().replace(microsecond=0)
+    # Shows start on the hour, so a page repeats a limited set of values.
+    values = [now + dt.timedelta(hours=rng.randint(0, 24 * 30)) for _ in range(args.values)]
+    strings = [str(value) for value in values]
+    runs = [
+        ('legacy (str + dateutil)', lambda: [legacy_format_datetime(value, 'full') for value in strings]),
+        ('datetime objects', lambda: [format_datetime(value, 'full') for value in values]),
+    ]
+    for name, run in runs:
+        seconds = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        print('%-25s %10.0f calls/s' % (name, len(values) / seconds))
+
+
+PAGES = [
+    # (name, method, url); {venue_id} and {artist_id} are drawn at random.
+    ('index', 'get', '/'),
+    ('venues', 'get', '/venues'),
+    ('venues_by_genre', 'get', '/venues?genre=Jazz'),
+    ('artists', 'get', '/artists'),
+    ('shows', 'get', '/shows'),
+    ('search_venues', 'post', '/venues/search'),
+    ('search_artists', 'post', '/artists/search'),
+    ('show_venue', 'get', '/venues/{venue_id}'),
+    ('show_artist', 'get', '/artists/{artist_id}'),
+]
+SEARCH_TERMS = ['the', 'blue', 'hall', 'new york', 'ca', 'band', 'x']
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def drive(client, rng, name, method, url, venue_ids, artist_ids, statements):
+    url = url.format(venue_id=rng.choice(venue_ids), artist_id=rng.choice(artist_ids))
+    kwargs = {'data': {'search_term': rng.choice(SEARCH_TERMS)}} if method == 'post' else {}
+    statements[0] = 0
+    start = time.perf_counter()
+    response = getattr(client, method)(url, **kwargs)
+    seconds = time.perf_counter() - start
+    if response.status_code != 200:
+        raise RuntimeError('%s %s answered %d' % (method.upper(), url, response.status_code))
+    return seconds, statements[0]
+
+
+def requests(args):
+    # Latency, statements per request and throughput of every page, per data size.
+    current_app.config['CACHE_ENABLED'] = args.cache
+    current_app.config['CONDITIONAL_GET'] = False
+    current_app.config['PROFILING_ENABLED'] = False
+    current_app.config['FAN_OUT'] = {'auto': 'auto', 'on': True, 'off': False}[args.fan_out]
+    statements = [0]
+
+    def count_statement(*_):
+        statements[0] += 1
+        if args.latency_ms:
+            time.sleep(args.latency_ms / 1000)
+
+    rng = random.Random(42)
+    failed = False
+    print('%-16s %8s %8s %8s %8s %9s %9s' % ('page', 'shows', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'req/s'))
+    for size in [int(size) for size in args.sizes.split(',')]:
+        db.create_all()
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+        try:
+            seed_database(max(1, size // 100), max(1, size // 20), size)
+            venue_ids = [row.id for row in db.session.query(Venue.id)]
+            artist_ids = [row.id for row in db.session.query(Artist.id)]
+            db.session.remove()
+            client = current_app.test_client()
+            for name, method, url in PAGES:
+                for _ in range(args.warmup):
+                    drive(client, rng, name, method, url, venue_ids, artist_ids, statements)
+                timings, queries = list(), list()
+                for _ in range(args.requests):
+                    seconds, count = drive(client, rng, name, method, url, venue_ids, artist_ids, statements)
+                    timings.append(seconds)
+                    queries.append(count)
+                timings.sort()
+                print('%-16s %8d %8.2f %8.2f %8.2f %9.1f %9.0f' % (
+                    name, size, percentile(timings, 0.5) * 1000, percentile(timings, 0.95) * 1000,
+                    percentile(timings, 0.99) * 1000, sum(queries) / len(queries), len(timings) / sum(timings)))
+                if args.max_queries is not None and max(queries) > args.max_queries:
+                    print('  %s issued %d statements, over the budget of %d' % (name, max(queries), args.max_queries))
+                    failed = True
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_statement)
+            db.session.remove()
+            db.drop_all()
+    if failed:
+        raise SystemExit(1)
+
+
+def compression(args):
+    # Bytes on the wire and CPU time of each page, per encoding and level.
+    from compression import brotli, compress
+    current_app.config['CONDITIONAL_GET'] = False
+    current_app.config['PROFILING_ENABLED'] = False
+    current_app.config['COMPRESS_ENABLED'] = False
+    settings = [('gzip', 'COMPRESS_LEVEL', int(level)) for level in args.levels.split(',')]
+    if brotli is not None:
+        settings += [('br', 'COMPRESS_BROTLI_QUALITY', int(quality)) for quality in args.qualities.split(',')]
+    rng = random.Random(42)
+    db.create_all()
+    try:
+        seed_database(args.venues, args.artists, args.shows)
+        venue_ids = [row.id for row in db.session.query(Venue.id)]
+        artist_ids = [row.id for row in db.session.query(Artist.id)]
+        db.session.remove()
+        client = current_app.test_client()
+        print('%-16s %9s %-8s %9s %7s %9s %9s' % ('page', 'bytes', 'encoding', 'on wire', 'saved', 'cpu ms', 'MB/s'))
+        totals = dict()
+        for name, method, url in PAGES:
+            url = url.format(venue_id=rng.choice(venue_ids), artist_id=rng.choice(artist_ids))
+            kwargs = {'data': {'search_term': rng.choice(SEARCH_TERMS)}} if method == 'post' else {}
+            body = getattr(client, method)(url, **kwargs).get_data()
+            for encoding, key, level in settings:
+                current_app.config[key] = level
+                compressed = compress(encoding, body)
+                seconds = min(timeit.repeat(lambda: compress(encoding, body), number=1, repeat=args.repeat))
+                label = '%s-%d' % (encoding, level)
+                total = totals.setdefault(label, [0, 0, 0.0])
+                total[0] += len(body)
+                total[1] += len(compressed)
+                total[2] += seconds
+                print('%-16s %9d %-8s %9d %6.1f%% %9.3f %9.1f' % (
+                    name, len(body), label, len(compressed), 100 - 100.0 * len(compressed) / len(body),
+                    seconds * 1000, len(body) / seconds / 1e6))
+        for label, (raw, compressed, seconds) in totals.items():
+            print('%-16s %9d %-8s %9d %6.1f%% %9.3f %9.1f' % (
+                'all pages', raw, label, compressed, 100 - 100.0 * compressed / raw, seconds * 1000, raw / seconds / 1e6))
+    finally:
+        db.session.remove()
+        db.drop_all()
+
+
+# Run in a fresh interpreter by `startup`: prints the seconds spent importing,
+# building the app, and serving the first and second requests.
+STARTUP_SCRIPT = '''
+import time
+started = time.perf_counter()
+import app_bootstrapping
+imported = time.perf_counter()
+app = app_bootstrapping.create_app()
+created = time.perf_counter()
+client = app.test_client()
+assert client.get('/').status_code == 200
+first = time.perf_counter()
+assert client.get('/').status_code == 200
+print(imported - started, created - imported, first - created, time.perf_counter() - first)
+'''
+
+
+def startup(args):
+    # Cold start of a worker: import, create_app(), first and second request,
+    # then the slowest imports of `import app` (python -X importtime).
+    db.create_all()
+    try:
+        seed_database(args.venues, args.artists, args.shows)
+        db.session.remove()
+        directory = os.path.dirname(os.path.abspath(__file__))
+        env = dict(os.environ, DATABASE_URL=current_app.config['SQLALCHEMY_DATABASE_URI'])
+        if not args.cold_assets:
+            # As after `flask assets build` on deploy.
+            env['ASSETS_DIR'] = tempfile.mkdtemp()
+            with current_app.test_request_context():
+                current_app.config['ASSETS_DIR'] = env['ASSETS_DIR']
+                build_assets()
+        runs = list()
+        for _ in range(args.runs):
+            if args.cold_assets:
+                # The first request builds the asset bundles.
+                env['ASSETS_DIR'] = tempfile.mkdtemp()
+            output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=directory, env=env, check=True,
+                                    stdout=subprocess.PIPE, universal_newlines=True).stdout
+            runs.append([float(value) for value in output.split()])
+        print('%-24s %9s %9s %9s' % ('phase', 'p50 ms', 'min ms', 'max ms'))
+        for i, phase in enumerate(['imports', 'create_app()', 'first request', 'second request']):
+            timings = sorted(run[i] for run in runs)
+            print('%-24s %9.1f %9.1f %9.1f' % (phase, percentile(timings, 0.5) * 1000, timings[0] * 1000,
+                                                timings[-1] * 1000))
+
+        stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=directory, env=env,
+                                check=True, stderr=subprocess.PIPE, universal_newlines=True).stderr
+        # Lines are "import time: self | cumulative | name", the name indented
+        # by two spaces per nesting level, and each module after its imports.
+        subtree = list()
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            if depth == 0 and name.strip() != 'app':
+                subtree = list()
+                continue
+            subtree.append((int(cumulative) / 1000, depth, name.strip()))
+        print('\n%-40s %9s' % ('imports of app.py, two levels deep', 'ms'))
+        for milliseconds, depth, name in sorted((entry for entry in subtree if entry[1] <= 2), reverse=True)[:args.top]:
+            print('%-40s %9.1f' % ('  ' * depth + name, milliseconds))
+    finally:
+        db.session.remove()
+        db.drop_all()
+
+
+# Run in a fresh interpreter by `serving`: serves create_app() on 127.0.0.1,
+# either under a WSGI server with a fixed pool of threads, like a gthread
+# worker, or as the ASGI application of asgi.py under uvicorn. Every
+# statement waits `latency` seconds more, as for a remote database server:
+# the asyncio engine awaits it, the others block their thread.
+SERVER_SCRIPT = """
+import asyncio, json, logging, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.util import await_only
+from werkzeug.serving import BaseWSGIServer
+
+mode, port, threads, overrides = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), json.loads(sys.argv[4])
+latency = float(sys.argv[5])
+logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def round_trip(conn, *args):
+    if latency and conn.dialect.is_async:
+        await_only(asyncio.sleep(latency))
+    elif latency:
+        time.sleep(latency)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    def process_request(self, request, client_address):
+        pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+if mode == 'wsgi':
+    from app_bootstrapping import create_app
+    app = create_app()
+    app.config.update(overrides)
+    pool = ThreadPoolExecutor(threads)
+    PooledWSGIServer('127.0.0.1', port, app).serve_forever()
+else:
+    import uvicorn
+    from asgi import create_asgi_app
+    asgi_app = create_asgi_app()
+    asgi_app.app.config.update(overrides)
+    uvicorn.run(asgi_app, host='127.0.0.1', port=port, log_level='warning', lifespan='on')
+"""
+
+
+async def fetch(port, method, url, body):
+    # One HTTP/1.0 request on a new connection; returns the status code.
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    head = '%s %s HTTP/1.0\r\nHost: 127.0.0.1\r\n' % (method.upper(), url)
+    if body:
+        head += 'Content-Type: application/x-www-form-urlencoded\r\nContent-Length: %d\r\n' % len(body)
+    writer.write(head.encode('latin-1') + b'\r\n' + body)
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+async def load(port, concurrency, total, venue_ids, artist_ids, rng):
+    # `total` requests over every page, `concurrency` at a time:
+    # ([seconds per request], errors, wall seconds).
+    planned = list()
+    for i in range(total):
+        name, method, url = PAGES[i % len(PAGES)]
+        url = url.format(venue_id=rng.choice(venue_ids), artist_id=rng.choice(artist_ids))
+        body = urlencode({'search_term': rng.choice(SEARCH_TERMS)}).encode() if method == 'post' else b''
+        planned.append((method, url, body))
+    timings, errors = list(), [0]
+    pending = iter(planned)
+
+    async def client():
+        for method, url, body in pending:
+            start = time.perf_counter()
+            try:
+                status = await fetch(port, method, url, body)
+            except OSError:
+                status = None
+            timings.append(time.perf_counter() - start)
+            if status != 200:
+                errors[0] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return timings, errors[0], time.perf_counter() - start
+
+
+def peak_rss_mb(pid):
+    # Linux only: the most memory the process has held.
+    try:
+        with open('/proc/%d/status' % pid) as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float('nan')
+
+
+def serving(args):
+    # Throughput of the read-only pages at rising concurrency: one process
+    # under a WSGI server with --threads threads, then one under uvicorn.
+    db.create_all()
+    try:
+        seed_database(args.venues, args.artists, args.shows)
+        venue_ids = [row.id for row in db.session.query(Venue.id)]
+        artist_ids = [row.id for row in db.session.query(Artist.id)]
+        db.session.remove()
+        directory = os.path.dirname(os.path.abspath(__file__))
+        env = dict(os.environ, DATABASE_URL=current_app.config['SQLALCHEMY_DATABASE_URI'], FYYUR_CONFIG='production',
+                   SECRET_KEY=os.environ.get('SECRET_KEY', 'benchmarks'), ASSETS_DIR=tempfile.mkdtemp())
+        overrides = json.dumps({'CACHE_ENABLED': args.cache, 'CONDITIONAL_GET': False, 'PROFILING_ENABLED': False})
+        levels = [int(level) for level in args.concurrency.split(',')]
+        print('%-6s %11s %9s %8s %8s %8s %7s %8s' % (
+            'server', 'concurrency', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors', 'peak MB'))
+        for mode in ('wsgi', 'asgi'):
+            with socket.socket() as probe:
+                probe.bind(('127.0.0.1', 0))
+                port = probe.getsockname()[1]
+            server = subprocess.Popen([sys.executable, '-c', SERVER_SCRIPT, mode, str(port), str(args.threads),
+                                       overrides, str(args.latency_ms / 1000)], cwd=directory, env=env)
+            try:
+                deadline = time.monotonic() + 30
+                while True:
+                    try:
+                        socket.create_connection(('127.0.0.1', port)).close()
+                        break
+                    except OSError:
+                        if server.poll() is not None or time.monotonic() > deadline:
+                            raise RuntimeError('the %s server did not start' % mode)
+                        time.sleep(0.1)
+                rng = random.Random(42)
+                asyncio.run(load(port, 1, len(PAGES) * args.warmup, venue_ids, artist_ids, rng))
+                for concurrency in levels:
+                    timings, errors, seconds = asyncio.run(
+                        load(port, concurrency, args.requests, venue_ids, artist_ids, rng))
+                    timings.sort()
+                    print('%-6s %11d %9.0f %8.2f %8.2f %8.2f %7d %8.1f' % (
+                        mode, concurrency, len(timings) / seconds, percentile(timings, 0.5) * 1000,
+                        percentile(timings, 0.95) * 1000, percentile(timings, 0.99) * 1000, errors,
+                        peak_rss_mb(server.pid)))
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        db.session.remove()
+        db.drop_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fyyur benchmarks, run against a scratch database.')
+    parser.add_argument('--database-url', default=None,
+                        help='scratch database to seed (default: a temporary SQLite file)')
+    parser.add_argument('--venues', type=int, default=1000)
+    parser.add_argument('--artists', type=int, default=5000)
+    parser.add_argument('--shows', type=int, default=100000)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('plans', help='query plans of the Show hot paths with and without indexes') \
+        .set_defaults(run=plans)
+    filter_parser = subparsers.add_parser('datetime-filter', help='throughput of the datetime Jinja filter')
+    filter_parser.add_argument('--values', type=int, default=5000)
+    filter_parser.add_argument('--repeat', type=int, default=5)
+    filter_parser.set_defaults(run=datetime_filter)
+    requests_parser = subparsers.add_parser(
+        'requests', help='latency, queries per request and throughput of every page, per data size')
+    requests_parser.add_argument('--sizes', default='1000,10000', help='comma separated numbers of shows')
+    requests_parser.add_argument('--requests', type=int, default=100, help='timed requests per page and size')
+    requests_parser.add_argument('--warmup', type=int, default=5)
+    requests_parser.add_argument('--cache', action='store_true', help='keep the view cache enabled')
+    requests_parser.add_argument('--fan-out', choices=['auto', 'on', 'off'], default='auto',
+                                 help='run the independent queries of a page concurrently (FAN_OUT)')
+    requests_parser.add_argument('--latency-ms', type=float, default=0,
+                                 help='added to every statement, as the round trip to a database server')
+    requests_parser.add_argument('--max-queries', type=int, default=None,
+                                 help='exit with status 1 when a request issues more statements')
+    requests_parser.set_defaults(run=requests)
+    compression_parser = subparsers.add_parser(
+        'compression', help='response sizes and compression CPU time of every page, per encoding and level')
+    compression_parser.add_argument('--levels', default='1,6,9', help='comma separated gzip levels')
+    compression_parser.add_argument('--qualities', default='4,11',
+                                    help='comma separated brotli qualities, if brotli is installed')
+    compression_parser.add_argument('--repeat', type=int, default=20, help='compressions timed per page and level')
+    compression_parser.set_defaults(run=compression)
+    startup_parser = subparsers.add_parser(
+        'startup', help='import, create_app() and first request times of a new process, and the slowest imports')
+    startup_parser.add_argument('--runs', type=int, default=5, help='processes started')
+    startup_parser.add_argument('--top', type=int, default=15, help='imports listed')
+    startup_parser.add_argument('--cold-assets', action='store_true',
+                                help='let the first request build the asset bundles, as without `flask assets build`')
+    startup_parser.set_defaults(run=startup)
+
+    serving_parser = subparsers.add_parser(
+        'serving', help='throughput of the read-only pages under a threaded WSGI server and under ASGI (asgi.py)')
+    serving_parser.add_argument('--concurrency', default='1,8,32,128', help='comma separated numbers of clients')
+    serving_parser.add_argument('--requests', type=int, default=500, help='timed requests per server and concurrency')
+    serving_parser.add_argument('--warmup', type=int, default=5, help='untimed requests per page')
+    serving_parser.add_argument('--threads', type=int, default=8, help='threads of the WSGI server')
+    serving_parser.add_argument('--latency-ms', type=float, default=0,
+                                help='added to every statement, as the round trip to a database server')
+    serving_parser.add_argument('--cache', action='store_true', help='keep the view cache enabled')
+    serving_parser.set_defaults(run=serving)
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url is None:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'fyyur_bench.db')
+    app = create_app()
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(database_url)
+    with app.app_context():
+        args.run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#----------------------------------------------------------------------------#
+# Show bookings.
+#
+# A show occupies its venue from start_time to end_time, end excluded, and
+# must start within the availability period of its artist. Both rules are
+# checked by one query in the transaction that adds the show. On PostgreSQL
+# the ex_shows_venue_id_during exclusion constraint also rejects overlapping
+# shows booked concurrently. SQLite has no such constraint: there, book_show()
+# takes the database's write lock before the check, so that concurrent
+# bookings are checked one after the other.
+#----------------------------------------------------------------------------#
+import datetime as dt
+from sqlalchemy import and_, case, exists, false, or_
+from sqlalchemy.exc import IntegrityError
+from app_bootstrapping import db
+from models import Artist, Venue, Show, SHOW_DURATION, MAX_SHOW_DURATION
+
+BAD_START_TIME = 'The start time of the show should be in the availability period of the artist.'
+VENUE_BOOKED = 'The venue already has a show at that time.'
+
+
+def overlapping(venue_id, start_time, end_time):
+    """Condition on Show: the shows of the venue overlapping [start_time, end_time).
+
+    The lower bound on start_time, from MAX_SHOW_DURATION, keeps this a range
+    scan of the (venue_id, start_time) index.
+    """
+    return and_(Show.venue_id == venue_id,
+                Show.start_time >= start_time - MAX_SHOW_DURATION,
+                Show.start_time < end_time,
+                Show.end_time > start_time)
+
+
+def check_booking(artist_id, venue_id, start_time, end_time=None):
+    """Check a show booking with one query: (row, problems).
+
+    `row` has the artist_name and venue_name, or is None when the artist or
+    the venue does not exist; `problems` lists the rules the show breaks.
+    """
+    end_time = end_time or start_time + SHOW_DURATION
+    if not start_time < end_time <= start_time + MAX_SHOW_DURATION:
+        return None, ['A show should end after it starts, and last at most %s.' % MAX_SHOW_DURATION]
+    available = and_(or_(Artist.available_start_time.is_(None), Artist.available_start_time <= start_time),
+                     or_(Artist.available_end_time.is_(None), Artist.available_end_time >= start_time))
+    row = db.session.query(Artist.name.label('artist_name'),
+                           Venue.name.label('venue_name'),
+                           case((available, True), else_=false()).label('artist_available'),
+                           exists().where(overlapping(venue_id, start_time, end_time)).label('venue_booked')) \
+        .select_from(Artist).join(Venue, Venue.id == venue_id).filter(Artist.id == artist_id).first()
+    if row is None:
+        return None, ['Unknown artist or venue.']
+    problems = list()
+    if not row.artist_available:
+        problems.append(BAD_START_TIME)
+    if row.venue_booked:
+        problems.append(VENUE_BOOKED)
+    return row, problems
+
+
+def book_show(artist_id, venue_id, start_time, end_time=None):
+    """Add a show if it can be booked: (show, row, problems), as check_booking.
+
+    The show is flushed, not committed; `show` is None when there are
+    problems, after a rollback if the show was rejected by the database.
+    """
+    end_time = end_time or start_time + SHOW_DURATION
+    _lock_for_writing()
+    row, problems = check_booking(artist_id, venue_id, start_time, end_time)
+    if problems:
+        return None, row, problems
+    show = Show(artist_id=artist_id, venue_id=venue_id, start_time=start_time, end_time=end_time)
+    db.session.add(show)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        # Lost a race for the slot with a concurrent booking.
+        db.session.rollback()
+        return None, row, [VENUE_BOOKED]
+    return show, row, problems
+
+
+def _lock_for_writing():
+    # SQLite only locks the database at the first write of a transaction,
+    # after the check. BEGIN IMMEDIATE takes the lock first; concurrent
+    # bookings wait for it, up to the driver's busy timeout.
+    connection = db.session.connection()
+    if connection.dialect.name == 'sqlite' and not connection.connection.in_transaction:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+#  Free slots
+#  ----------------------------------------------------------------
+
+def free_gaps(busy, start, end, min_length=dt.timedelta(0)):
+    """Gaps of at least `min_length` in [start, end) not covered by `busy`.
+
+    `busy` holds (start, end) intervals sorted by start, which may overlap:
+    one sweep merges them and yields what lies between, in O(n).
+    """
+    cursor = start
+    for busy_start, busy_end in busy:
+        if busy_start >= end:
+            break
+        if busy_start > cursor and busy_start - cursor >= min_length:
+            yield cursor, busy_start
+        cursor = max(cursor, busy_end)
+    if end > cursor and end - cursor >= min_length:
+        yield cursor, end
+
+
+def free_slots(venue_id, start, end, min_length=SHOW_DURATION):
+    """[(start, end)] of the free periods of a venue between `start` and `end`.
+
+    Reads only the shows overlapping the period, in start order, from the
+    (venue_id, start_time) index, then sweeps them with free_gaps.
+    """
+    busy = db.session.query(Show.start_time, Show.end_time) \
+        .filter(overlapping(venue_id, start, end)).order_by(Show.start_time)
+    return list(free_gaps(busy, start, end, min_length))
+
+
+def find_conflicts(rows):
+    """Indexes of the `rows` (dicts with venue_id, start_time and end_time)
+    that overlap an existing show, or an earlier row, of their venue.
+
+    One query reads the existing shows of all the rows' venues over the
+    rows' period; used by the bulk import.
+    """
+    rows = [row for row in enumerate(rows) if row[1].get('venue_id') and row[1].get('start_time')]
+    if not rows:
+        return set()
+    first = min(row['start_time'] for _, row in rows)
+    last = max(row['end_time'] for _, row in rows)
+    busy = dict()
+    for venue_id, start_time, end_time in db.session.query(Show.venue_id, Show.start_time, Show.end_time).filter(
+            Show.venue_id.in_(set(row['venue_id'] for _, row in rows)),
+            Show.start_time >= first - MAX_SHOW_DURATION, Show.start_time < last, Show.end_time > first):
+        busy.setdefault(venue_id, []).append((start_time, end_time))
+    conflicts = set()
+    for index, row in rows:
+        venue_busy = busy.setdefault(row['venue_id'], [])
+        if any(busy_start < row['end_time'] and busy_end > row['start_time'] for busy_start, busy_end in venue_busy):
+            conflicts.add(index)
+        else:
+            venue_busy.append((row['start_time'], row['end_time']))
+    return conflicts
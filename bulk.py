@@ -0,0 +1,449 @@
+#----------------------------------------------------------------------------#
+# Bulk import and export of venues, artists and shows, as CSV or NDJSON.
+#
+#   flask import venues venues.csv
+#   flask export shows shows.ndjson
+#
+# Files are read and written row by row, so memory use does not grow with
+# the file size. Every imported row goes through the rules of the matching
+# form (VenueForm, ArtistForm, ShowForm); invalid rows are reported with
+# their line number and skipped, valid ones are inserted in batches of
+# IMPORT_BATCH_SIZE rows, one commit per batch.
+# Ids are never imported: shows refer to venues and artists already in the
+# database. delete_records() deletes many records by id in one statement.
+#----------------------------------------------------------------------------#
+import codecs
+import csv
+import datetime as dt
+import io
+import json
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.datastructures import MultiDict
+from app_bootstrapping import db
+from booking import BAD_START_TIME, VENUE_BOOKED, find_conflicts
+from cache import view_cache
+from forms import ArtistForm, ShowForm, VenueForm
+from models import Artist, Venue, Show, SHOW_DURATION
+from queries import genre_ids, genre_key, genre_names_by_id
+from search import clear_index
+from show_counts import count_shows, uncount_shows
+
+FORMATS = ('csv', 'ndjson')
+# Format of the datetime fields of the forms, and of exported datetimes.
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class Kind:
+    """What is imported and exported for one model, and how rows are validated."""
+
+    def __init__(self, model, form_class, fields):
+        self.model = model
+        self.form_class = form_class
+        self.fields = fields
+        self.table = model.__table__
+
+    def values(self, form):
+        # Column values of a validated form, and the list of its genre names.
+        # Blank optional fields are NULL, as exported.
+        values = {field: form[field].data for field in self.fields}
+        for field, value in values.items():
+            if value == '' and field in self.table.c and self.table.c[field].nullable:
+                values[field] = None
+        return values
+
+    def insert(self, rows):
+        """Insert validated rows in one executemany, and their genre links in another."""
+        if 'genres' not in self.fields:
+            db.session.execute(self.table.insert(), rows)
+            return
+        # The genre links need the new ids, which an executemany does not
+        # return: take the ids first, and insert them with the rows.
+        ids = genre_ids()
+        key = genre_key(self.model)
+        records = list()
+        links = list()
+        for entity_id, values in zip(self.new_ids(len(rows)), rows):
+            values = dict(values, id=entity_id)
+            names = values.pop('genres')
+            records.append(values)
+            links.extend({key.name: entity_id, 'genre_id': ids[name]} for name in names)
+        db.session.execute(self.table.insert(), records)
+        if links:
+            db.session.execute(key.table.insert(), links)
+
+    def new_ids(self, count):
+        """`count` unused ids for new rows, from one query."""
+        id_column = self.table.c.id
+        if db.engine.dialect.name == 'postgresql':
+            sequence = func.pg_get_serial_sequence(self.table.name, id_column.name)
+            return list(db.session.execute(select(func.nextval(sequence))
+                                           .select_from(func.generate_series(1, count))).scalars())
+        # SQLite picks max(id) + 1 too. A concurrent insert in between makes
+        # the batch fail, and _flush() then inserts its rows one at a time.
+        last_id = db.session.execute(select(func.max(id_column))).scalar() or 0
+        return list(range(last_id + 1, last_id + count + 1))
+
+    def check(self, values):
+        """Errors of rules the form does not cover, as {field: [messages]}."""
+        return {}
+
+    def check_batch(self, batch):
+        """Errors of a batch of (line, values) rows that need the database, by line."""
+        return {}
+
+
+class ArtistKind(Kind):
+
+    def check(self, values):
+        if Artist(available_start_time=values['available_start_time'],
+                  available_end_time=values['available_end_time']).is_period_validity_incorrect():
+            return {'available_end_time': ['The availability period is not correctly set.']}
+        return {}
+
+
+class ShowKind(Kind):
+
+    def insert(self, rows):
+        super().insert(rows)
+        # Core inserts do not fire the mapper events that count shows.
+        count_shows(db.session.connection(), rows)
+
+    def values(self, form):
+        values = super().values(form)
+        for field in ('artist_id', 'venue_id'):
+            try:
+                values[field] = int(values[field])
+            except (TypeError, ValueError):
+                values[field] = None
+        if values.get('start_time'):
+            values['end_time'] = values['start_time'] + SHOW_DURATION
+        return values
+
+    def check(self, values):
+        return {field: ['Not a valid id.'] for field in ('artist_id', 'venue_id') if values[field] is None}
+
+    def check_batch(self, batch):
+        # One query per table for the whole batch, not one per row, and one
+        # for the shows already booked at its venues.
+        artist_ids = set(values['artist_id'] for _, values in batch)
+        venue_ids = set(values['venue_id'] for _, values in batch)
+        artists = {row.id: row for row in db.session.query(
+            Artist.id, Artist.available_start_time, Artist.available_end_time).filter(Artist.id.in_(artist_ids))}
+        venues = set(row.id for row in db.session.query(Venue.id).filter(Venue.id.in_(venue_ids)))
+        errors = {}
+        for line, values in batch:
+            artist = artists.get(values['artist_id'])
+            if artist is None:
+                errors.setdefault(line, {})['artist_id'] = ['No artist with this id.']
+            elif (artist.available_start_time and values['start_time'] < artist.available_start_time) \
+                    or (artist.available_end_time and values['start_time'] > artist.available_end_time):
+                errors.setdefault(line, {})['start_time'] = [BAD_START_TIME]
+            if values['venue_id'] not in venues:
+                errors.setdefault(line, {})['venue_id'] = ['No venue with this id.']
+        valid = [(line, values) for line, values in batch if line not in errors]
+        for index in find_conflicts([values for _, values in valid]):
+            errors[valid[index][0]] = {'start_time': [VENUE_BOOKED]}
+        return errors
+
+
+KINDS = {
+    'venues': Kind(Venue, VenueForm, ['name', 'city', 'state', 'address', 'phone', 'genres', 'facebook_link',
+                                      'image_link', 'website_link', 'seeking_talent', 'seeking_description']),
+    'artists': ArtistKind(Artist, ArtistForm, ['name', 'city', 'state', 'phone', 'genres', 'facebook_link',
+                                               'image_link', 'website_link', 'seeking_venue', 'seeking_description',
+                                               'available_start_time', 'available_end_time']),
+    'shows': ShowKind(Show, ShowForm, ['artist_id', 'venue_id', 'start_time']),
+}
+
+
+def guess_format(filename, default='csv'):
+    """'ndjson' for .ndjson, .jsonl and .json file names, `default` otherwise."""
+    if filename and filename.lower().rsplit('.', 1)[-1] in ('ndjson', 'jsonl', 'json'):
+        return 'ndjson'
+    return default
+
+
+#  Reading
+#  ----------------------------------------------------------------
+
+def read_rows(stream, fmt):
+    """(line, row, problem) for each row of a binary `stream`.
+
+    `row` is a dict of the raw values, or None when the line could not be
+    parsed, in which case `problem` says why.
+    """
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        try:
+            for row in reader:
+                yield reader.line_num, row, None
+        except (csv.Error, UnicodeDecodeError) as exc:
+            yield reader.line_num, None, str(exc)
+        return
+    line = 0
+    try:
+        for line, text in enumerate(lines, 1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as exc:
+                yield line, None, 'Not valid JSON: %s' % exc
+                continue
+            if not isinstance(row, dict):
+                yield line, None, 'Not a JSON object.'
+                continue
+            yield line, row, None
+    except UnicodeDecodeError as exc:
+        yield line + 1, None, str(exc)
+
+
+def _formdata(kind, row):
+    # Raw values as the form would receive them from a browser.
+    formdata = MultiDict()
+    for field in kind.fields:
+        value = row.get(field)
+        if value is None:
+            value = ''
+        if field == 'genres':
+            genres = value if isinstance(value, list) else str(value).split(',')
+            for genre in genres:
+                if str(genre).strip():
+                    formdata.add(field, str(genre).strip())
+            continue
+        if isinstance(value, bool):
+            value = 'y' if value else 'false'
+        elif field.endswith('_time') and value:
+            # Also accept ISO 8601, e.g. 2024-05-01T20:00:00.
+            try:
+                value = dt.datetime.fromisoformat(str(value)).strftime(DATETIME_FORMAT)
+            except ValueError:
+                pass
+        formdata.add(field, str(value))
+    return formdata
+
+
+def validate(kind, row):
+    """(values, errors): column values of a raw row, or its errors by field."""
+    form = kind.form_class(formdata=_formdata(kind, row), meta={'csrf': False})
+    if not form.validate():
+        return None, form.errors
+    values = kind.values(form)
+    errors = kind.check(values)
+    if errors:
+        return None, errors
+    return values, None
+
+
+#  Importing
+#  ----------------------------------------------------------------
+
+class ImportReport:
+    """Counts of an import, and the errors of its first `max_errors` failed rows.
+
+    `on_error(line, errors)`, if given, is called for every failed row.
+    """
+
+    def __init__(self, max_errors=100, on_error=None):
+        self.inserted = 0
+        self.failed = 0
+        self.max_errors = max_errors
+        self.on_error = on_error
+        self.errors = list()
+
+    def fail(self, line, errors):
+        self.failed += 1
+        if self.on_error is not None:
+            self.on_error(line, errors)
+        if self.max_errors is None or len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self):
+        return {'inserted': self.inserted,
+                'failed': self.failed,
+                'errors': self.errors,
+                'errors_truncated': len(self.errors) < self.failed}
+
+
+def _flush(kind, batch, report):
+    errors = kind.check_batch(batch)
+    for line in sorted(errors):
+        report.fail(line, errors[line])
+    rows = [values for line, values in batch if line not in errors]
+    if not rows:
+        return
+    try:
+        # On PostgreSQL, psycopg2 sends each executemany as multi-row INSERTs.
+        kind.insert(rows)
+        db.session.commit()
+        report.inserted += len(rows)
+        return
+    except SQLAlchemyError:
+        db.session.rollback()
+    # Some row broke the batch: insert one row at a time to find it.
+    for line, values in batch:
+        if line in errors:
+            continue
+        try:
+            kind.insert([values])
+            db.session.commit()
+            report.inserted += 1
+        except SQLAlchemyError as exc:
+            db.session.rollback()
+            report.fail(line, {'database': [str(getattr(exc, 'orig', exc))]})
+
+
+def import_rows(kind_name, rows, batch_size=None, max_errors=None, on_error=None):
+    """Validate and insert rows from read_rows() as `kind_name` records; return an ImportReport."""
+    kind = KINDS[kind_name]
+    batch_size = batch_size or current_app.config.get('IMPORT_BATCH_SIZE', 1000)
+    if max_errors is None:
+        max_errors = current_app.config.get('IMPORT_MAX_ERRORS', 100)
+    report = ImportReport(max_errors, on_error)
+    batch = list()
+    try:
+        for line, row, problem in rows:
+            if row is None:
+                report.fail(line, {'row': [problem]})
+                continue
+            values, errors = validate(kind, row)
+            if errors:
+                report.fail(line, errors)
+                continue
+            batch.append((line, values))
+            if len(batch) >= batch_size:
+                _flush(kind, batch, report)
+                batch = list()
+        if batch:
+            _flush(kind, batch, report)
+    finally:
+        if report.inserted:
+            # Core inserts do not fire the mapper events that clear these.
+            view_cache.clear()
+            clear_index()
+    return report
+
+
+#  Exporting
+#  ----------------------------------------------------------------
+
+def _record(kind, row, genres):
+    record = {'id': row.id}
+    for field in kind.fields:
+        value = genres.get(row.id, []) if field == 'genres' else getattr(row, field)
+        if isinstance(value, dt.datetime):
+            value = value.strftime(DATETIME_FORMAT)
+        record[field] = value
+    return record
+
+
+def export_rows(kind_name, fmt, batch_size=None):
+    """Encoded chunks of a CSV or NDJSON export of all `kind_name` records, in id order.
+
+    Records are read in keyset-paginated batches, so memory use does not
+    depend on the table size.
+    """
+    kind = KINDS[kind_name]
+    batch_size = batch_size or current_app.config.get('IMPORT_BATCH_SIZE', 1000)
+    columns = [kind.model.id] + [getattr(kind.model, field) for field in kind.fields if field != 'genres']
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == 'csv':
+        writer.writerow(['id'] + kind.fields)
+    last_id = None
+    while True:
+        query = db.session.query(*columns).order_by(kind.model.id)
+        if last_id is not None:
+            query = query.filter(kind.model.id > last_id)
+        rows = query.limit(batch_size).all()
+        genres = genre_names_by_id(kind.model, [row.id for row in rows]) if 'genres' in kind.fields else {}
+        for row in rows:
+            record = _record(kind, row, genres)
+            if fmt == 'csv':
+                writer.writerow([','.join(value) if isinstance(value, list)
+                                 else 'true' if value is True else 'false' if value is False else value
+                                 for value in record.values()])
+            else:
+                buffer.write(json.dumps(record, separators=(',', ':')))
+                buffer.write('\n')
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1].id
+
+
+#  Deleting
+#  ----------------------------------------------------------------
+
+def delete_records(kind_name, ids, batch_size=None):
+    """Delete the `kind_name` records with the given ids; return how many were deleted.
+
+    One DELETE statement per IMPORT_BATCH_SIZE ids, all in one transaction.
+    The shows and genre links of deleted venues and artists are deleted by
+    the database (ON DELETE CASCADE), without being read.
+    """
+    kind = KINDS[kind_name]
+    batch_size = batch_size or current_app.config.get('IMPORT_BATCH_SIZE', 1000)
+    # Shows going away with the records, to take off the show counters.
+    shows_of = {'venues': Show.venue_id, 'artists': Show.artist_id, 'shows': Show.id}[kind_name]
+    ids = sorted(set(ids))
+    deleted = 0
+    try:
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            uncount_shows(db.session.connection(), shows_of.in_(chunk))
+            deleted += db.session.execute(kind.table.delete().where(kind.table.c.id.in_(chunk))).rowcount
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        raise
+    if deleted:
+        # Core deletes do not fire the mapper events that clear these.
+        view_cache.clear()
+        clear_index()
+    return deleted
+
+
+#  Commands
+#  ----------------------------------------------------------------
+
+@click.command('import')
+@with_appcontext
+@click.argument('kind', type=click.Choice(list(KINDS)))
+@click.argument('file', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default=None,
+              help='File format; guessed from the file name by default.')
+@click.option('--batch-size', type=int, default=None, help='Rows per INSERT and commit.')
+def import_command(kind, file, fmt, batch_size):
+    """Import venues, artists or shows from a CSV or NDJSON file ('-' for stdin)."""
+    def echo_error(line, errors):
+        click.echo('line %d: %s' % (line, '; '.join('%s: %s' % (field, ' '.join(messages))
+                                                     for field, messages in errors.items())), err=True)
+
+    report = import_rows(kind, read_rows(file, fmt or guess_format(file.name)), batch_size=batch_size,
+                         max_errors=0, on_error=echo_error)
+    click.echo('Imported %d %s, %d rows failed.' % (report.inserted, kind, report.failed))
+
+
+@click.command('export')
+@with_appcontext
+@click.argument('kind', type=click.Choice(list(KINDS)))
+@click.argument('file', type=click.File('wb'), default='-')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default=None,
+              help='File format; guessed from the file name by default.')
+def export_command(kind, file, fmt):
+    """Export all venues, artists or shows to a CSV or NDJSON file (stdout by default)."""
+    for chunk in export_rows(kind, fmt or guess_format(file.name)):
+        file.write(chunk)
+
+
+def init_app(app):
+    app.cli.add_command(import_command)
+    app.cli.add_command(export_command)
@@ -0,0 +1,213 @@
+#----------------------------------------------------------------------------#
+# Read-through cache for the view data of the listing pages.
+#
+# View data (the dicts handed to the templates), not rendered pages, is
+# cached: rendered pages also carry the flashed messages of the request.
+# Any insert, update or delete of a Venue, Artist or Show clears the cache
+# of the process that made it. Pages served with an ETag (see conditional.py)
+# key their data by it too: other workers then miss their older entries
+# instead of sending them under the new ETag.
+#----------------------------------------------------------------------------#
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from flask import current_app, g, has_request_context
+from sqlalchemy.orm import Session
+import metrics
+from models import Artist, Venue, Show
+
+
+class LRUCache:
+    """In-process cache holding at most `maxsize` entries for `ttl` seconds each."""
+
+    def __init__(self, maxsize=256, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """(True, value) for a live entry, (False, None) otherwise."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache:
+    """Cache shared by all workers, stored in Redis.
+
+    `client` needs the get/set(ex=)/incr subset of the redis-py client;
+    LocalRedis stands in for it where no Redis server is available.
+    Clearing bumps a generation number that is part of every key, so old
+    entries are never read again and simply expire.
+    """
+
+    def __init__(self, client, ttl=60, prefix='fyyur:cache:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, key):
+        generation = int(self.client.get(self.prefix + 'generation') or 0)
+        return '%s%d:%s' % (self.prefix, generation, key)
+
+    def get(self, key):
+        data = self.client.get(self._key(key))
+        if data is None:
+            return False, None
+        return True, pickle.loads(data)
+
+    def set(self, key, value):
+        self.client.set(self._key(key), pickle.dumps(value), ex=self.ttl)
+
+    def clear(self):
+        self.client.incr(self.prefix + 'generation')
+
+
+class LocalRedis:
+    """In-process stand-in for the part of the redis-py client RedisCache and jobs.RedisBroker use."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+        self._lists = {}
+        self._pushed = threading.Condition(self._lock)
+
+    def get(self, key):
+        with self._lock:
+            value, expires_at = self._data.get(key, (None, None))
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value, None if ex is None else time.monotonic() + ex)
+
+    def incr(self, key):
+        with self._lock:
+            value = int(self._data.get(key, (0, None))[0]) + 1
+            self._data[key] = (value, None)
+            return value
+
+    def rpush(self, key, value):
+        with self._pushed:
+            self._lists.setdefault(key, []).append(value)
+            self._pushed.notify()
+            return len(self._lists[key])
+
+    def blpop(self, keys, timeout=0):
+        # (key, value) from the first non-empty list, waiting up to `timeout`
+        # seconds (0: forever); None on timeout.
+        deadline = time.monotonic() + timeout if timeout else None
+        with self._pushed:
+            while True:
+                for key in keys:
+                    if self._lists.get(key):
+                        return key, self._lists[key].pop(0)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._pushed.wait(remaining)
+
+
+class ViewCache:
+    """Read-through front of a cache backend, counting hits and misses."""
+
+    def __init__(self, backend=None, name='views'):
+        self.backend = backend
+        self.name = name
+
+    def get_or_set(self, key, build):
+        """Cached value of `key`, calling `build()` to fill it on a miss."""
+        if not current_app.config.get('CACHE_ENABLED', True):
+            return build()
+        if has_request_context() and g.get('page_etag'):
+            key = '%s:%s' % (key, g.page_etag)
+        found, value = self.backend.get(key)
+        if found:
+            metrics.cache_requests_total.inc(self.name, 'hit')
+            return value
+        metrics.cache_requests_total.inc(self.name, 'miss')
+        value = build()
+        self.backend.set(key, value)
+        return value
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        """Hits and misses of this process; /metrics sums them over all workers."""
+        hits = metrics.cache_requests_total.value(self.name, 'hit')
+        misses = metrics.cache_requests_total.value(self.name, 'miss')
+        lookups = hits + misses
+        return {'hits': hits,
+                'misses': misses,
+                'hit_ratio': hits / lookups if lookups else 0.0}
+
+
+def make_backend(config):
+    """Cache backend described by CACHE_BACKEND: 'memory', 'redis' or 'local-redis'."""
+    name = config.get('CACHE_BACKEND', 'memory')
+    ttl = config.get('CACHE_TTL', 60)
+    if name == 'redis':
+        import redis
+        return RedisCache(redis.Redis.from_url(config['CACHE_REDIS_URL']), ttl=ttl)
+    if name == 'local-redis':
+        return RedisCache(LocalRedis(), ttl=ttl)
+    return LRUCache(maxsize=config.get('CACHE_MAX_ENTRIES', 256), ttl=ttl)
+
+
+view_cache = ViewCache()
+
+
+def init_app(app):
+    # One cache per process: the backend of the last application built.
+    view_cache.backend = make_backend(app.config)
+
+
+#  Invalidation
+#  ----------------------------------------------------------------
+
+def _invalidate(mapper, connection, target):
+    view_cache.clear()
+    # Clear again once committed: a request may have refilled the cache from
+    # the database in between, without seeing the uncommitted change.
+    Session.object_session(target).info['clear_view_cache'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    if session.info.pop('clear_view_cache', False):
+        view_cache.clear()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_changes(session):
+    session.info.pop('clear_view_cache', None)
+
+
+for _model in (Venue, Artist, Show):
+    for _event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event_name, _invalidate)
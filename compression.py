@@ -0,0 +1,109 @@
+#----------------------------------------------------------------------------#
+# Response compression.
+#
+# HTML, JSON and other text responses are sent compressed with brotli, when
+# the brotli package is installed and the client accepts it, or gzip.
+# Responses under COMPRESS_MIN_SIZE bytes are sent as is: a few hundred
+# bytes do not pay for the work. Streamed responses are compressed chunk by
+# chunk, each one flushed, so the client still gets the page as it renders.
+# Responses already encoded, such as the asset bundles, are left alone.
+#----------------------------------------------------------------------------#
+import zlib
+from flask import current_app, request
+import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def offered_encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compressor(encoding):
+    """(compress, flush, finish) functions of a new `encoding` compressor.
+
+    flush() returns the data held back so far, so that it can be sent
+    before the rest of the body is known; finish() returns the end of it.
+    """
+    if encoding == 'br':
+        state = brotli.Compressor(quality=current_app.config.get('COMPRESS_BROTLI_QUALITY', 4))
+        return state.process, state.flush, state.finish
+    # wbits=31: the gzip format.
+    state = zlib.compressobj(current_app.config.get('COMPRESS_LEVEL', 6), zlib.DEFLATED, 31)
+    return state.compress, lambda: state.flush(zlib.Z_SYNC_FLUSH), state.flush
+
+
+def compress(encoding, data):
+    compress_chunk, _, finish = compressor(encoding)
+    return compress_chunk(data) + finish()
+
+
+def _compress_stream(encoding, chunks):
+    # Made now: the body is produced after the request, without an app context.
+    compress_chunk, flush, finish = compressor(encoding)
+    return _compressed_chunks(encoding, chunks, compress_chunk, flush, finish)
+
+
+def _compressed_chunks(encoding, chunks, compress_chunk, flush, finish):
+    raw = compressed = 0
+    for chunk in chunks:
+        data = compress_chunk(chunk) + flush()
+        raw += len(chunk)
+        compressed += len(data)
+        if data:
+            yield data
+    data = finish()
+    yield data
+    metrics.compression_bytes_total.inc(encoding, 'in', amount=raw)
+    metrics.compression_bytes_total.inc(encoding, 'out', amount=compressed + len(data))
+
+
+def _compressible(response):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return False
+    if response.cache_control.no_transform:
+        return False
+    return response.mimetype in current_app.config.get('COMPRESS_MIMETYPES', ())
+
+
+def compress_response(response):
+    if not current_app.config.get('COMPRESS_ENABLED', True) or not _compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(offered_encodings())
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        # The length is unknown: compress whatever the size.
+        chunks = response.iter_encoded()
+        close = getattr(response.response, 'close', None)
+        if close is not None:
+            response.call_on_close(close)
+        response.response = _compress_stream(encoding, chunks)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config.get('COMPRESS_MIN_SIZE', 500):
+            return response
+        compressed = compress(encoding, data)
+        if len(compressed) >= len(data):
+            return response
+        response.set_data(compressed)
+        metrics.compression_bytes_total.inc(encoding, 'in', amount=len(data))
+        metrics.compression_bytes_total.inc(encoding, 'out', amount=len(compressed))
+    response.content_encoding = encoding
+    # The compressed body differs byte for byte from the original: only a
+    # weak validator still matches it (see conditional.py).
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    app.after_request(compress_response)
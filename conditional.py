@@ -0,0 +1,68 @@
+#----------------------------------------------------------------------------#
+# Conditional GET.
+#
+# Pages decorated with @conditional_get answer If-None-Match and
+# If-Modified-Since with 304 Not Modified from a cheap page state query
+# (see queries.py), before any heavy query or template rendering runs.
+# The ETag of the state is also part of the view cache keys of the request
+# (see cache.py), so that a page is never built from data older than it.
+#----------------------------------------------------------------------------#
+import datetime as dt
+import hashlib
+from functools import wraps
+from flask import Response, current_app, g, make_response, request, session
+
+
+def validators(state):
+    """(etag, last_modified) of the current request's page in the given state."""
+    key = repr((current_app.config.get('CONDITIONAL_GET_VERSION'), request.full_path, state))
+    etag = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    timestamps = [value for value in state if isinstance(value, dt.datetime)]
+    last_modified = max(timestamps).replace(microsecond=0) if timestamps else None
+    return etag, last_modified
+
+
+def is_not_modified(etag, last_modified):
+    if request.if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since.
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        # Stored timestamps are naive UTC.
+        return last_modified.replace(tzinfo=dt.timezone.utc) <= \
+            request.if_modified_since.replace(tzinfo=dt.timezone.utc)
+    return False
+
+
+def conditional_get(page_state):
+    """Serve 304 Not Modified while `page_state(**view_args)` is unchanged.
+
+    `page_state` returns a tuple that changes whenever the page may change,
+    or None to always run the view (e.g. for an unknown id).
+    Pages carrying flashed messages are always rendered in full.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('CONDITIONAL_GET', True) or '_flashes' in session:
+                return view(*args, **kwargs)
+            state = page_state(*args, **kwargs)
+            if state is None:
+                return view(*args, **kwargs)
+            etag, last_modified = validators(state)
+            g.page_etag = etag
+            if is_not_modified(etag, last_modified):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            # Weak: the same page is sent with different encodings (see compression.py).
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # Browsers may keep the page but must revalidate it on every use.
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -1,14 +1,172 @@
 import os
-SECRET_KEY = os.urandom(32)
+from database import engine_options
+
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-# Enable debug mode.
-DEBUG = True
 
-# Connect to the database
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+# The configuration is picked with the FYYUR_CONFIG environment variable:
+# 'development' (default), 'testing' or 'production'. Database settings are
+# read from the environment, see Config below.
+
+class Config:
+    # Share SECRET_KEY between all workers, or sessions and CSRF tokens made
+    # by one worker are rejected by the others.
+    SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(32)
+    DEBUG = False
+
+    # Connect to the database
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql://postgres@localhost:5432/fyyur')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connection pool, per worker process. Keep
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) below the server's max_connections.
+    DB_POOL_SIZE = env_int('DB_POOL_SIZE', 5)
+    DB_MAX_OVERFLOW = env_int('DB_MAX_OVERFLOW', 10)
+    DB_POOL_TIMEOUT = env_int('DB_POOL_TIMEOUT', 30)
+    DB_POOL_RECYCLE = env_int('DB_POOL_RECYCLE', 1800)
+    DB_POOL_PRE_PING = env_bool('DB_POOL_PRE_PING', True)
+    # 0 disables the timeout.
+    DB_STATEMENT_TIMEOUT_MS = env_int('DB_STATEMENT_TIMEOUT_MS', 0)
+    # Connecting through PgBouncer in transaction pooling mode.
+    DB_PGBOUNCER = env_bool('DB_PGBOUNCER', False)
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT, pool_recycle=DB_POOL_RECYCLE, pool_pre_ping=DB_POOL_PRE_PING,
+        statement_timeout_ms=DB_STATEMENT_TIMEOUT_MS, pgbouncer=DB_PGBOUNCER)
+    # Async serving (see asgi.py): the database URL of the asyncio engine,
+    # by default SQLALCHEMY_DATABASE_URI with the asyncpg or aiosqlite driver,
+    # and its pool, sized like the one above.
+    ASYNC_DATABASE_URL = os.environ.get('ASYNC_DATABASE_URL')
+    ASYNC_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT, pool_recycle=DB_POOL_RECYCLE, pool_pre_ping=DB_POOL_PRE_PING,
+        statement_timeout_ms=DB_STATEMENT_TIMEOUT_MS, pgbouncer=DB_PGBOUNCER, asyncio=True)
+
+    # Concurrent read queries of the home and detail pages (see fanout.py):
+    # True, False, or 'auto' to run them concurrently except on SQLite. Each
+    # request may then hold one more connection per query: size the pool for
+    # the threads of a worker plus FAN_OUT_THREADS, shared by its requests.
+    FAN_OUT = 'auto'
+    FAN_OUT_THREADS = env_int('FAN_OUT_THREADS', 8)
+
+    # Number of shows listed per /shows page.
+    SHOWS_PER_PAGE = 60
+    # Stream the /shows page to the client while it is rendered.
+    STREAM_SHOWS = False
+    # Search backend: 'trigram' (PostgreSQL pg_trgm), 'memory' (in-process index)
+    # or 'auto' to pick from the database in use. See search.py.
+    SEARCH_BACKEND = 'auto'
+    # Maximum number of rows listed on a search results page.
+    SEARCH_RESULTS_LIMIT = 50
+    # Cache of the listing pages' view data, cleared on any model change.
+    # CACHE_BACKEND: 'memory' (per process), 'redis' (shared, needs CACHE_REDIS_URL)
+    # or 'local-redis' (in-process stand-in for redis).
+    CACHE_ENABLED = True
+    CACHE_BACKEND = 'memory'
+    CACHE_TTL = 60
+    CACHE_MAX_ENTRIES = 256
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    # Default and maximum number of items per page of the JSON API.
+    API_PAGE_SIZE = 50
+    API_MAX_PAGE_SIZE = 200
+    # Longest period, in days, of one free-slots request of the JSON API.
+    FREE_SLOTS_MAX_DAYS = 366
+    # Where the static asset bundles are written (see assets.py).
+    ASSETS_DIR = os.environ.get('ASSETS_DIR', os.path.join(basedir, 'build', 'assets'))
+    # Compression of text responses (see compression.py): gzip level 1-9,
+    # brotli quality 0-11 when the brotli package is installed, and the
+    # smallest body compressed. Streamed responses are always compressed.
+    COMPRESS_ENABLED = True
+    COMPRESS_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 4
+    COMPRESS_MIN_SIZE = 500
+    COMPRESS_MIMETYPES = ('text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript',
+                          'application/javascript', 'application/json', 'application/x-ndjson')
+    # Bulk import and export (see bulk.py): rows per INSERT and commit, and
+    # number of failed rows detailed in an import report.
+    IMPORT_BATCH_SIZE = 1000
+    IMPORT_MAX_ERRORS = 100
+    # Background jobs (see jobs.py). JOB_BROKER: 'memory' (per process),
+    # 'redis' (shared, needs JOB_REDIS_URL; run `flask jobs work` to consume
+    # it elsewhere), 'local-redis' (in-process stand-in for redis) or
+    # 'inline' (run jobs in the request). Failed jobs are retried after
+    # JOB_RETRY_SECONDS, doubled at each attempt.
+    JOB_BROKER = 'memory'
+    JOB_REDIS_URL = os.environ.get('JOB_REDIS_URL', 'redis://localhost:6379/0')
+    JOB_WORKERS = env_int('JOB_WORKERS', 2)
+    JOB_MAX_ATTEMPTS = 5
+    JOB_RETRY_SECONDS = 30
+    JOB_POLL_SECONDS = 10
+    # Check the image links of new and edited venues and artists in the background.
+    CHECK_IMAGE_LINKS = True
+    IMAGE_LINK_TIMEOUT = 10
+    # Answer conditional GETs of the read-only pages with 304 Not Modified.
+    # Bump CONDITIONAL_GET_VERSION when templates change to invalidate browser copies.
+    CONDITIONAL_GET = True
+    CONDITIONAL_GET_VERSION = 1
+    # Per-request SQL profiling (see profiling.py): Server-Timing header, a log
+    # line per request, and a warning above these budgets.
+    PROFILING_ENABLED = True
+    PROFILING_MAX_STATEMENTS = 20
+    PROFILING_MAX_DB_MS = 200
+    PROFILING_SLOWEST_STATEMENTS = 3
+    # Directory shared by the workers of one server, where each worker dumps
+    # its metrics every METRICS_DUMP_SECONDS for /metrics to sum them.
+    # Empty it when the server restarts. Unset: /metrics reports one process.
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_DUMP_SECONDS = 5
+
+
+class DevelopmentConfig(Config):
+    # Enable debug mode.
+    DEBUG = True
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite://')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    ASYNC_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI, asyncio=True)
+    WTF_CSRF_ENABLED = False
+    CACHE_ENABLED = False
+    JOB_BROKER = 'inline'
+    CHECK_IMAGE_LINKS = False
+
+
+class ProductionConfig(Config):
+    # Must be set in the environment, see Config.SECRET_KEY.
+    SECRET_KEY = os.environ.get('SECRET_KEY')
+    DB_STATEMENT_TIMEOUT_MS = env_int('DB_STATEMENT_TIMEOUT_MS', 30000)
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        Config.SQLALCHEMY_DATABASE_URI, pool_size=Config.DB_POOL_SIZE, max_overflow=Config.DB_MAX_OVERFLOW,
+        pool_timeout=Config.DB_POOL_TIMEOUT, pool_recycle=Config.DB_POOL_RECYCLE,
+        pool_pre_ping=Config.DB_POOL_PRE_PING, statement_timeout_ms=DB_STATEMENT_TIMEOUT_MS,
+        pgbouncer=Config.DB_PGBOUNCER)
+    ASYNC_ENGINE_OPTIONS = engine_options(
+        Config.SQLALCHEMY_DATABASE_URI, pool_size=Config.DB_POOL_SIZE, max_overflow=Config.DB_MAX_OVERFLOW,
+        pool_timeout=Config.DB_POOL_TIMEOUT, pool_recycle=Config.DB_POOL_RECYCLE,
+        pool_pre_ping=Config.DB_POOL_PRE_PING, statement_timeout_ms=DB_STATEMENT_TIMEOUT_MS,
+        pgbouncer=Config.DB_PGBOUNCER, asyncio=True)
+
+
+configs = {
+    'development': DevelopmentConfig,
+    'testing': TestingConfig,
+    'production': ProductionConfig,
+}
 
 
-# IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgresql://postgres@localhost:5432/fyyur'
-SQLALCHEMY_TRACK_MODIFICATIONS = False
+def get_config(name=None):
+    """Config class named `name`, or by the FYYUR_CONFIG environment variable."""
+    return configs[name or os.environ.get('FYYUR_CONFIG', 'development')]
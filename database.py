@@ -0,0 +1,85 @@
+#----------------------------------------------------------------------------#
+# Database engine options.
+#----------------------------------------------------------------------------#
+import sqlite3
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+import metrics
+
+# Drivers of the asyncio engine (see asgi.py), by database.
+ASYNC_DRIVERS = {'postgresql': 'asyncpg', 'sqlite': 'aiosqlite'}
+
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores foreign keys, and so ON DELETE CASCADE, unless asked to
+    # enforce them on each connection.
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
+class _TimedCheckout:
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.pool_checkout_seconds.observe(time.perf_counter() - start)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    """QueuePool recording how long each checkout waits for a connection."""
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    """The same, for the asyncio engine."""
+
+
+def async_database_uri(database_uri):
+    """`database_uri` with the asyncio driver of its database, e.g.
+    postgresql://... -> postgresql+asyncpg://..."""
+    scheme, separator, rest = database_uri.partition('://')
+    database = scheme.split('+')[0]
+    if database not in ASYNC_DRIVERS:
+        raise ValueError('No asyncio driver for %s databases.' % database)
+    return '%s+%s%s%s' % (database, ASYNC_DRIVERS[database], separator, rest)
+
+
+def engine_options(database_uri, pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=1800,
+                   pool_pre_ping=True, statement_timeout_ms=0, pgbouncer=False, asyncio=False):
+    """SQLALCHEMY_ENGINE_OPTIONS for `database_uri`.
+
+    Pool settings only apply to PostgreSQL; other databases keep the
+    Flask-SQLAlchemy defaults. In PgBouncer mode PgBouncer does the pooling,
+    so connections are not pooled here and no startup options are sent:
+    PgBouncer rejects them, and in transaction mode session state such as
+    prepared statements cannot be relied on. Configure statement timeouts on
+    the database role instead.
+
+    With `asyncio`, the options are for create_async_engine() and asyncpg.
+    """
+    if not database_uri.startswith('postgresql'):
+        return {}
+    if pgbouncer:
+        if asyncio:
+            # asyncpg prepares statements on the connection it got from PgBouncer.
+            return {'poolclass': NullPool, 'connect_args': {'statement_cache_size': 0}}
+        return {'poolclass': NullPool}
+    options = {
+        'poolclass': TimedAsyncQueuePool if asyncio else TimedQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': pool_timeout,
+        'pool_recycle': pool_recycle,
+        'pool_pre_ping': pool_pre_ping,
+    }
+    if statement_timeout_ms and asyncio:
+        options['connect_args'] = {'server_settings': {'statement_timeout': str(statement_timeout_ms)}}
+    elif statement_timeout_ms:
+        options['connect_args'] = {'options': '-c statement_timeout=%d' % statement_timeout_ms}
+    return options
@@ -0,0 +1,142 @@
+#----------------------------------------------------------------------------#
+# Concurrent read queries.
+#
+# fan_out() runs independent read queries at the same time, each in a
+# session, and so on a pooled connection, of its own:
+#
+#   results = fan_out(recent_artists=lambda: ..., recent_venues=lambda: ...)
+#
+# A page then waits for its slowest query instead of their sum. Queries run
+# on a thread pool shared by the requests of the process; under asgi.py,
+# they are awaited together on the asyncio engine instead. Each query's time
+# goes to /metrics and, per request, to Server-Timing (see profiling.py).
+#
+# Objects returned by a query come from a session closed since: load all
+# that is used of them, relationships included.
+#----------------------------------------------------------------------------#
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, g
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.pool import NullPool
+from sqlalchemy.util import await_only
+from app_bootstrapping import db
+import metrics
+
+
+def fan_out(**queries):
+    """Run `queries`, {name: function returning a query's result}, at the
+    same time; return {name: result}.
+
+    The functions read through db.session and Model.query as usual. They
+    run one after the other in the current session when FAN_OUT is off,
+    which 'auto' means on SQLite: a database in the process has no round
+    trips to overlap.
+    """
+    engine = g.get('async_engine')
+    if len(queries) > 1 and _concurrent(engine.sync_engine if engine is not None else db.engine):
+        if engine is not None:
+            timed = _fan_out_async(engine, queries)
+        else:
+            timed = _fan_out_threads(queries)
+    else:
+        timed = {name: _timed(query) for name, query in queries.items()}
+
+    stats = g.get('query_stats')
+    results = dict()
+    for name, (result, seconds) in timed.items():
+        metrics.fan_out_query_seconds.observe(seconds, name)
+        if stats is not None:
+            stats.time_query(name, seconds)
+        results[name] = result
+    return results
+
+
+def in_session(session, function, *args, **kwargs):
+    """Call `function` with db.session and Model.query reading through `session`.
+
+    For AsyncSession.run_sync(): it runs `function` in a greenlet, where
+    Flask-SQLAlchemy's scoped session has a scope of its own, and awaits
+    every statement on the event loop.
+    """
+    db.session.registry.set(session)
+    try:
+        return function(*args, **kwargs)
+    finally:
+        db.session.registry.clear()
+
+
+def _concurrent(engine):
+    setting = current_app.config.get('FAN_OUT', 'auto')
+    if engine.dialect.name == 'sqlite':
+        # A SQLite connection only serves the thread that opened it: only
+        # unpooled connections can be opened by each query.
+        return setting is True and isinstance(engine.pool, NullPool)
+    return setting == 'auto' or bool(setting)
+
+
+def _timed(query):
+    start = time.perf_counter()
+    result = query()
+    return result, time.perf_counter() - start
+
+
+#  Threads
+#  ----------------------------------------------------------------
+
+def _fan_out_threads(queries):
+    # The first query runs in this thread and session, the others on the pool.
+    app = current_app._get_current_object()
+    stats = g.get('query_stats')
+    (first_name, first), *others = queries.items()
+    futures = [(name, _executor().submit(_run_in_app, app, stats, query)) for name, query in others]
+    timed = {first_name: _timed(first)}
+    for name, future in futures:
+        timed[name] = future.result()
+    return timed
+
+
+def _run_in_app(app, stats, query):
+    # The session of this app context is removed when it is popped.
+    with app.app_context():
+        if stats is not None:
+            g.query_stats = stats
+        return _timed(query)
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(current_app.config.get('FAN_OUT_THREADS', 8), thread_name_prefix='fan-out')
+        return _pool
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _forget_pool():
+    # A forked child has none of its parent's threads.
+    global _pool
+    _pool = None
+
+
+os.register_at_fork(after_in_child=_forget_pool)
+
+
+#  asyncio
+#  ----------------------------------------------------------------
+
+def _fan_out_async(engine, queries):
+    # Called from a view run by asgi.py, in SQLAlchemy's greenlet: the
+    # queries are awaited together, each in an AsyncSession of its own.
+    async def run(query):
+        async with AsyncSession(engine) as session:
+            return await session.run_sync(in_session, _timed, query)
+
+    timed = await_only(asyncio.gather(*[run(query) for query in queries.values()]))
+    return dict(zip(queries, timed))
@@ -2,6 +2,13 @@ from datetime import datetime
 from flask_wtf import FlaskForm
 from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
 from wtforms.validators import DataRequired, AnyOf, URL, ValidationError, Regexp, Optional
+from queries import genre_ids
+
+
+def genre_choices():
+    # Cached with the genres, see queries.genre_ids().
+    return [(name, name) for name in genre_ids()]
+
 
 class ShowForm(FlaskForm):
     artist_id = StringField(
@@ -30,6 +37,10 @@ class ShowForm(FlaskForm):
 
 class VenueForm(FlaskForm):
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.genres.choices = genre_choices()
+
     # def validate_phone(form, field):
     #     phone_parts = field.data.split('-')
     #     if len(phone_parts) != 3:
@@ -125,27 +136,8 @@ class VenueForm(FlaskForm):
         # https://brandnewcalkingbedframe.blogspot.com/2022/06/python-flask-wtform-selectfield-with.html?m=1
         # https://www.google.com/search?client=firefox-b-e&q=flask+wtf+enum
         'genres', validators=[DataRequired()],
-        choices=[
-            ('Alternative', 'Alternative'),
-            ('Blues', 'Blues'),
-            ('Classical', 'Classical'),
-            ('Country', 'Country'),
-            ('Electronic', 'Electronic'),
-            ('Folk', 'Folk'),
-            ('Funk', 'Funk'),
-            ('Hip-Hop', 'Hip-Hop'),
-            ('Heavy Metal', 'Heavy Metal'),
-            ('Instrumental', 'Instrumental'),
-            ('Jazz', 'Jazz'),
-            ('Musical Theatre', 'Musical Theatre'),
-            ('Pop', 'Pop'),
-            ('Punk', 'Punk'),
-            ('R&B', 'R&B'),
-            ('Reggae', 'Reggae'),
-            ('Rock n Roll', 'Rock n Roll'),
-            ('Soul', 'Soul'),
-            ('Other', 'Other'),
-        ]
+        # Filled from the genres table, see genre_choices().
+        choices=[]
     )
     facebook_link = StringField(
         'facebook_link', validators=[URL(), Optional()]
@@ -162,6 +154,11 @@ class VenueForm(FlaskForm):
 
 
 class ArtistForm(FlaskForm):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.genres.choices = genre_choices()
+
     name = StringField(
         'name', validators=[DataRequired()]
     )
@@ -233,27 +230,8 @@ class ArtistForm(FlaskForm):
     )
     genres = SelectMultipleField(
         'genres', validators=[DataRequired()],
-        choices=[
-            ('Alternative', 'Alternative'),
-            ('Blues', 'Blues'),
-            ('Classical', 'Classical'),
-            ('Country', 'Country'),
-            ('Electronic', 'Electronic'),
-            ('Folk', 'Folk'),
-            ('Funk', 'Funk'),
-            ('Hip-Hop', 'Hip-Hop'),
-            ('Heavy Metal', 'Heavy Metal'),
-            ('Instrumental', 'Instrumental'),
-            ('Jazz', 'Jazz'),
-            ('Musical Theatre', 'Musical Theatre'),
-            ('Pop', 'Pop'),
-            ('Punk', 'Punk'),
-            ('R&B', 'R&B'),
-            ('Reggae', 'Reggae'),
-            ('Rock n Roll', 'Rock n Roll'),
-            ('Soul', 'Soul'),
-            ('Other', 'Other'),
-        ]
+        # Filled from the genres table, see genre_choices().
+        choices=[]
      )
     facebook_link = StringField(
         # TODO implement enum restriction
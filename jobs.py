@@ -0,0 +1,441 @@
+#----------------------------------------------------------------------------#
+# Background jobs.
+#
+# Write handlers enqueue their slow follow-up work, e.g. warming the view
+# cache or checking image links, and return without waiting for it:
+#
+#   enqueue('warm_view_cache', dedupe=True)
+#
+# Jobs are messages on a broker (JOB_BROKER), run by a pool of JOB_WORKERS
+# worker threads in each process. A job that raises is stored in the
+# job_retries table and put back on the queue later, with exponential
+# backoff, until JOB_MAX_ATTEMPTS. Queued jobs of the 'memory' broker live in
+# the process and are lost when it exits; failed jobs are not.
+#----------------------------------------------------------------------------#
+import datetime as dt
+import ipaddress
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import click
+from flask import current_app, g, has_app_context
+from flask.cli import AppGroup
+from sqlalchemy.exc import SQLAlchemyError
+from app_bootstrapping import db
+from cache import LocalRedis, view_cache
+from conditional import validators
+import metrics
+from models import Artist, JobRetry, Show, Venue
+from queries import artist_listing, recent_listings, table_state, venue_areas
+from search import warm_index
+
+logger = logging.getLogger('fyyur.jobs')
+
+registry = {}
+
+
+def job(name):
+    """Register the decorated function as the background job `name`."""
+    def register(function):
+        registry[name] = function
+        return function
+    return register
+
+
+class MemoryBroker:
+    """Queue of this process, read by its own worker threads."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def push(self, message):
+        self._queue.put(message)
+
+    def pop(self, timeout):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class RedisBroker:
+    """Queue shared by all processes, stored in a Redis list.
+
+    `client` needs the rpush/blpop subset of the redis-py client; LocalRedis
+    stands in for it where no Redis server is available.
+    """
+
+    def __init__(self, client, key='fyyur:jobs'):
+        self.client = client
+        self.key = key
+
+    def push(self, message):
+        self.client.rpush(self.key, json.dumps(message))
+
+    def pop(self, timeout):
+        item = self.client.blpop([self.key], timeout=max(1, int(timeout)))
+        return None if item is None else json.loads(item[1])
+
+
+def make_broker(config):
+    """Broker described by JOB_BROKER: 'memory', 'redis', 'local-redis', or None for 'inline'."""
+    name = config.get('JOB_BROKER', 'memory')
+    if name == 'inline':
+        return None
+    if name == 'redis':
+        import redis
+        return RedisBroker(redis.Redis.from_url(config['JOB_REDIS_URL']))
+    if name == 'local-redis':
+        return RedisBroker(LocalRedis())
+    return MemoryBroker()
+
+
+class JobQueue:
+    """Enqueues jobs on a broker and runs them on a pool of worker threads.
+
+    Without a broker, jobs run inline when enqueued, which suits tests.
+    Worker threads run jobs in an app context of `app`; without one, the
+    queue runs in the app context of its caller.
+    """
+
+    def __init__(self, broker=None, workers=2, app=None):
+        self.broker = broker
+        self.workers = workers
+        self.app = app
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        # (name, kwargs) of the queued jobs enqueued with dedupe=True.
+        self._pending = set()
+
+    @property
+    def _app(self):
+        return self.app if self.app is not None else current_app._get_current_object()
+
+    def init_app(self, app):
+        self.app = app
+        self.broker = make_broker(app.config)
+        self.workers = app.config.get('JOB_WORKERS', 2)
+
+    def enqueue(self, name, dedupe=False, **kwargs):
+        """Run the job `name` with the JSON serializable `kwargs` in the background.
+
+        With `dedupe`, the job is not enqueued again while the same job,
+        with the same kwargs, is still waiting in this process' queue.
+        Never raises for broker errors: the job is then stored for retry.
+        """
+        if name not in registry:
+            raise KeyError('No job named %r' % name)
+        message = {'name': name, 'kwargs': kwargs, 'enqueued_at': time.time(), 'attempts': 0}
+        if self.broker is None:
+            self.run(message)
+            return
+        if dedupe:
+            key = (name, json.dumps(kwargs, sort_keys=True))
+            with self._lock:
+                if key in self._pending:
+                    return
+                self._pending.add(key)
+            message['dedupe'] = True
+        self.start()
+        self._push(message)
+
+    def _push(self, message):
+        try:
+            self.broker.push(message)
+        except Exception as exc:
+            logger.exception('could not enqueue job %s', message['name'])
+            self._forget_pending(message)
+            self._store(message, message['attempts'], exc, delay=0)
+            return
+        metrics.jobs_queued.inc(message['name'])
+
+    def _forget_pending(self, message):
+        if message.get('dedupe'):
+            with self._lock:
+                self._pending.discard((message['name'], json.dumps(message['kwargs'], sort_keys=True)))
+
+    def run(self, message):
+        """Run one job message; on error, store it for retry. True if it succeeded."""
+        name = message['name']
+        self._forget_pending(message)
+        metrics.job_wait_seconds.observe(max(0.0, time.time() - message['enqueued_at']), name)
+        started_at = time.perf_counter()
+        try:
+            if has_app_context():
+                # Inline: runs in the request, on its session.
+                registry[name](**message['kwargs'])
+            else:
+                with self._app.app_context():
+                    try:
+                        registry[name](**message['kwargs'])
+                    finally:
+                        db.session.remove()
+        except Exception as exc:
+            metrics.job_run_seconds.observe(time.perf_counter() - started_at, name)
+            attempts = message['attempts'] + 1
+            give_up = attempts >= self._app.config.get('JOB_MAX_ATTEMPTS', 5)
+            metrics.jobs_total.inc(name, 'failed' if give_up else 'retried')
+            logger.warning('job %s failed (attempt %d): %r', name, attempts, exc)
+            self._store(message, attempts, exc, give_up=give_up)
+            return False
+        metrics.job_run_seconds.observe(time.perf_counter() - started_at, name)
+        metrics.jobs_total.inc(name, 'succeeded')
+        if message.get('retry_id'):
+            self._with_session(lambda session: session.query(JobRetry).filter_by(id=message['retry_id']).delete())
+        return True
+
+    def _store(self, message, attempts, exc, delay=None, give_up=False):
+        # Keep a failed job in job_retries until its next attempt is due.
+        if delay is None:
+            delay = self._app.config.get('JOB_RETRY_SECONDS', 30) * 2 ** (attempts - 1)
+
+        def store(session):
+            retry = session.query(JobRetry).get(message['retry_id']) if message.get('retry_id') else None
+            if retry is None:
+                retry = JobRetry(name=message['name'], payload=json.dumps(message['kwargs']))
+                session.add(retry)
+            retry.attempts = attempts
+            retry.status = 'failed' if give_up else 'waiting'
+            retry.run_at = dt.datetime.utcnow() + dt.timedelta(seconds=delay)
+            retry.last_error = repr(exc)[:2000]
+
+        self._with_session(store)
+
+    def _with_session(self, change):
+        # Commit `change(session)` on a session of its own: inline, the
+        # request's session keeps its pending work.
+        if has_app_context():
+            self._commit(change)
+        else:
+            with self._app.app_context():
+                self._commit(change)
+
+    @staticmethod
+    def _commit(change):
+        session = db.session.session_factory()
+        try:
+            change(session)
+            session.commit()
+        except SQLAlchemyError:
+            logger.exception('could not update the job_retries table')
+            session.rollback()
+        finally:
+            session.close()
+
+    def requeue_due(self, now=None, failed=False):
+        """Put the stored jobs that are due back on the queue; return their number.
+
+        With `failed`, jobs that used up their attempts are retried too.
+        Claiming a row pushes its run_at forward, so several processes can
+        poll the table without running a job twice, and a job lost with its
+        process comes back once that time has passed.
+        """
+        if now is None:
+            now = dt.datetime.utcnow()
+        statuses = ['waiting', 'queued'] + (['failed'] if failed else [])
+        due = JobRetry.query.filter(JobRetry.status.in_(statuses), JobRetry.run_at <= now) \
+            .order_by(JobRetry.run_at).limit(self._app.config.get('JOB_REQUEUE_BATCH', 100)).all()
+        claim_until = now + dt.timedelta(seconds=self._app.config.get('JOB_CLAIM_SECONDS', 600))
+        requeued = 0
+        for retry in due:
+            message = {'name': retry.name, 'kwargs': json.loads(retry.payload), 'enqueued_at': time.time(),
+                       'attempts': 0 if retry.status == 'failed' else retry.attempts,
+                       'retry_id': retry.id}
+            claimed = JobRetry.query.filter(JobRetry.id == retry.id, JobRetry.run_at == retry.run_at) \
+                .update({'status': 'queued', 'run_at': claim_until}, synchronize_session=False)
+            db.session.commit()
+            if not claimed:
+                continue
+            if self.broker is None:
+                self.run(message)
+            else:
+                self._push(message)
+            requeued += 1
+        return requeued
+
+    #  Worker threads
+    #  ------------------------------------------------------------
+
+    def start(self):
+        """Start the worker threads, once per process (again in a forked worker)."""
+        if self._pid == os.getpid() or self.broker is None or self.workers <= 0:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            threads = [threading.Thread(target=self._work, name='fyyur-jobs-%d' % i, daemon=True)
+                       for i in range(self.workers)]
+            threads.append(threading.Thread(target=self._poll, name='fyyur-jobs-retries', daemon=True))
+            for thread in threads:
+                thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._pid = None
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                message = self.broker.pop(timeout=1)
+            except Exception:
+                logger.exception('could not read the job queue')
+                self._stopping.wait(1)
+                continue
+            if message is None:
+                continue
+            metrics.jobs_queued.dec(message['name'])
+            self.run(message)
+
+    def _poll(self):
+        while not self._stopping.wait(self._app.config.get('JOB_POLL_SECONDS', 10)):
+            try:
+                with self._app.app_context():
+                    try:
+                        self.requeue_due()
+                    finally:
+                        db.session.remove()
+            except Exception:
+                logger.exception('could not requeue the due jobs')
+
+
+# One queue per process, set up by init_app() for the last application built.
+job_queue = JobQueue()
+enqueue = job_queue.enqueue
+
+
+#  Jobs
+#  ----------------------------------------------------------------
+
+@job('warm_view_cache')
+def warm_view_cache():
+    # Rebuild the listing pages' view data, and the in-process search index,
+    # after a write cleared them, so that the next visitors do not wait.
+    # Only useful where the cache is shared with the web process: with the
+    # 'memory' cache and broker, or a Redis cache. The entries are keyed by
+    # the pages' ETags, as the views key them.
+    pages = (('/', 'index', lambda: table_state(Artist, Venue), recent_listings),
+             ('/venues', 'venues:%s' % None, lambda: table_state(Venue, Show), venue_areas),
+             ('/artists', 'artists:%s' % None, lambda: table_state(Artist), artist_listing))
+    for path, key, state, build in pages:
+        # An inline job shares g with the request that enqueued it.
+        outer_etag = g.pop('page_etag', None)
+        try:
+            with current_app.test_request_context(path):
+                if current_app.config.get('CONDITIONAL_GET', True):
+                    g.page_etag = validators(state())[0]
+                view_cache.get_or_set(key, build)
+        finally:
+            g.page_etag = outer_etag
+    warm_index()
+
+
+class UnsafeLink(ValueError):
+    """A link the workers must not fetch."""
+
+
+def check_public_url(url):
+    """Raise UnsafeLink unless `url` is http(s) on a host with public addresses only.
+
+    Links are user input: without this, a submitted form could make the
+    workers fetch file:// URLs or addresses of the internal network.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise UnsafeLink('not an http(s) URL: %s' % url)
+    try:
+        addresses = socket.getaddrinfo(parts.hostname, None, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError) as exc:
+        raise UnsafeLink('unknown host %s: %s' % (parts.hostname, exc))
+    for address in addresses:
+        ip = ipaddress.ip_address(address[4][0].split('%')[0])
+        if not ip.is_global or ip.is_multicast:
+            raise UnsafeLink('%s resolves to the non-public address %s' % (parts.hostname, ip))
+
+
+class _PublicRedirectHandler(urllib.request.HTTPRedirectHandler):
+    # A public link may redirect to an internal one: check every hop.
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_public_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+_link_opener = urllib.request.build_opener(_PublicRedirectHandler)
+
+
+@job('check_image_link')
+def check_image_link(kind, entity_id):
+    # Log a warning when the image link of a venue or artist is broken or
+    # unsafe to fetch. Network errors raise, so the check is retried later.
+    entity = (Venue if kind == 'venue' else Artist).query.get(entity_id)
+    if entity is None or not entity.image_link:
+        return
+    try:
+        check_public_url(entity.image_link)
+        request = urllib.request.Request(entity.image_link, method='HEAD',
+                                         headers={'User-Agent': 'fyyur-link-check'})
+        with _link_opener.open(request, timeout=current_app.config.get('IMAGE_LINK_TIMEOUT', 10)) as response:
+            status = getattr(response, 'status', None)
+    except UnsafeLink as exc:
+        logger.warning(json.dumps({'message': 'unsafe image link', 'kind': kind, 'id': entity_id,
+                                   'image_link': entity.image_link, 'reason': str(exc)}))
+        return
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    # No status: not an HTTP answer.
+    if status is None or status >= 400:
+        logger.warning(json.dumps({'message': 'broken image link', 'kind': kind, 'id': entity_id,
+                                   'image_link': entity.image_link, 'status': status}))
+
+
+#  Commands
+#  ----------------------------------------------------------------
+
+jobs_cli = AppGroup('jobs', help='Background jobs.')
+
+
+@jobs_cli.command('work')
+@click.option('--workers', type=int, default=None, help='Worker threads (default: JOB_WORKERS).')
+def work_command(workers):
+    """Run jobs of a shared broker ('redis' or 'local-redis') until interrupted."""
+    if not isinstance(job_queue.broker, RedisBroker):
+        raise click.ClickException('JOB_BROKER is %s: only the web processes can run its jobs.'
+                                   % current_app.config.get('JOB_BROKER'))
+    if workers is not None:
+        job_queue.workers = workers
+    job_queue.start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        job_queue.stop()
+
+
+@jobs_cli.command('retry')
+@click.option('--failed', is_flag=True, help='Also retry jobs that used up their attempts.')
+def retry_command(failed):
+    """Run the stored jobs that are due now, in this process."""
+    click.echo('Ran %d jobs.' % JobQueue().requeue_due(failed=failed))
+
+
+@jobs_cli.command('list')
+def list_command():
+    """List the stored jobs waiting for retry or failed."""
+    for retry in JobRetry.query.order_by(JobRetry.run_at):
+        click.echo('%d %s %s attempts=%d run_at=%s %s' % (retry.id, retry.name, retry.status, retry.attempts,
+                                                          retry.run_at.isoformat(), retry.last_error or ''))
+
+
+def init_app(app):
+    job_queue.init_app(app)
+    app.cli.add_command(jobs_cli)
@@ -0,0 +1,326 @@
+#----------------------------------------------------------------------------#
+# Process metrics, exposed in the Prometheus text format at /metrics.
+#
+# Updates take no lock: every thread writes to its own shard, and a snapshot
+# sums the shards. The shards of exited threads are folded into a base total
+# and dropped. Under gunicorn, each worker also dumps its snapshot to
+# METRICS_DIR (see dump()), and /metrics sums the snapshots of all workers.
+# init_app() times every request.
+#----------------------------------------------------------------------------#
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from flask import current_app, g, request
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        # {thread: {labelvalues: values}} of the live threads that updated
+        # the metric, and the sums of the threads that exited since.
+        self._shards = {}
+        self._base = {}
+        # Taken once per thread, and by snapshots.
+        self._lock = threading.Lock()
+
+    def _series(self, labelvalues):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                # Servers may start a thread per request: drop the exited ones here too.
+                self._fold_exited()
+                self._shards[threading.current_thread()] = shard
+        values = shard.get(labelvalues)
+        if values is None:
+            values = shard[labelvalues] = self._zero()
+        return values
+
+    def _fold_exited(self):
+        # An exited thread no longer updates its shard: add it to the base.
+        for thread in [thread for thread in self._shards if not thread.is_alive()]:
+            self._add(self._base, self._shards.pop(thread))
+
+    def _add(self, total, shard):
+        for labelvalues, values in list(shard.items()):
+            summed = total.setdefault(labelvalues, self._zero())
+            for i, value in enumerate(list(values)):
+                summed[i] += value
+
+    def snapshot(self):
+        """{labelvalues: values} summed over all threads."""
+        with self._lock:
+            self._fold_exited()
+            total = {}
+            self._add(total, self._base)
+            for shard in self._shards.values():
+                self._add(total, shard)
+        return total
+
+
+class Counter(Metric):
+    """Monotonic count, optionally split by labels."""
+    kind = 'counter'
+
+    def _zero(self):
+        return [0]
+
+    def inc(self, *labelvalues, amount=1):
+        self._series(labelvalues)[0] += amount
+
+    def value(self, *labelvalues):
+        return self.snapshot().get(labelvalues, [0])[0]
+
+
+class Gauge(Metric):
+    """Value that goes up and down, optionally split by labels.
+
+    Only relative updates: each thread keeps its own running total, and the
+    totals of all threads (and processes) add up to the value.
+    """
+    kind = 'gauge'
+
+    def _zero(self):
+        return [0]
+
+    def inc(self, *labelvalues, amount=1):
+        self._series(labelvalues)[0] += amount
+
+    def dec(self, *labelvalues, amount=1):
+        self._series(labelvalues)[0] -= amount
+
+    def value(self, *labelvalues):
+        return self.snapshot().get(labelvalues, [0])[0]
+
+
+class Histogram(Metric):
+    """Distribution of observed values, optionally split by labels."""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _zero(self):
+        # Count per bucket, values above the last bucket, then sum and count.
+        return [0] * (len(self.buckets) + 1) + [0.0, 0]
+
+    def observe(self, value, *labelvalues):
+        series = self._series(labelvalues)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+
+registry = []
+
+
+def counter(name, documentation, labelnames=()):
+    """Create a counter and register it for /metrics."""
+    metric = Counter(name, documentation, labelnames)
+    registry.append(metric)
+    return metric
+
+
+def gauge(name, documentation, labelnames=()):
+    """Create a gauge and register it for /metrics."""
+    metric = Gauge(name, documentation, labelnames)
+    registry.append(metric)
+    return metric
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """Create a histogram and register it for /metrics."""
+    metric = Histogram(name, documentation, labelnames, buckets)
+    registry.append(metric)
+    return metric
+
+
+#  Snapshots and aggregation across processes
+#  ----------------------------------------------------------------
+
+def snapshot():
+    """JSON-serializable snapshot of every registered metric of this process."""
+    return {metric.name: [[list(labelvalues), values] for labelvalues, values in metric.snapshot().items()]
+            for metric in registry}
+
+
+def merge(snapshots):
+    """Sum snapshots, e.g. of several worker processes, into one."""
+    total = {}
+    for data in snapshots:
+        for name, series in data.items():
+            merged = total.setdefault(name, {})
+            for labelvalues, values in series:
+                summed = merged.setdefault(tuple(labelvalues), [0] * len(values))
+                for i, value in enumerate(values):
+                    summed[i] += value
+    return {name: [[list(labelvalues), values] for labelvalues, values in merged.items()]
+            for name, merged in total.items()}
+
+
+def dump(directory):
+    """Write this process' snapshot to `directory`, replacing its previous one."""
+    fd, path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(snapshot(), f)
+    os.replace(path, os.path.join(directory, 'metrics-%d.json' % os.getpid()))
+
+
+def collect(directory=None):
+    """Snapshot of this process, or the sum over all processes dumping to `directory`.
+
+    Snapshots of exited workers stay in the directory so that totals never
+    go down; empty it when the whole server is restarted. Their gauges are
+    left out: what they counted, e.g. queued jobs, left with them.
+    """
+    if directory is None:
+        return snapshot()
+    dump(directory)
+    gauges = set(metric.name for metric in registry if metric.kind == 'gauge')
+    snapshots = list()
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # Being replaced by its worker.
+            continue
+        pid = os.path.basename(path)[len('metrics-'):-len('.json')]
+        if pid.isdigit() and not _is_running(int(pid)):
+            data = {name: series for name, series in data.items() if name not in gauges}
+        snapshots.append(data)
+    return merge(snapshots)
+
+
+def _is_running(pid):
+    # A pid reused by another process counts as running.
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+#  Exposition
+#  ----------------------------------------------------------------
+
+def _labels(pairs):
+    return '{%s}' % ','.join('%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                             for name, value in pairs) if pairs else ''
+
+
+def render(data=None):
+    """Metrics of a snapshot (default: this process) in the Prometheus text format."""
+    if data is None:
+        data = snapshot()
+    lines = list()
+    for metric in registry:
+        lines.append('# HELP %s %s' % (metric.name, metric.documentation))
+        lines.append('# TYPE %s %s' % (metric.name, metric.kind))
+        for labelvalues, values in sorted(data.get(metric.name, []), key=lambda series: series[0]):
+            labels = list(zip(metric.labelnames, labelvalues))
+            if metric.kind in ('counter', 'gauge'):
+                lines.append('%s%s %s' % (metric.name, _labels(labels), values[0]))
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets, values):
+                cumulative += count
+                lines.append('%s_bucket%s %d' % (metric.name, _labels(labels + [('le', repr(bound))]), cumulative))
+            lines.append('%s_bucket%s %d' % (metric.name, _labels(labels + [('le', '+Inf')]), values[-1]))
+            lines.append('%s_sum%s %r' % (metric.name, _labels(labels), values[-2]))
+            lines.append('%s_count%s %d' % (metric.name, _labels(labels), values[-1]))
+    lines.extend(_cache_hit_ratios(data))
+    return '\n'.join(lines) + '\n'
+
+
+def _cache_hit_ratios(data):
+    # Hit ratio of each cache, derived from cache_requests_total.
+    lookups = {}
+    for (cache, result), values in data.get(cache_requests_total.name, []):
+        lookups.setdefault(cache, {})[result] = values[0]
+    lines = ['# HELP fyyur_cache_hit_ratio Share of cache lookups that were hits.',
+             '# TYPE fyyur_cache_hit_ratio gauge']
+    for cache, results in sorted(lookups.items()):
+        total = sum(results.values())
+        ratio = results.get('hit', 0) / total if total else 0.0
+        lines.append('fyyur_cache_hit_ratio%s %r' % (_labels([('cache', cache)]), ratio))
+    return lines
+
+
+pool_checkout_seconds = histogram(
+    'fyyur_db_pool_checkout_seconds',
+    'Time spent waiting for a database connection from the pool, connecting included.')
+requests_total = counter(
+    'fyyur_requests_total', 'Requests handled, by endpoint and status code.', ['endpoint', 'status'])
+request_seconds = histogram(
+    'fyyur_request_duration_seconds', 'Time spent handling a request, by endpoint.', ['endpoint'])
+request_db_seconds = histogram(
+    'fyyur_request_db_seconds', 'Time spent in SQL statements per request, by endpoint.', ['endpoint'])
+template_render_seconds = histogram(
+    'fyyur_template_render_seconds', 'Time spent rendering a template, by template.', ['template'])
+fan_out_query_seconds = histogram(
+    'fyyur_fan_out_query_seconds', 'Time spent in each query run concurrently by fan_out(), by query.', ['query'])
+cache_requests_total = counter(
+    'fyyur_cache_requests_total', 'Cache lookups, by cache and result (hit or miss).', ['cache', 'result'])
+compression_bytes_total = counter(
+    'fyyur_compression_bytes_total',
+    'Response body bytes before (in) and after (out) compression, by encoding.', ['encoding', 'side'])
+jobs_queued = gauge(
+    'fyyur_jobs_queued', 'Background jobs waiting in the queue, by job.', ['job'])
+jobs_total = counter(
+    'fyyur_jobs_total', 'Background jobs run, by job and result (succeeded, retried or failed).', ['job', 'result'])
+job_wait_seconds = histogram(
+    'fyyur_job_wait_seconds', 'Time a background job waited in the queue, by job.', ['job'])
+job_run_seconds = histogram(
+    'fyyur_job_run_seconds', 'Time spent running a background job, by job.', ['job'])
+
+
+#  Request metrics
+#  ----------------------------------------------------------------
+
+def _start_request():
+    g.request_started_at = time.perf_counter()
+
+
+def _finish_request(response):
+    # For streamed responses, the time until the body starts.
+    started_at = g.pop('request_started_at', None)
+    if started_at is not None:
+        request_seconds.observe(time.perf_counter() - started_at, request.endpoint)
+        requests_total.inc(request.endpoint, response.status_code)
+        _dump_periodically()
+    return response
+
+
+def _dump_periodically():
+    # With several workers, share this worker's metrics every few seconds.
+    directory = current_app.config.get('METRICS_DIR')
+    if not directory:
+        return
+    now = time.monotonic()
+    if now - _last_dump[0] >= current_app.config.get('METRICS_DUMP_SECONDS', 5):
+        _last_dump[0] = now
+        dump(directory)
+
+
+_last_dump = [0.0]
+
+
+def init_app(app):
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
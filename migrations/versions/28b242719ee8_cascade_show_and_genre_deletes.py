@@ -0,0 +1,53 @@
+"""cascade show and genre deletes
+
+Revision ID: 28b242719ee8
+Revises: a9aeb070b5d9
+Create Date: 2026-10-18 19:33:41.802270
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '28b242719ee8'
+down_revision = 'a9aeb070b5d9'
+branch_labels = None
+depends_on = None
+
+# (table, column, referred table) of the foreign keys deleting with the venue or artist.
+FOREIGN_KEYS = [
+    ('shows', 'artist_id', 'artists'),
+    ('shows', 'venue_id', 'venues'),
+    ('venue_genres', 'venue_id', 'venues'),
+    ('artist_genres', 'artist_id', 'artists'),
+]
+
+
+def set_ondelete(ondelete):
+    connection = op.get_bind()
+    if connection.dialect.name != 'sqlite':
+        # The constraints were created unnamed: PostgreSQL's default names.
+        for table, column, referred in FOREIGN_KEYS:
+            name = '%s_%s_fkey' % (table, column)
+            op.drop_constraint(name, table, type_='foreignkey')
+            op.create_foreign_key(name, table, referred, [column], ['id'], ondelete=ondelete)
+        return
+    # SQLite cannot alter constraints: copy each table, with the changed
+    # foreign keys, into a new one.
+    metadata = sa.MetaData()
+    for table_name in sorted(set(table for table, _, _ in FOREIGN_KEYS)):
+        table = sa.Table(table_name, metadata, autoload_with=connection)
+        for foreign_key in table.foreign_key_constraints:
+            if (table_name, foreign_key.column_keys[0], foreign_key.referred_table.name) in FOREIGN_KEYS:
+                foreign_key.ondelete = ondelete
+        with op.batch_alter_table(table_name, copy_from=table, recreate='always'):
+            pass
+
+
+def upgrade():
+    set_ondelete('CASCADE')
+
+
+def downgrade():
+    set_ondelete(None)
@@ -0,0 +1,98 @@
+"""normalize genres
+
+Revision ID: 757d19371100
+Revises: 1764c643f1de
+Create Date: 2026-10-18 19:06:07.060396
+
+"""
+import csv
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '757d19371100'
+down_revision = '1764c643f1de'
+branch_labels = None
+depends_on = None
+
+# The choices of the genre form fields at the time of this revision.
+DEFAULT_GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk', 'Hip-Hop',
+                  'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae',
+                  'Rock n Roll', 'Soul', 'Other']
+
+
+def parse_genres(value):
+    # Genre strings were stored either comma separated ("Jazz,Folk") or, when
+    # the form's list went through psycopg2, as an array literal
+    # ('{Jazz,"Rock n Roll"}').
+    value = (value or '').strip()
+    if value.startswith('{') and value.endswith('}'):
+        value = value[1:-1]
+    return [name.strip() for name in next(csv.reader([value])) if name.strip()] if value else []
+
+
+def upgrade():
+    genres = op.create_table('genres',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    artist_genres = op.create_table('artist_genres',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['artists.id'], ),
+    sa.ForeignKeyConstraint(['genre_id'], ['genres.id'], ),
+    sa.PrimaryKeyConstraint('artist_id', 'genre_id')
+    )
+    op.create_index('ix_artist_genres_genre_id_artist_id', 'artist_genres', ['genre_id', 'artist_id'], unique=False)
+    venue_genres = op.create_table('venue_genres',
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['genre_id'], ['genres.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['venues.id'], ),
+    sa.PrimaryKeyConstraint('venue_id', 'genre_id')
+    )
+    op.create_index('ix_venue_genres_genre_id_venue_id', 'venue_genres', ['genre_id', 'venue_id'], unique=False)
+
+    # Move the genre strings to the new tables. Names differing only in case
+    # are merged; names outside the defaults become new genres.
+    connection = op.get_bind()
+    names = {name.lower(): name for name in DEFAULT_GENRES}
+    links = {'venues': [], 'artists': []}
+    for table in links:
+        for entity_id, value in connection.execute(sa.text('SELECT id, genres FROM %s' % table)):
+            for name in parse_genres(value):
+                links[table].append((entity_id, names.setdefault(name.lower(), name)))
+    op.bulk_insert(genres, [{'name': name} for name in names.values()])
+    genre_ids = dict((name, genre_id) for genre_id, name in connection.execute(sa.text('SELECT id, name FROM genres')))
+    for table, link_table, key in (('venues', venue_genres, 'venue_id'), ('artists', artist_genres, 'artist_id')):
+        rows = set((entity_id, genre_ids[name]) for entity_id, name in links[table])
+        if rows:
+            op.bulk_insert(link_table, [{key: entity_id, 'genre_id': genre_id} for entity_id, genre_id in rows])
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('genres')
+
+
+def downgrade():
+    # Back to comma separated strings.
+    for table, link_table, key in (('venues', 'venue_genres', 'venue_id'), ('artists', 'artist_genres', 'artist_id')):
+        op.add_column(table, sa.Column('genres', sa.VARCHAR(), nullable=True))
+        connection = op.get_bind()
+        names = {}
+        for entity_id, name in connection.execute(sa.text(
+                'SELECT l.%s, g.name FROM %s l JOIN genres g ON g.id = l.genre_id ORDER BY g.name'
+                % (key, link_table))):
+            names.setdefault(entity_id, []).append(name)
+        update = sa.text('UPDATE %s SET genres = :genres WHERE id = :id' % table)
+        for entity_id, entity_names in names.items():
+            connection.execute(update, {'id': entity_id, 'genres': ','.join(entity_names)})
+        op.execute("UPDATE %s SET genres = '' WHERE genres IS NULL" % table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('genres', existing_type=sa.VARCHAR(), nullable=False)
+    op.drop_index('ix_venue_genres_genre_id_venue_id', table_name='venue_genres')
+    op.drop_table('venue_genres')
+    op.drop_index('ix_artist_genres_genre_id_artist_id', table_name='artist_genres')
+    op.drop_table('artist_genres')
+    op.drop_table('genres')
@@ -0,0 +1,55 @@
+"""show end time and booking constraint
+
+Revision ID: a9aeb070b5d9
+Revises: eac89329f4e4
+Create Date: 2026-10-18 19:13:05.375503
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9aeb070b5d9'
+down_revision = 'eac89329f4e4'
+branch_labels = None
+depends_on = None
+
+# The show length at the time of this revision.
+SHOW_HOURS = 3
+
+
+def upgrade():
+    op.add_column('shows', sa.Column('end_time', sa.DateTime(), nullable=True))
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("UPDATE shows SET end_time = start_time + interval '%d hours'" % SHOW_HOURS)
+    elif dialect == 'sqlite':
+        op.execute("UPDATE shows SET end_time = datetime(start_time, '+%d hours')" % SHOW_HOURS)
+    else:
+        op.execute('UPDATE shows SET end_time = DATE_ADD(start_time, INTERVAL %d HOUR)' % SHOW_HOURS)
+    with op.batch_alter_table('shows') as batch_op:
+        batch_op.alter_column('end_time', existing_type=sa.DateTime(), nullable=False)
+    if dialect != 'postgresql':
+        return
+
+    # Shows booked before this revision may overlap, which the constraint
+    # cannot be added over: list them, to be moved or deleted first.
+    overlaps = op.get_bind().execute(sa.text(
+        'SELECT a.venue_id, a.id, b.id FROM shows a JOIN shows b '
+        'ON a.venue_id = b.venue_id AND a.id < b.id '
+        'AND a.start_time < b.end_time AND b.start_time < a.end_time '
+        'ORDER BY a.venue_id, a.id LIMIT 20')).fetchall()
+    if overlaps:
+        raise RuntimeError('Overlapping shows, as (venue_id, show_id, show_id): %s'
+                           % ', '.join(str(tuple(row)) for row in overlaps))
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.execute('ALTER TABLE shows ADD CONSTRAINT ex_shows_venue_id_during '
+               'EXCLUDE USING gist (venue_id WITH =, tsrange(start_time, end_time) WITH &&)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('ALTER TABLE shows DROP CONSTRAINT ex_shows_venue_id_during')
+    with op.batch_alter_table('shows') as batch_op:
+        batch_op.drop_column('end_time')
@@ -0,0 +1,49 @@
+"""show counters
+
+Revision ID: e8d5f6982312
+Revises: 28b242719ee8
+Create Date: 2026-10-18 19:19:08.029933
+
+"""
+import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8d5f6982312'
+down_revision = '28b242719ee8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('show_count_boundary',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('boundary', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    for table in ('artists', 'venues'):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Count the existing shows, split at the time of the migration.
+    boundary = datetime.datetime.today()
+    op.bulk_insert(sa.table('show_count_boundary', sa.column('id', sa.Integer), sa.column('boundary', sa.DateTime)),
+                   [{'id': 1, 'boundary': boundary}])
+    for table, key in (('artists', 'artist_id'), ('venues', 'venue_id')):
+        op.get_bind().execute(sa.text(
+            'UPDATE {table} SET '
+            'upcoming_shows_count = (SELECT count(*) FROM shows '
+            'WHERE shows.{key} = {table}.id AND shows.start_time >= :boundary), '
+            'past_shows_count = (SELECT count(*) FROM shows '
+            'WHERE shows.{key} = {table}.id AND shows.start_time < :boundary)'.format(table=table, key=key)),
+            {'boundary': boundary})
+
+
+def downgrade():
+    for table in ('venues', 'artists'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('past_shows_count')
+            batch_op.drop_column('upcoming_shows_count')
+    op.drop_table('show_count_boundary')
@@ -1,9 +1,61 @@
 import datetime
+from sqlalchemy import DDL, event
 from app_bootstrapping import db
 
+# The trigram indexes below need pg_trgm, and the show booking constraint
+# btree_gist; make db.create_all() install them too.
+event.listen(db.Model.metadata, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+event.listen(db.Model.metadata, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS btree_gist').execute_if(dialect='postgresql'))
+
+# Genres offered on the venue and artist forms; the genres table starts with them.
+DEFAULT_GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk', 'Hip-Hop',
+                  'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae',
+                  'Rock n Roll', 'Soul', 'Other']
+
+class Genre(db.Model):
+
+    __tablename__ = 'genres'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f'<Genre {self.id} {self.name}>'
+
+
+@event.listens_for(Genre.__table__, 'after_create')
+def _insert_default_genres(target, connection, **kw):
+    connection.execute(target.insert(), [{'name': name} for name in DEFAULT_GENRES])
+
+
+# The primary keys serve "genres of a venue"; the (genre_id, ...) indexes
+# serve the ?genre= filters. Deleting a venue or artist deletes its links
+# in the database.
+venue_genres = db.Table(
+    'venue_genres',
+    db.Column('venue_id', db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genres.id'), primary_key=True),
+    db.Index('ix_venue_genres_genre_id_venue_id', 'genre_id', 'venue_id'),
+)
+
+artist_genres = db.Table(
+    'artist_genres',
+    db.Column('artist_id', db.Integer, db.ForeignKey('artists.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genres.id'), primary_key=True),
+    db.Index('ix_artist_genres_genre_id_artist_id', 'genre_id', 'artist_id'),
+)
+
 class Venue(db.Model):
 
     __tablename__ = 'venues'
+    # Trigram indexes serve the ILIKE '%term%' searches on PostgreSQL (see search.py).
+    __table_args__ = (
+        db.Index('ix_venues_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_venues_city_trgm', 'city', postgresql_using='gin', postgresql_ops={'city': 'gin_trgm_ops'}),
+        db.Index('ix_venues_state_trgm', 'state', postgresql_using='gin', postgresql_ops={'state': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
@@ -11,42 +63,69 @@ class Venue(db.Model):
     state = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(), nullable=False)
+    genres = db.relationship('Genre', secondary=venue_genres, order_by=Genre.name, lazy=True,
+                             passive_deletes=True)
     facebook_link = db.Column(db.String(200))
     image_link = db.Column(db.String(500))
     website_link = db.Column(db.String(500))
     seeking_talent = db.Column(db.Boolean, nullable=False, default=False)
     seeking_description = db.Column(db.String(), nullable=False)
-    shows = db.relationship('Show', backref='venue', lazy=True)
+    # Shows are deleted with their venue by the database (ON DELETE CASCADE),
+    # without being loaded.
+    shows = db.relationship('Show', backref='venue', lazy=True, cascade='all, delete', passive_deletes=True)
+    # Show counters, kept up to date by show_counts.py.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow,
+                           onupdate=datetime.datetime.utcnow)
 
     def __repr__(self):
         return f'<Venue {self.id} {self.name}>'
 
+    @property
+    def genre_names(self):
+        return [genre.name for genre in self.genres]
+
 
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
 
 class Artist(db.Model):
 
     __tablename__ = 'artists'
+    # Trigram indexes serve the ILIKE '%term%' searches on PostgreSQL (see search.py).
+    __table_args__ = (
+        db.Index('ix_artists_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_artists_city_trgm', 'city', postgresql_using='gin', postgresql_ops={'city': 'gin_trgm_ops'}),
+        db.Index('ix_artists_state_trgm', 'state', postgresql_using='gin', postgresql_ops={'state': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120), nullable=False)
-    genres = db.Column(db.String(), nullable=False)
+    genres = db.relationship('Genre', secondary=artist_genres, order_by=Genre.name, lazy=True,
+                             passive_deletes=True)
     facebook_link = db.Column(db.String(200))
     image_link = db.Column(db.String(500))
     website_link = db.Column(db.String(500))
     seeking_venue = db.Column(db.Boolean, nullable=False, default=False)
     seeking_description = db.Column(db.String(), nullable=False)
-    shows = db.relationship('Show', backref='artist', lazy=True)
+    shows = db.relationship('Show', backref='artist', lazy=True, cascade='all, delete', passive_deletes=True)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0)
     available_start_time = db.Column(db.DateTime, nullable=True, default=datetime.datetime.today())
     available_end_time = db.Column(db.DateTime, nullable=True, default=datetime.datetime.today())
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow,
+                           onupdate=datetime.datetime.utcnow)
 
     def __repr__(self):
         return f'<Artist {self.id} {self.name}>'
 
+    @property
+    def genre_names(self):
+        return [genre.name for genre in self.genres]
+
     def is_period_validity_incorrect(self):
         bad_availability_format = False
         if self.available_end_time and not self.available_start_time:
@@ -58,13 +137,94 @@ class Artist(db.Model):
 
     # Implement any missing fields, as a database migration using Flask-Migrate
 
+# Length of a show booked without an end time, and longest show accepted:
+# the booking queries look that far back for shows overlapping a time.
+SHOW_DURATION = datetime.timedelta(hours=3)
+MAX_SHOW_DURATION = datetime.timedelta(hours=24)
+
+
+def _default_end_time(context):
+    start_time = context.get_current_parameters().get('start_time') or datetime.datetime.today()
+    return start_time + SHOW_DURATION
+
+
 class Show(db.Model):
     __tablename__ = 'shows'
+    # Every read path filters shows by venue or artist and compares start_time;
+    # /shows pages on (start_time, id).
+    __table_args__ = (
+        db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_shows_start_time_id', 'start_time', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
-    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id'), nullable=False)
-    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id'), nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id', ondelete='CASCADE'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False, default=datetime.datetime.today())
+    # Exclusive: a show may start when the previous one ends.
+    end_time = db.Column(db.DateTime, nullable=False, default=_default_end_time)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow,
+                           onupdate=datetime.datetime.utcnow)
+
+# Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
+
+# On PostgreSQL, no two shows of a venue may overlap, even when booked
+# concurrently (see booking.py). Columns are naive timestamps, hence tsrange.
+event.listen(Show.__table__, 'after_create', DDL(
+    'ALTER TABLE shows ADD CONSTRAINT ex_shows_venue_id_during '
+    'EXCLUDE USING gist (venue_id WITH =, tsrange(start_time, end_time) WITH &&)').execute_if(dialect='postgresql'))
+
+
+class ShowCountBoundary(db.Model):
+    # The single row holds the time splitting the show counters of venues and
+    # artists: shows starting before it are counted as past, the others as
+    # upcoming. `flask show-counts roll` moves it forward (see show_counts.py).
+    __tablename__ = 'show_count_boundary'
+
+    id = db.Column(db.Integer, primary_key=True)
+    boundary = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<ShowCountBoundary {self.boundary}>'
+
+
+@event.listens_for(ShowCountBoundary.__table__, 'after_create')
+def _insert_show_count_boundary(target, connection, **kw):
+    connection.execute(target.insert(), {'id': 1, 'boundary': datetime.datetime.today()})
+
+
+class JobRetry(db.Model):
+    # A background job that failed, waiting for its next attempt (see jobs.py).
+    # status: 'waiting' for run_at, 'queued' back in the queue, or 'failed'
+    # after its last attempt.
+    __tablename__ = 'job_retries'
+    __table_args__ = (
+        db.Index('ix_job_retries_status_run_at', 'status', 'run_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    status = db.Column(db.String(20), nullable=False, default='waiting')
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow,
+                           onupdate=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return f'<JobRetry {self.id} {self.name} {self.status}>'
+
+
+def _touch(target, value, initiator):
+    # A genre change only writes the association table; update the venue or
+    # artist row too, so that caches and ETags keyed on updated_at see it.
+    target.updated_at = datetime.datetime.utcnow()
+
 
-# Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
\ No newline at end of file
+for _attribute in (Venue.genres, Artist.genres):
+    event.listen(_attribute, 'append', _touch)
+    event.listen(_attribute, 'remove', _touch)
\ No newline at end of file
@@ -0,0 +1,90 @@
+#----------------------------------------------------------------------------#
+# Home page, metrics, error pages, template filters, and helpers shared by
+# the venue, artist and show views.
+#----------------------------------------------------------------------------#
+import datetime as dt
+from functools import lru_cache
+import babel.dates
+from flask import Blueprint, Response, current_app, render_template
+from conditional import conditional_get
+from cache import view_cache
+from jobs import enqueue
+import metrics
+from models import Artist, Venue
+from queries import recent_listings, table_state
+
+pages = Blueprint('pages', __name__)
+
+#----------------------------------------------------------------------------#
+# Filters.
+#----------------------------------------------------------------------------#
+
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+@lru_cache(maxsize=4096)
+def _format_datetime(date, format, locale):
+    return babel.dates.format_datetime(date, format, locale=locale)
+
+@pages.app_template_filter('datetime')
+def format_datetime(value, format='medium', locale='en'):
+    # Views pass datetime objects; strings are still parsed for older callers.
+    # Formatted values are cached by (value, format, locale).
+    try:
+        if not isinstance(value, dt.datetime):
+            # Only imported for these, to keep it out of startup.
+            import dateutil.parser
+            value = dateutil.parser.parse(value)
+        return _format_datetime(value, DATETIME_FORMATS.get(format, format), locale)
+    except Exception:
+        pass
+
+#----------------------------------------------------------------------------#
+# Helpers.
+#----------------------------------------------------------------------------#
+
+def enqueue_follow_ups(kind=None, entity_id=None, image_link=None):
+    # Slow side effects of a successful write, left to the background jobs.
+    enqueue('warm_view_cache', dedupe=True)
+    if image_link and current_app.config.get('CHECK_IMAGE_LINKS'):
+        enqueue('check_image_link', kind=kind, entity_id=entity_id)
+
+
+def stream_template(template_name, **context):
+    # Same as render_template, but yields the page in chunks while it renders.
+    # Wrap the result in stream_with_context so the request stays available.
+    app = current_app._get_current_object()
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(5)
+    return stream
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+@pages.route('/')
+@conditional_get(lambda: table_state(Artist, Venue))
+def index():
+    recent_artists, recent_venues = view_cache.get_or_set('index', recent_listings)
+    return render_template('pages/home.html',recent_artists=recent_artists, recent_venues=recent_venues)
+
+
+#  Metrics
+#  ----------------------------------------------------------------
+
+@pages.route('/metrics')
+def metrics_endpoint():
+    # Sums the metrics of all workers when METRICS_DIR is set.
+    data = metrics.collect(current_app.config.get('METRICS_DIR'))
+    return Response(metrics.render(data), mimetype='text/plain; version=0.0.4')
+
+@pages.app_errorhandler(404)
+def not_found_error(error):
+    return render_template('errors/404.html'), 404
+
+@pages.app_errorhandler(500)
+def server_error(error):
+    return render_template('errors/500.html'), 500
@@ -0,0 +1,128 @@
+#----------------------------------------------------------------------------#
+# Per-request SQL profiling.
+#
+# Counts the statements of each request and the time spent in them, sends
+# the totals, and the time of each query run by fan_out(), in a
+# Server-Timing header and a JSON log line, and logs a warning with the
+# slowest statements when the request exceeds its budget.
+# The per-statement cost is two clock reads, a lock and a few attribute updates.
+# Database and template render times also feed /metrics; request times
+# are recorded there by metrics.py, profiling on or off.
+#----------------------------------------------------------------------------#
+import heapq
+import json
+import logging
+import threading
+import time
+from flask import current_app, g, has_app_context, has_request_context, request, signals, before_render_template, \
+    template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import metrics
+
+logger = logging.getLogger('fyyur.requests')
+
+
+class QueryStats:
+    """Statements executed during one request."""
+
+    def __init__(self, keep_slowest=3):
+        self.started_at = time.perf_counter()
+        self.count = 0
+        self.seconds = 0.0
+        self.keep_slowest = keep_slowest
+        # (seconds, statement) min-heap of the slowest statements.
+        self.slowest = []
+        # (name, seconds) of the queries run by fan_out().
+        self.queries = []
+        # fan_out() records statements from several threads.
+        self._lock = threading.Lock()
+
+    def record(self, statement, seconds):
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            if len(self.slowest) < self.keep_slowest:
+                heapq.heappush(self.slowest, (seconds, statement))
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (seconds, statement))
+
+    def time_query(self, name, seconds):
+        self.queries.append((name, seconds))
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started_at'] = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # The app context of a fan_out() thread shares the request's QueryStats.
+    if has_app_context():
+        stats = g.get('query_stats')
+        if stats is not None:
+            stats.record(statement, time.perf_counter() - conn.info.pop('query_started_at'))
+
+
+def start_query_stats():
+    if current_app.config.get('PROFILING_ENABLED', True):
+        g.query_stats = QueryStats(keep_slowest=current_app.config.get('PROFILING_SLOWEST_STATEMENTS', 3))
+
+
+def report_query_stats(response):
+    # For streamed responses this runs before the body is produced, so the
+    # statements run while streaming are not counted.
+    stats = g.pop('query_stats', None)
+    if stats is None:
+        return response
+    total_seconds = time.perf_counter() - stats.started_at
+    metrics.request_db_seconds.observe(stats.seconds, request.endpoint)
+    total_ms = total_seconds * 1000
+    db_ms = stats.seconds * 1000
+    response.headers.add('Server-Timing', 'db;dur=%.1f;desc="%d statements"' % (db_ms, stats.count))
+    response.headers.add('Server-Timing', 'app;dur=%.1f' % total_ms)
+    for name, seconds in stats.queries:
+        response.headers.add('Server-Timing', 'query-%s;dur=%.1f' % (name, seconds * 1000))
+    line = {'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 1),
+            'db_statements': stats.count,
+            'db_ms': round(db_ms, 1)}
+    if stats.queries:
+        line['queries_ms'] = dict((name, round(seconds * 1000, 1)) for name, seconds in stats.queries)
+    logger.info(json.dumps(line))
+    if stats.count > current_app.config.get('PROFILING_MAX_STATEMENTS', 20) \
+            or db_ms > current_app.config.get('PROFILING_MAX_DB_MS', 200):
+        logger.warning(json.dumps({'message': 'request over its database budget',
+                                   'endpoint': request.endpoint,
+                                   'db_statements': stats.count,
+                                   'db_ms': round(db_ms, 1),
+                                   'slowest': [{'ms': round(seconds * 1000, 1), 'statement': statement}
+                                               for seconds, statement in sorted(stats.slowest, reverse=True)]}))
+    return response
+
+
+#  Template render times
+#  ----------------------------------------------------------------
+
+def _before_render_template(sender, template, context, **extra):
+    if has_request_context():
+        g.setdefault('template_started_at', []).append(time.perf_counter())
+
+
+def _template_rendered(sender, template, context, **extra):
+    if has_request_context() and g.get('template_started_at'):
+        started_at = g.template_started_at.pop()
+        metrics.template_render_seconds.observe(time.perf_counter() - started_at, template.name)
+
+
+def init_app(app):
+    app.before_request(start_query_stats)
+    app.after_request(report_query_stats)
+    # Flask signals need blinker before Flask 2.3.
+    if getattr(signals, 'signals_available', True):
+        before_render_template.connect(_before_render_template, app)
+        template_rendered.connect(_template_rendered, app)
@@ -0,0 +1,309 @@
+#----------------------------------------------------------------------------#
+# Read queries used by the controllers.
+# Each helper issues a fixed number of statements, whatever the table sizes.
+#----------------------------------------------------------------------------#
+import datetime as dt
+from itertools import groupby
+from sqlalchemy import and_, case, event, func, or_, select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from app_bootstrapping import db
+from fanout import fan_out
+from models import Artist, Genre, Venue, Show, ShowCountBoundary, artist_genres, venue_genres
+
+
+#  Genres
+#  ----------------------------------------------------------------
+
+def genre_ids():
+    """{name: id} of every genre, in id order.
+
+    Read once per process and kept until a Genre is added, changed or
+    deleted in this process; genres are reference data that rarely change.
+    """
+    if not _genre_ids:
+        _genre_ids.update(db.session.query(Genre.name, Genre.id).order_by(Genre.id).all())
+    return _genre_ids
+
+
+_genre_ids = {}
+
+
+def _forget_genre_ids(*args, **kwargs):
+    _genre_ids.clear()
+
+
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Genre, _event_name, _forget_genre_ids)
+event.listen(Genre.__table__, 'after_create', _forget_genre_ids)
+event.listen(Genre.__table__, 'after_drop', _forget_genre_ids)
+
+
+def genres_named(names):
+    """Genre objects of the given names, for assignment to Venue.genres or Artist.genres."""
+    if not names:
+        return []
+    return Genre.query.filter(Genre.name.in_(names)).order_by(Genre.name).all()
+
+
+def genre_key(model):
+    """Column of the genre association table of `model` (Venue or Artist) referencing it."""
+    return venue_genres.c.venue_id if model is Venue else artist_genres.c.artist_id
+
+
+def in_genre(model, genre):
+    """Criterion selecting the `model` rows of the genre named `genre`.
+
+    Served by the (genre_id, ...) index of the association table.
+    """
+    key = genre_key(model)
+    return model.id.in_(select(key).where(key.table.c.genre_id == Genre.id, Genre.name == genre))
+
+
+def genre_member_ids(model, genre):
+    """Set of the ids of the `model` rows of the genre named `genre`."""
+    key = genre_key(model)
+    return set(row[0] for row in db.session.execute(
+        select(key).where(key.table.c.genre_id == Genre.id, Genre.name == genre)))
+
+
+def genre_names_by_id(model, ids):
+    """{id: [genre name]} for the given `model` ids, in one query."""
+    if not ids:
+        return {}
+    key = genre_key(model)
+    rows = db.session.execute(select(key, Genre.name)
+                              .where(key.table.c.genre_id == Genre.id, key.in_(ids))
+                              .order_by(key, Genre.name))
+    names = {}
+    for entity_id, name in rows:
+        names.setdefault(entity_id, []).append(name)
+    return names
+
+
+#  Pages
+#  ----------------------------------------------------------------
+
+
+def recent(model, limit=10):
+    """Id and name dicts of the most recently listed venues or artists."""
+    rows = db.session.query(model.id, model.name).order_by(model.id.desc()).limit(limit).all()
+    return [{'id': row.id, 'name': row.name} for row in rows]
+
+
+def recent_listings(limit=10):
+    """([artist], [venue]) dicts of the most recently listed artists and venues.
+
+    Both queries run at the same time (see fanout.py).
+    """
+    results = fan_out(recent_artists=lambda: recent(Artist, limit), recent_venues=lambda: recent(Venue, limit))
+    return results['recent_artists'], results['recent_venues']
+
+
+def artist_listing(genre=None):
+    """Id and name of every artist, or of the artists of `genre`, ordered by id."""
+    query = db.session.query(Artist.id, Artist.name)
+    if genre:
+        query = query.filter(in_genre(Artist, genre))
+    return [{'id': row.id, 'name': row.name} for row in query.order_by(Artist.id)]
+
+
+def venue_areas(genre=None):
+    """Venues grouped by city and state with their number of upcoming shows.
+
+    One statement on the venues table: counts are read from the venues'
+    show counters (see show_counts.py). With `genre`, only the venues of
+    that genre are listed.
+    """
+    query = db.session.query(Venue.state, Venue.city, Venue.id, Venue.name,
+                             Venue.upcoming_shows_count.label('num_upcoming_shows'))
+    if genre:
+        query = query.filter(in_genre(Venue, genre))
+    rows = query.order_by(Venue.state, Venue.city, Venue.id).all()
+
+    areas = list()
+    for (state, city), venues in groupby(rows, key=lambda row: (row.state, row.city)):
+        areas.append({'city': city,
+                      'state': state,
+                      'venues': [{'id': row.id,
+                                  'name': row.name,
+                                  'num_upcoming_shows': row.num_upcoming_shows,
+                                  } for row in venues]
+                      })
+    return areas
+
+
+def split_shows(shows, now=None):
+    """Split shows into (past, upcoming) lists, both ordered by start time.
+
+    Every show is compared against the same `now` so a show cannot land
+    in both lists, or in neither, while the page is being built.
+    """
+    if now is None:
+        now = dt.datetime.today()
+    past_shows, upcoming_shows = list(), list()
+    for show in sorted(shows, key=lambda show: show.start_time):
+        if show.start_time < now:
+            past_shows.append(show)
+        else:
+            upcoming_shows.append(show)
+    return past_shows, upcoming_shows
+
+
+def genres_of(model, entity_id):
+    """Genre objects of the venue or artist `entity_id`, ordered by name."""
+    key = genre_key(model)
+    return Genre.query.join(key.table, key.table.c.genre_id == Genre.id) \
+        .filter(key == entity_id).order_by(Genre.name).all()
+
+
+def entity_detail(model, entity_id, now=None):
+    """The venue or artist with its shows and their artists or venues, and
+    its genres: two statements, run at the same time (see fanout.py).
+
+    Returns (entity, past_shows, upcoming_shows), or None if the entity
+    does not exist.
+    """
+    def entity():
+        # Show.artist and Show.venue are backrefs: they exist once model.query configured the mappers.
+        query = model.query
+        other = Show.artist if model is Venue else Show.venue
+        return query.options(joinedload(model.shows).joinedload(other)).get(entity_id)
+
+    results = fan_out(entity=entity, genres=lambda: genres_of(model, entity_id))
+    entity = results['entity']
+    if entity is None:
+        return None
+    set_committed_value(entity, 'genres', results['genres'])
+    return (entity,) + split_shows(entity.shows, now)
+
+
+def venue_detail(venue_id, now=None):
+    """The venue with its shows and their artists, and its genres; see entity_detail()."""
+    return entity_detail(Venue, venue_id, now)
+
+
+def artist_detail(artist_id, now=None):
+    """The artist with its shows and their venues, and its genres; see entity_detail()."""
+    return entity_detail(Artist, artist_id, now)
+
+
+def encode_show_cursor(start_time, show_id):
+    """Keyset cursor pointing just after the show (start_time, show_id)."""
+    return '%s_%d' % (start_time.isoformat(), show_id)
+
+
+def decode_show_cursor(cursor):
+    """(start_time, show_id) from a cursor; None if absent or malformed."""
+    try:
+        start_time, show_id = cursor.rsplit('_', 1)
+        return dt.datetime.fromisoformat(start_time), int(show_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def show_listing(after=None, limit=60):
+    """One page of shows ordered by (start_time, id), in a single joined query.
+
+    Only the columns rendered by pages/shows.html are selected. `after` is a
+    cursor as returned in `next_cursor`; paging on (start_time, id) instead
+    of OFFSET keeps every page as cheap as the first one.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    query = db.session.query(Show.id, Show.start_time,
+                             Venue.id.label('venue_id'), Venue.name.label('venue_name'),
+                             Artist.id.label('artist_id'), Artist.name.label('artist_name'),
+                             Artist.image_link.label('artist_image_link')) \
+        .join(Venue, Show.venue_id == Venue.id) \
+        .join(Artist, Show.artist_id == Artist.id)
+    position = decode_show_cursor(after)
+    if position is not None:
+        start_time, show_id = position
+        query = query.filter(or_(Show.start_time > start_time,
+                                 and_(Show.start_time == start_time, Show.id > show_id)))
+    # One extra row tells whether there is a next page.
+    rows = query.order_by(Show.start_time, Show.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_show_cursor(rows[-1].start_time, rows[-1].id)
+    return rows, next_cursor
+
+
+def show_foreign_key(model):
+    """Column of Show referencing `model` (Venue or Artist)."""
+    return Show.venue_id if model is Venue else Show.artist_id
+
+
+def upcoming_show_counts(model, ids):
+    """{id: number of upcoming shows} for the given `model` ids, from their show counters."""
+    if not ids:
+        return {}
+    return dict(db.session.query(model.id, model.upcoming_shows_count).filter(model.id.in_(ids)).all())
+
+
+def entity_page(model, after=None, limit=50, genre=None):
+    """One page of venues or artists ordered by id, with their upcoming-show counts.
+
+    `after` is the id of the last row of the previous page; `genre`
+    restricts the page to one genre. A single statement; returns
+    (rows, next_cursor) where next_cursor is None on the last page.
+    """
+    query = db.session.query(model.id, model.name, model.city, model.state,
+                             model.upcoming_shows_count.label('num_upcoming_shows'))
+    if genre:
+        query = query.filter(in_genre(model, genre))
+    if after is not None:
+        query = query.filter(model.id > after)
+    rows = query.order_by(model.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].id
+    return rows, next_cursor
+
+
+#  Page states, for conditional GET
+#  ----------------------------------------------------------------
+# A page state is a tuple that changes whenever the rendered page may change,
+# read with one small aggregate query instead of building the page. Counts
+# catch deletions, which leave max(updated_at) unchanged. On detail pages,
+# upcoming-show counts catch shows moving from upcoming to past as time
+# passes; listing pages read show counters, which move at the boundary.
+
+def entity_state(model, entity_id, now=None):
+    """State of a venue or artist detail page; None if the entity does not exist."""
+    if now is None:
+        now = dt.datetime.today()
+    other = Artist if model is Venue else Venue
+    other_key = Show.artist_id if model is Venue else Show.venue_id
+    row = db.session.query(model.updated_at,
+                           func.max(Show.updated_at), func.max(other.updated_at),
+                           func.count(Show.id), func.count(case((Show.start_time >= now, Show.id)))) \
+        .outerjoin(Show, show_foreign_key(model) == model.id) \
+        .outerjoin(other, other_key == other.id) \
+        .filter(model.id == entity_id) \
+        .group_by(model.id, model.updated_at) \
+        .first()
+    return None if row is None else tuple(row)
+
+
+def table_state(*models):
+    """State of a listing page built from the given models' tables.
+
+    Holds the row count and the latest updated_at of each table, plus the
+    show count boundary: `flask show-counts roll` moves the upcoming and past
+    counters of venues and artists without changing their updated_at.
+    """
+    columns = list()
+    for model in models:
+        columns.append(db.session.query(func.count(model.id)).scalar_subquery())
+        columns.append(db.session.query(func.max(model.updated_at)).scalar_subquery())
+    columns.append(db.session.query(ShowCountBoundary.boundary).filter(ShowCountBoundary.id == 1).scalar_subquery())
+    *state, boundary = db.session.query(*columns).one()
+    if boundary is not None:
+        # Local time, like show times; the state's other timestamps, and so
+        # Last-Modified, are UTC.
+        boundary = boundary.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    return tuple(state) + (boundary,)
@@ -0,0 +1,187 @@
+#----------------------------------------------------------------------------#
+# Search backends for venues and artists.
+#
+# Search is a case-insensitive partial match on name, city and state.
+# On PostgreSQL the ILIKE predicates are served by pg_trgm GIN indexes (see
+# models.py). Other databases, SQLite in development and tests, use an
+# in-process trigram index instead.
+#----------------------------------------------------------------------------#
+from flask import current_app
+from sqlalchemy import event, func, or_
+from app_bootstrapping import db
+from models import Artist, Venue
+from queries import genre_member_ids, in_genre, upcoming_show_counts
+
+
+def escape_like(term, escape='!'):
+    # Make % and _ in a user supplied term match literally.
+    return term.replace(escape, escape * 2).replace('%', escape + '%').replace('_', escape + '_')
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramSearch:
+    """PostgreSQL backend: ILIKE served by the pg_trgm indexes, ranked by similarity."""
+
+    def search(self, model, term, limit=None, genre=None):
+        """(id, name, num_upcoming_shows) rows of `model` matching `term`, best matches first.
+
+        A single statement: the counts come from the show counters.
+        With `genre`, only rows of that genre match.
+        """
+        pattern = '%' + escape_like(term) + '%'
+        columns = (model.name, model.city, model.state)
+        score = func.greatest(*[func.similarity(column, term) for column in columns])
+        query = db.session.query(model.id, model.name, model.upcoming_shows_count) \
+            .filter(or_(*[column.ilike(pattern, escape='!') for column in columns])) \
+            .order_by(score.desc(), model.name, model.id)
+        if genre:
+            query = query.filter(in_genre(model, genre))
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+
+class InProcessSearch:
+    """Fallback backend: a per-process trigram index over name, city and state.
+
+    The index of a model is built on first use and rebuilt after any insert,
+    update or delete of that model in this process. It is meant for
+    development and tests; use PostgreSQL when several workers write.
+    """
+
+    def __init__(self):
+        self._indexes = {}
+
+    def invalidate(self, model):
+        self._indexes.pop(model, None)
+
+    def clear(self):
+        self._indexes.clear()
+
+    def _index(self, model):
+        index = self._indexes.get(model)
+        if index is None:
+            rows = db.session.query(model.id, model.name, model.city, model.state).all()
+            entries = {}
+            postings = {}
+            for row in rows:
+                fields = tuple((value or '').lower() for value in (row.name, row.city, row.state))
+                entries[row.id] = (row.name, fields)
+                for gram in set().union(*[trigrams(field) for field in fields]):
+                    postings.setdefault(gram, set()).add(row.id)
+            index = self._indexes[model] = (entries, postings)
+        return index
+
+    @staticmethod
+    def rank(term, fields):
+        # Lower is better; None when the term matches no field.
+        name, city, state = fields
+        if name == term:
+            return 0
+        if name.startswith(term):
+            return 1
+        if any(word.startswith(term) for word in name.split()):
+            return 2
+        if term in name:
+            return 3
+        if term == city or term == state:
+            return 4
+        if term in city or term in state:
+            return 5
+        return None
+
+    def search(self, model, term, limit=None, genre=None):
+        """(id, name, num_upcoming_shows) rows of `model` matching `term`, best matches first.
+
+        Matching runs in memory; the counts of the returned rows come from
+        one query on their show counters, and the rows of `genre`, if
+        given, from another.
+        """
+        entries, postings = self._index(model)
+        term = term.lower()
+        grams = trigrams(term)
+        if grams:
+            # Only rows holding every trigram of the term can contain it.
+            candidates = set.intersection(*[postings.get(gram, set()) for gram in grams])
+        else:
+            candidates = entries.keys()
+        if genre:
+            candidates = genre_member_ids(model, genre).intersection(candidates)
+        ranked = list()
+        for entity_id in candidates:
+            name, fields = entries[entity_id]
+            rank = self.rank(term, fields)
+            if rank is not None:
+                ranked.append((rank, name, entity_id))
+        ranked.sort()
+        if limit is not None:
+            ranked = ranked[:limit]
+        counts = upcoming_show_counts(model, [entity_id for _, _, entity_id in ranked])
+        return [(entity_id, name, counts.get(entity_id, 0)) for _, name, entity_id in ranked]
+
+
+_backends = {}
+
+
+def get_backend():
+    """Search backend for the configured database.
+
+    SEARCH_BACKEND is 'trigram', 'memory', or 'auto' to pick trigram on
+    PostgreSQL and memory elsewhere.
+    """
+    name = current_app.config.get('SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        name = 'trigram' if db.engine.dialect.name == 'postgresql' else 'memory'
+    if name not in _backends:
+        _backends[name] = TrigramSearch() if name == 'trigram' else InProcessSearch()
+    return _backends[name]
+
+
+def search_entities(model, term, genre=None):
+    """Search results page data for `model`: {'count', 'data', 'truncated'}.
+
+    At most SEARCH_RESULTS_LIMIT rows are returned; 'truncated' tells
+    whether more rows matched. `genre` restricts the search to one genre.
+    """
+    limit = current_app.config.get('SEARCH_RESULTS_LIMIT')
+    rows = get_backend().search(model, term, limit=None if limit is None else limit + 1, genre=genre)
+    truncated = limit is not None and len(rows) > limit
+    if truncated:
+        rows = rows[:limit]
+    return {
+        'count': len(rows),
+        'data': [{'id': entity_id,
+                  'name': name,
+                  'num_upcoming_shows': num_upcoming_shows,
+                  } for entity_id, name, num_upcoming_shows in rows],
+        'truncated': truncated,
+    }
+
+
+def clear_index():
+    """Forget the in-process index, e.g. after bulk writes that bypass the ORM."""
+    backend = _backends.get('memory')
+    if backend is not None:
+        backend.clear()
+
+
+def warm_index():
+    """Build the in-process index of venues and artists now, if that backend is in use."""
+    backend = _backends.get('memory')
+    if backend is not None:
+        for model in (Venue, Artist):
+            backend._index(model)
+
+
+def _invalidate(mapper, connection, target):
+    backend = _backends.get('memory')
+    if backend is not None:
+        backend.invalidate(type(target))
+
+
+for _model in (Venue, Artist):
+    for _event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event_name, _invalidate)
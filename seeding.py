@@ -0,0 +1,168 @@
+#----------------------------------------------------------------------------#
+# Synthetic data generator.
+#
+#   flask seed --venues 1000 --artists 5000 --shows 100000
+#
+# Popularity is skewed like real listings: a few venues and artists get most
+# of the shows, cities are weighted by size, and shows start in the evening,
+# spread around today. A venue has at most one show a day, so that seeded
+# shows never double-book it.
+#----------------------------------------------------------------------------#
+import datetime as dt
+import random
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func
+from app_bootstrapping import db
+from cache import view_cache
+from models import Artist, Venue, Show, SHOW_DURATION, artist_genres, venue_genres
+from queries import genre_ids
+from search import clear_index
+from show_counts import check_counts
+
+CITIES = [
+    # (city, state, weight)
+    ('New York', 'NY', 20), ('Los Angeles', 'CA', 15), ('Chicago', 'IL', 10), ('Austin', 'TX', 8),
+    ('Nashville', 'TN', 8), ('San Francisco', 'CA', 7), ('Seattle', 'WA', 6), ('New Orleans', 'LA', 6),
+    ('Atlanta', 'GA', 5), ('Denver', 'CO', 5), ('Portland', 'OR', 4), ('Detroit', 'MI', 3),
+    ('Boston', 'MA', 3),
+]
+ADJECTIVES = ['Blue', 'Golden', 'Wild', 'Electric', 'Velvet', 'Midnight', 'Silver', 'Crimson', 'Lucky',
+              'Rolling', 'Neon', 'Broken', 'Little', 'Grand', 'Hidden', 'Royal']
+NOUNS = ['Room', 'Hall', 'Lounge', 'Tavern', 'Garden', 'Cellar', 'Stage', 'Club', 'Barn', 'Loft']
+BAND_NOUNS = ['Petals', 'Wolves', 'Sax Band', 'Strings', 'Echoes', 'Drifters', 'Foxes', 'Rebels',
+              'Horns', 'Satellites', 'Ramblers', 'Sparrows']
+
+
+def _place(rng):
+    city, state, _ = rng.choices(CITIES, weights=[weight for _, _, weight in CITIES])[0]
+    return city, state
+
+
+def _genres(rng, key, ids, genres):
+    # One to three genres per new venue or artist.
+    return ({key: entity_id, 'genre_id': genre_id}
+            for entity_id in ids for genre_id in rng.sample(genres, min(len(genres), rng.randint(1, 3))))
+
+
+def _popularity(rng, ids):
+    # Pareto weights: a handful of ids take most of the shows.
+    return ids, [rng.paretovariate(1.2) for _ in ids]
+
+
+def _insert(table, rows, chunk_size):
+    # Core executemany in chunks: no ORM objects, bounded memory.
+    chunk = list()
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            db.session.execute(table.insert(), chunk)
+            chunk = list()
+    if chunk:
+        db.session.execute(table.insert(), chunk)
+
+
+def seed_database(n_venues, n_artists, n_shows, seed=42, chunk_size=5000):
+    """Add synthetic venues, artists and shows to the database; return the number of shows added."""
+    rng = random.Random(seed)
+    now = dt.datetime.today().replace(minute=0, second=0, microsecond=0)
+
+    def venues():
+        for i in range(n_venues):
+            city, state = _place(rng)
+            yield {'name': 'The %s %s %d' % (rng.choice(ADJECTIVES), rng.choice(NOUNS), i),
+                   'city': city, 'state': state, 'address': '%d Main St' % rng.randint(1, 9999),
+                   'phone': '%03d-%03d-%04d' % (rng.randint(200, 999), rng.randint(0, 999), rng.randint(0, 9999)),
+                   'seeking_talent': rng.random() < 0.3, 'seeking_description': '',
+                   'image_link': 'https://images.example.com/venues/%d.jpg' % i,
+                   'facebook_link': 'https://www.facebook.com/venue%d' % i}
+
+    def artists():
+        for i in range(n_artists):
+            city, state = _place(rng)
+            yield {'name': '%s %s %d' % (rng.choice(ADJECTIVES), rng.choice(BAND_NOUNS), i),
+                   'city': city, 'state': state,
+                   'phone': '%03d-%03d-%04d' % (rng.randint(200, 999), rng.randint(0, 999), rng.randint(0, 9999)),
+                   'seeking_venue': rng.random() < 0.3, 'seeking_description': '',
+                   'image_link': 'https://images.example.com/artists/%d.jpg' % i,
+                   'available_start_time': None, 'available_end_time': None}
+
+    # Rows above the current maximum ids are the new ones: seeding is not
+    # meant to run next to other writers.
+    last_venue_id = db.session.query(func.max(Venue.id)).scalar() or 0
+    last_artist_id = db.session.query(func.max(Artist.id)).scalar() or 0
+    _insert(Venue.__table__, venues(), chunk_size)
+    _insert(Artist.__table__, artists(), chunk_size)
+    venue_ids, venue_weights = _popularity(rng, [row.id for row in db.session.query(Venue.id)])
+    artist_ids, artist_weights = _popularity(rng, [row.id for row in db.session.query(Artist.id)])
+    genres = list(genre_ids().values())
+    if genres:
+        _insert(venue_genres, _genres(rng, 'venue_id', [i for i in venue_ids if i > last_venue_id], genres),
+                chunk_size)
+        _insert(artist_genres, _genres(rng, 'artist_id', [i for i in artist_ids if i > last_artist_id], genres),
+                chunk_size)
+    venue_cum_weights = _cumulative(venue_weights)
+    artist_cum_weights = _cumulative(artist_weights)
+
+    # Days on which a venue already has a show.
+    booked = set()
+    for venue_id, start_time, end_time in db.session.query(Show.venue_id, Show.start_time, Show.end_time):
+        day = start_time.date()
+        while day <= end_time.date():
+            booked.add((venue_id, day))
+            day += dt.timedelta(days=1)
+    added = [0]
+
+    def shows():
+        for _ in range(n_shows):
+            # Mostly within a few months of today, starting between 6pm and 11pm.
+            # Draw again when the venue is booked that day; give up after a few
+            # tries, so a tiny database gets fewer shows than asked for.
+            for _ in range(10):
+                venue_id = rng.choices(venue_ids, cum_weights=venue_cum_weights)[0]
+                day = now.date() + dt.timedelta(days=round(rng.gauss(0, 90)))
+                if (venue_id, day) not in booked:
+                    break
+            else:
+                continue
+            booked.add((venue_id, day))
+            added[0] += 1
+            start_time = dt.datetime.combine(day, dt.time(rng.randint(18, 23)))
+            yield {'venue_id': venue_id,
+                   'artist_id': rng.choices(artist_ids, cum_weights=artist_cum_weights)[0],
+                   'start_time': start_time, 'end_time': start_time + SHOW_DURATION}
+
+    if venue_ids and artist_ids:
+        _insert(Show.__table__, shows(), chunk_size)
+    db.session.commit()
+    # Count the new shows from scratch, rather than row by row.
+    check_counts(fix=True)
+    # Core inserts do not fire the mapper events that clear these.
+    view_cache.clear()
+    clear_index()
+    return added[0]
+
+
+def _cumulative(weights):
+    total = 0
+    cumulative = list()
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    return cumulative
+
+
+@click.command('seed')
+@with_appcontext
+@click.option('--venues', default=100, show_default=True, help='Number of venues to add.')
+@click.option('--artists', default=500, show_default=True, help='Number of artists to add.')
+@click.option('--shows', default=5000, show_default=True, help='Number of shows to add.')
+@click.option('--seed', default=42, show_default=True, help='Random seed, for reproducible data.')
+def seed_command(venues, artists, shows, seed):
+    """Add synthetic venues, artists and shows to the configured database."""
+    shows = seed_database(venues, artists, shows, seed=seed)
+    click.echo('Added %d venues, %d artists and %d shows.' % (venues, artists, shows))
+
+
+def init_app(app):
+    app.cli.add_command(seed_command)
@@ -0,0 +1,237 @@
+#----------------------------------------------------------------------------#
+# Show counters of venues and artists.
+#
+# Venues and artists carry upcoming_shows_count and past_shows_count, so list
+# and search pages read them with their rows, without touching the shows
+# table. Shows starting before the boundary stored in show_count_boundary
+# are counted as past, the others as upcoming.
+#
+# * Adding, changing or deleting shows through the ORM updates the counters
+#   in the same transaction (mapper events below). Core bulk writes call
+#   count_shows() and uncount_shows() themselves.
+# * Run `flask show-counts roll` every few minutes: it moves the boundary to
+#   now, and the shows started since the last run from upcoming to past.
+#   Until then, those shows are still counted as upcoming.
+# * `flask show-counts check` compares the counters with the shows table;
+#   with --fix, it rebuilds the wrong ones from scratch.
+#----------------------------------------------------------------------------#
+import datetime as dt
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, case, event, func, inspect, or_, select
+from app_bootstrapping import db
+from cache import view_cache
+from models import Artist, Venue, Show, ShowCountBoundary
+
+# (model, column of Show referencing it, its key in show values).
+SIDES = ((Venue, Show.venue_id, 'venue_id'), (Artist, Show.artist_id, 'artist_id'))
+
+
+def read_boundary(connection, exclusive=False):
+    """The boundary between past and upcoming shows; None if it is missing.
+
+    On PostgreSQL its row is locked until the end of the transaction: in
+    share mode by show writers, exclusively by `roll`, so that no show is
+    counted against a boundary that is being moved.
+    """
+    query = select(ShowCountBoundary.boundary).where(ShowCountBoundary.id == 1) \
+        .with_for_update(read=not exclusive)
+    return connection.execute(query).scalar()
+
+
+def _boundary(connection):
+    boundary = read_boundary(connection)
+    if boundary is None:
+        raise RuntimeError('The show count boundary is missing: run flask show-counts check --fix.')
+    return boundary
+
+
+def _apply(connection, model, deltas):
+    # Add {id: (upcoming, past)} to the counters of `model` rows, in one executemany.
+    rows = [{'entity_id': entity_id, 'upcoming': upcoming, 'past': past}
+            for entity_id, (upcoming, past) in deltas.items() if upcoming or past]
+    if not rows:
+        return
+    table = model.__table__
+    connection.execute(table.update().where(table.c.id == bindparam('entity_id')).values(
+        upcoming_shows_count=table.c.upcoming_shows_count + bindparam('upcoming'),
+        past_shows_count=table.c.past_shows_count + bindparam('past')), rows)
+
+
+def count_shows(connection, shows, sign=1):
+    """Add shows, dicts with venue_id, artist_id and start_time, to the counters.
+
+    With sign=-1, remove them instead.
+    """
+    boundary = _boundary(connection)
+    deltas = dict((model, dict()) for model, _, _ in SIDES)
+    for show in shows:
+        upcoming = show['start_time'] >= boundary
+        for model, _, key in SIDES:
+            counts = deltas[model].get(show[key], (0, 0))
+            deltas[model][show[key]] = (counts[0] + sign, counts[1]) if upcoming else (counts[0], counts[1] + sign)
+    for model, _, _ in SIDES:
+        _apply(connection, model, deltas[model])
+
+
+def uncount_shows(connection, condition):
+    """Remove the shows matching `condition` from the counters, before deleting them.
+
+    One GROUP BY query and one executemany per side, whatever the number
+    of shows.
+    """
+    boundary = _boundary(connection)
+    for model, foreign_key, _ in SIDES:
+        rows = connection.execute(select(foreign_key,
+                                         func.count(case((Show.start_time >= boundary, Show.id))),
+                                         func.count(case((Show.start_time < boundary, Show.id))))
+                                  .where(condition).group_by(foreign_key))
+        _apply(connection, model, dict((entity_id, (-upcoming, -past)) for entity_id, upcoming, past in rows))
+
+
+def roll(now=None):
+    """Move the boundary to `now`, and the shows started since from upcoming to past.
+
+    Reads only the shows started since the last roll, from the start_time
+    index, and commits. Returns the number of shows moved.
+    """
+    if now is None:
+        now = dt.datetime.today()
+    connection = db.session.connection()
+    boundary = read_boundary(connection, exclusive=True)
+    if boundary is None:
+        raise RuntimeError('The show count boundary is missing: run flask show-counts check --fix.')
+    moved = 0
+    if now > boundary:
+        for model, foreign_key, _ in SIDES:
+            rows = connection.execute(select(foreign_key, func.count(Show.id))
+                                      .where(Show.start_time >= boundary, Show.start_time < now)
+                                      .group_by(foreign_key)).all()
+            _apply(connection, model, dict((entity_id, (-count, count)) for entity_id, count in rows))
+            # The same on both sides.
+            moved = sum(count for _, count in rows)
+        connection.execute(ShowCountBoundary.__table__.update().where(ShowCountBoundary.id == 1)
+                           .values(boundary=now))
+    db.session.commit()
+    if moved:
+        view_cache.clear()
+    return moved
+
+
+def check_counts(fix=False):
+    """Compare the counters with the shows table: [(model, id, stored, actual)].
+
+    `stored` and `actual` are (upcoming, past) pairs of the wrong rows. With
+    `fix`, those rows are set to the actual counts, and a missing boundary
+    is set to now; the change is committed.
+    """
+    connection = db.session.connection()
+    boundary = read_boundary(connection, exclusive=fix)
+    if boundary is None:
+        if not fix:
+            raise RuntimeError('The show count boundary is missing: run flask show-counts check --fix.')
+        boundary = dt.datetime.today()
+        connection.execute(ShowCountBoundary.__table__.insert(), {'id': 1, 'boundary': boundary})
+    mismatches = list()
+    for model, foreign_key, _ in SIDES:
+        upcoming = select(func.count(Show.id)).where(foreign_key == model.id, Show.start_time >= boundary) \
+            .scalar_subquery()
+        past = select(func.count(Show.id)).where(foreign_key == model.id, Show.start_time < boundary) \
+            .scalar_subquery()
+        rows = connection.execute(select(model.id, model.upcoming_shows_count, model.past_shows_count,
+                                         upcoming, past)
+                                  .where(or_(model.upcoming_shows_count != upcoming,
+                                             model.past_shows_count != past))
+                                  .order_by(model.id)).all()
+        mismatches.extend((model, row[0], (row[1], row[2]), (row[3], row[4])) for row in rows)
+        if fix:
+            _apply(connection, model, dict((row[0], (row[3] - row[1], row[4] - row[2])) for row in rows))
+    if fix:
+        db.session.commit()
+        view_cache.clear()
+    else:
+        db.session.rollback()
+    return mismatches
+
+
+#  ORM events
+#  ----------------------------------------------------------------
+
+def _values(show):
+    return {'venue_id': show.venue_id, 'artist_id': show.artist_id, 'start_time': show.start_time}
+
+
+@event.listens_for(Show, 'after_insert')
+def _count_inserted(mapper, connection, target):
+    count_shows(connection, [_values(target)])
+
+
+@event.listens_for(Show, 'after_delete')
+def _uncount_deleted(mapper, connection, target):
+    count_shows(connection, [_values(target)], sign=-1)
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+# A show's attributes are expired after a commit: without active history,
+# setting them does not load the old values, and _recount_updated would not
+# know where the show was counted.
+for _key in ('venue_id', 'artist_id', 'start_time'):
+    event.listen(getattr(Show, _key), 'set', _load_old_value, active_history=True)
+
+
+@event.listens_for(Show, 'after_update')
+def _recount_updated(mapper, connection, target):
+    state = inspect(target)
+    old = dict()
+    for key in ('venue_id', 'artist_id', 'start_time'):
+        deleted = state.attrs[key].history.deleted
+        old[key] = deleted[0] if deleted else getattr(target, key)
+    new = _values(target)
+    if old != new:
+        count_shows(connection, [old], sign=-1)
+        count_shows(connection, [new])
+
+
+def _uncount_shows_of(model, foreign_key):
+    # The database deletes the shows of a deleted venue or artist (ON DELETE
+    # CASCADE), without the ORM loading them: take them off the counters of
+    # their artists or venues first.
+    def uncount(mapper, connection, target):
+        uncount_shows(connection, foreign_key == target.id)
+    event.listen(model, 'before_delete', uncount)
+
+
+for _model, _foreign_key, _ in SIDES:
+    _uncount_shows_of(_model, _foreign_key)
+
+
+#  Commands
+#  ----------------------------------------------------------------
+
+show_counts_cli = AppGroup('show-counts', help='Show counters of venues and artists.')
+
+
+@show_counts_cli.command('roll')
+def roll_command():
+    """Count the shows started since the last run as past; run it every few minutes."""
+    click.echo('Moved %d shows from upcoming to past.' % roll())
+
+
+@show_counts_cli.command('check')
+@click.option('--fix', is_flag=True, help='Rebuild the wrong counters from the shows table.')
+def check_command(fix):
+    """Compare the show counters with the shows table."""
+    mismatches = check_counts(fix=fix)
+    for model, entity_id, stored, actual in mismatches:
+        click.echo('%s %d: upcoming/past %d/%d, should be %d/%d'
+                   % ((model.__tablename__, entity_id) + stored + actual))
+    click.echo('%d wrong counters%s.' % (len(mismatches), ', fixed' if fix and mismatches else ''))
+    if mismatches and not fix:
+        raise SystemExit(1)
+
+
+def init_app(app):
+    app.cli.add_command(show_counts_cli)
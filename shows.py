@@ -0,0 +1,99 @@
+#----------------------------------------------------------------------------#
+# Show pages.
+#----------------------------------------------------------------------------#
+import sys
+from flask import Blueprint, current_app, render_template, request, Response, flash, redirect, url_for, \
+    stream_with_context
+from app_bootstrapping import db
+from forms import ShowForm
+from models import Artist, Venue, Show
+from queries import show_listing, table_state
+from conditional import conditional_get
+from cache import view_cache
+from booking import book_show
+from pages import enqueue_follow_ups, stream_template
+
+show_pages = Blueprint('shows', __name__)
+
+
+def show_page(after, limit):
+    # View data of one /shows page: (shows, next_cursor).
+    rows, next_cursor = show_listing(after=after, limit=limit)
+    data = [{'venue_id': row.venue_id,
+             'venue_name': row.venue_name,
+             'artist_id': row.artist_id,
+             'artist_name': row.artist_name,
+             'artist_image_link': row.artist_image_link,
+             'start_time': row.start_time
+             } for row in rows]
+    return data, next_cursor
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@show_pages.route('/shows')
+@conditional_get(lambda: table_state(Show, Venue, Artist))
+def shows():
+    # Displays list of shows at /shows, one keyset page at a time.
+    # ?after=<cursor> selects the page following the given show.
+    after = request.args.get('after')
+    limit = current_app.config['SHOWS_PER_PAGE']
+    data, next_cursor = view_cache.get_or_set('shows:%s:%d' % (after, limit),
+                                              lambda: show_page(after, limit))
+    if current_app.config['STREAM_SHOWS']:
+        return Response(stream_with_context(
+            stream_template('pages/shows.html', shows=data, next_cursor=next_cursor)))
+    return render_template('pages/shows.html', shows=data, next_cursor=next_cursor)
+
+@show_pages.route('/shows/create')
+def create_shows():
+    # renders form. do not touch.
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+@show_pages.route('/shows/create', methods=['POST'])
+def create_show_submission():
+    # called upon submitting the new show listing form
+
+    form = ShowForm()
+    problems = []
+    if form.validate_on_submit():
+        # on successful db insert, flash success
+        error = False
+        show_data = {}
+        try:
+            # Artist availability and venue double-booking are checked by
+            # one query, in the transaction of the insert.
+            new_show, booking, problems = book_show(int(form.artist_id.data), int(form.venue_id.data),
+                                                    form.start_time.data)
+            if problems:
+                raise Exception('Show cannot be booked')
+
+            db.session.commit()
+            show_data['desc'] = "Show for artist %s at venue %s on %s" % (booking.artist_name,
+                                                                          booking.venue_name,
+                                                                          new_show.start_time)
+        except:
+            error = True
+            db.session.rollback()
+            print(sys.exc_info())
+        finally:
+            db.session.close()
+            if error:
+                flash('An error occurred: Error during db insertion. Show could not be listed.', 'error')
+                for problem in problems:
+                    flash('An error occurred: ' + problem, 'error')
+                return render_template('forms/new_show.html', form=form)
+                # return redirect(url_for('.shows'))
+                # abort(400)
+            else:
+                enqueue_follow_ups()
+                flash('Show ' + show_data['desc'] + ' was successfully listed!')
+                # return redirect(url_for('.shows'))
+                # return render_template('pages/home.html')
+                return redirect(url_for('pages.index'))
+    else:
+
+        flash('An error occurred: Your form is invalid. Show  could not be listed.', 'error')
+        return render_template('forms/new_show.html', form=form)
@@ -0,0 +1,61 @@
+import datetime as dt
+import pytest
+from sqlalchemy import event
+from app_bootstrapping import create_app, db
+from models import Artist, Genre, Show, Venue
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def statements(app):
+    """The SQL statements issued since the test started; clear() it to restart."""
+    issued = list()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        issued.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield issued
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def seed(app):
+    """seed(venues, artists, shows): that many venues and artists, and shows
+    between them, half of them past; returns their (venue ids, artist ids).
+
+    Views close the session, so tests load rows again by id.
+    """
+    def seed(venues=3, artists=3, shows=6):
+        now = dt.datetime.today()
+        jazz, rock = Genre.query.filter(Genre.name.in_(['Jazz', 'Rock n Roll'])).order_by(Genre.name).all()
+        venue_rows = [Venue(name='Venue %d' % i, city='City %d' % (i % 2), state='CA', address='1 Main St',
+                            phone='555-555-0100', genres=[jazz, rock] if i % 2 else [jazz],
+                            seeking_description='') for i in range(venues)]
+        artist_rows = [Artist(name='Artist %d' % i, city='City %d' % (i % 2), state='NY', phone='555-555-0101',
+                              genres=[rock] if i % 2 else [jazz], seeking_description='') for i in range(artists)]
+        db.session.add_all(venue_rows + artist_rows)
+        db.session.flush()
+        # Available at any time: None at insert would take the column defaults.
+        for artist in artist_rows:
+            artist.available_start_time = artist.available_end_time = None
+        for i in range(shows):
+            db.session.add(Show(venue_id=venue_rows[i % venues].id, artist_id=artist_rows[i % artists].id,
+                                start_time=now + dt.timedelta(days=i - shows // 2)))
+        db.session.commit()
+        return [venue.id for venue in venue_rows], [artist.id for artist in artist_rows]
+    return seed
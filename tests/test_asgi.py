@@ -0,0 +1,129 @@
+import asyncio
+import pytest
+from flask import g
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.pool import NullPool
+from app_bootstrapping import db
+from config import TestingConfig
+from models import Venue
+from queries import recent_listings, venue_detail
+
+pytest.importorskip('aiosqlite')
+from asgi import create_asgi_app
+import fanout
+from fanout import in_session
+
+
+@pytest.fixture
+def asgi_app(tmp_path):
+    # Both engines open the same SQLite file; unpooled, so that fan_out()
+    # may open a connection per query.
+    class FileConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///%s' % (tmp_path / 'fyyur.db')
+        SQLALCHEMY_ENGINE_OPTIONS = {'poolclass': NullPool}
+        ASYNC_ENGINE_OPTIONS = {}
+
+    asgi_app = create_asgi_app(FileConfig)
+    yield asgi_app
+    asyncio.run(asgi_app.engine.dispose())
+
+
+@pytest.fixture
+def app(asgi_app):
+    with asgi_app.app.app_context():
+        db.create_all()
+        yield asgi_app.app
+        db.session.remove()
+        db.drop_all()
+
+
+def call(asgi_app, method, path, body=b'', content_type=None):
+    """(status, body) of a request sent to the ASGI application."""
+    headers = [(b'host', b'localhost')]
+    if content_type:
+        headers += [(b'content-type', content_type.encode()), (b'content-length', str(len(body)).encode())]
+    scope = {'type': 'http', 'http_version': '1.1', 'method': method, 'scheme': 'http', 'path': path,
+             'root_path': '', 'query_string': b'', 'headers': headers,
+             'server': ('localhost', 80), 'client': ('127.0.0.1', 50000)}
+    received = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = list()
+
+    async def receive():
+        return received.pop(0) if received else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+    return sent[0]['status'], b''.join(message.get('body', b'') for message in sent[1:])
+
+
+def count_statements(engine):
+    issued = list()
+    event.listen(engine, 'before_cursor_execute', lambda *args: issued.append(args[2]))
+    return issued
+
+
+def test_read_only_page_is_served_on_the_async_engine(asgi_app, seed):
+    venues, _ = seed()
+    sync_statements = count_statements(db.engine)
+    async_statements = count_statements(asgi_app.engine.sync_engine)
+    status, body = call(asgi_app, 'GET', '/venues/%d' % venues[0])
+    assert status == 200
+    assert b'Venue 0' in body
+    assert sync_statements == []
+    assert async_statements
+
+
+def test_write_is_served_by_the_wsgi_application(asgi_app, seed):
+    seed()
+    form = b'name=New+Venue&city=Boston&state=MA&address=1+Main+St&phone=555-555-0100&genres=Jazz' \
+           b'&seeking_description='
+    status, _ = call(asgi_app, 'POST', '/venues/create', form, 'application/x-www-form-urlencoded')
+    assert status == 302
+    assert Venue.query.filter_by(name='New Venue').count() == 1
+
+    status, body = call(asgi_app, 'GET', '/venues')
+    assert status == 200
+    assert b'New Venue' in body
+
+
+def fan_out_results(app, fan_out_setting, engine=None):
+    # recent_listings() and venue_detail() run their queries with fan_out().
+    def read():
+        artists, venues = recent_listings()
+        venue, past_shows, upcoming_shows = venue_detail(venues[-1]['id'])
+        return (artists, venues, venue.name, venue.genre_names,
+                [(show.id, show.artist.name) for show in past_shows],
+                [(show.id, show.artist.name) for show in upcoming_shows])
+
+    app.config['FAN_OUT'] = fan_out_setting
+    with app.test_request_context('/'):
+        if engine is None:
+            return read()
+        g.async_engine = engine
+
+        async def run():
+            async with AsyncSession(engine) as session:
+                return await session.run_sync(in_session, read)
+        return asyncio.run(run())
+
+
+def test_fan_out_modes_read_the_same(asgi_app, seed, monkeypatch):
+    seed(venues=3, artists=4, shows=12)
+    app = asgi_app.app
+    modes = list()
+    for name in ('_fan_out_threads', '_fan_out_async'):
+        def record(*args, mode=name, run=getattr(fanout, name)):
+            modes.append(mode)
+            return run(*args)
+        monkeypatch.setattr(fanout, name, record)
+
+    serial = fan_out_results(app, False)
+    assert serial[4] and serial[5]
+    assert modes == []
+    assert fan_out_results(app, True) == serial
+    assert modes == ['_fan_out_threads'] * 2
+    assert fan_out_results(app, True, asgi_app.engine) == serial
+    assert modes == ['_fan_out_threads'] * 2 + ['_fan_out_async'] * 2
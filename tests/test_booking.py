@@ -0,0 +1,162 @@
+import datetime as dt
+import threading
+import time
+import pytest
+from app_bootstrapping import create_app, db
+from booking import BAD_START_TIME, VENUE_BOOKED, book_show, check_booking, find_conflicts, free_gaps, free_slots
+from models import Artist, Show, Venue, SHOW_DURATION
+
+NOON = dt.datetime(2030, 6, 1, 12, 0)
+HOUR = dt.timedelta(hours=1)
+
+
+def booked(seed):
+    # One venue and one artist, with a show from noon to 15:00.
+    venues, artists = seed(venues=1, artists=1, shows=0)
+    show, _, problems = book_show(artists[0], venues[0], NOON)
+    assert show is not None and problems == []
+    db.session.commit()
+    return venues[0], artists[0]
+
+
+def test_overlapping_show_is_rejected(seed):
+    venue_id, artist_id = booked(seed)
+    show, row, problems = book_show(artist_id, venue_id, NOON + HOUR)
+    assert show is None
+    assert problems == [VENUE_BOOKED]
+    assert row.venue_name == 'Venue 0'
+    assert Show.query.count() == 1
+
+
+def test_show_may_start_when_the_previous_one_ends(seed):
+    venue_id, artist_id = booked(seed)
+    show, _, problems = book_show(artist_id, venue_id, NOON + SHOW_DURATION)
+    assert problems == []
+    assert show.end_time == NOON + 2 * SHOW_DURATION
+
+
+def test_show_ending_when_the_next_one_starts_is_accepted(seed):
+    venue_id, artist_id = booked(seed)
+    _, problems = check_booking(artist_id, venue_id, NOON - 2 * HOUR, NOON)
+    assert problems == []
+    _, problems = check_booking(artist_id, venue_id, NOON - 2 * HOUR, NOON + dt.timedelta(minutes=1))
+    assert problems == [VENUE_BOOKED]
+
+
+def test_show_outside_the_artist_availability_is_rejected(seed):
+    venue_id, artist_id = booked(seed)
+    artist = Artist.query.get(artist_id)
+    artist.available_start_time = NOON + 10 * HOUR
+    artist.available_end_time = NOON + 20 * HOUR
+    db.session.commit()
+
+    assert check_booking(artist_id, venue_id, NOON + 5 * HOUR)[1] == [BAD_START_TIME]
+    assert check_booking(artist_id, venue_id, NOON + 10 * HOUR)[1] == []
+    assert check_booking(artist_id, venue_id, NOON + 21 * HOUR)[1] == [BAD_START_TIME]
+    assert check_booking(artist_id, venue_id, NOON + HOUR)[1] == [BAD_START_TIME, VENUE_BOOKED]
+
+
+def test_unknown_artist_or_bad_period(seed):
+    venue_id, artist_id = booked(seed)
+    assert check_booking(artist_id + 100, venue_id, NOON + 5 * HOUR) == (None, ['Unknown artist or venue.'])
+    row, problems = check_booking(artist_id, venue_id, NOON + 5 * HOUR, NOON + 4 * HOUR)
+    assert row is None and len(problems) == 1
+
+
+def test_free_slots_skip_booked_periods(seed):
+    venue_id, artist_id = booked(seed)
+    book_show(artist_id, venue_id, NOON + 4 * HOUR, NOON + 5 * HOUR)
+    db.session.commit()
+    day = NOON.replace(hour=0)
+    assert free_slots(venue_id, day, day + dt.timedelta(days=1)) == [
+        (day, NOON), (NOON + 5 * HOUR, day + dt.timedelta(days=1))]
+
+
+def test_free_gaps_merge_overlapping_intervals():
+    start, end = NOON, NOON + 10 * HOUR
+    busy = [(NOON + HOUR, NOON + 3 * HOUR), (NOON + 2 * HOUR, NOON + 4 * HOUR), (NOON + 5 * HOUR, NOON + 6 * HOUR)]
+    assert list(free_gaps(busy, start, end)) == [
+        (NOON, NOON + HOUR), (NOON + 4 * HOUR, NOON + 5 * HOUR), (NOON + 6 * HOUR, end)]
+    assert list(free_gaps(busy, start, end, min_length=2 * HOUR)) == [(NOON + 6 * HOUR, end)]
+
+
+def test_find_conflicts_with_shows_and_earlier_rows(seed):
+    venue_id, _ = booked(seed)
+    rows = [
+        {'venue_id': venue_id, 'start_time': NOON + HOUR, 'end_time': NOON + 2 * HOUR},
+        {'venue_id': venue_id, 'start_time': NOON + 4 * HOUR, 'end_time': NOON + 6 * HOUR},
+        {'venue_id': venue_id, 'start_time': NOON + 5 * HOUR, 'end_time': NOON + 7 * HOUR},
+        {'venue_id': venue_id, 'start_time': NOON + 6 * HOUR, 'end_time': NOON + 7 * HOUR},
+        {'venue_id': venue_id + 1, 'start_time': NOON, 'end_time': NOON + HOUR},
+    ]
+    assert find_conflicts(rows) == {0, 2}
+
+
+def test_booking_form_reports_a_double_booking(client, seed):
+    venue_id, artist_id = booked(seed)
+    response = client.post('/shows/create', data={'artist_id': artist_id, 'venue_id': venue_id,
+                                                   'start_time': (NOON + HOUR).strftime('%Y-%m-%d %H:%M:%S')})
+    assert response.status_code == 200
+    assert VENUE_BOOKED.encode() in response.data
+    assert Show.query.count() == 1
+
+
+@pytest.mark.parametrize('query', [{'start': '2030-06-01T00:00:00+00:00', 'end': '2030-06-02T00:00:00'},
+                                   {'start': '2030-06-01T00:00:00+02:00', 'end': '2030-06-02T00:00:00+02:00'}])
+def test_free_slots_reject_utc_offsets(client, seed, query):
+    venue_id, _ = booked(seed)
+    response = client.get('/api/v1/venues/%d/free-slots' % venue_id, query_string=query)
+    assert response.status_code == 400
+    assert 'UTC offset' in response.get_json()['error']
+
+
+def test_free_slots_api(client, seed):
+    venue_id, _ = booked(seed)
+    response = client.get('/api/v1/venues/%d/free-slots?start=2030-06-01T00:00:00&end=2030-06-02T00:00:00'
+                          % venue_id)
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) == 2
+
+
+def test_concurrent_bookings_of_a_slot_on_sqlite(tmp_path):
+    # Two requests booking the same slot: the second one checks once the
+    # first has committed, and is rejected.
+    app = create_app('testing')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///%s' % (tmp_path / 'bookings.db')
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {}
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([Venue(name='Venue', city='City', state='CA', address='1 Main St',
+                                  seeking_description=''),
+                            Artist(name='Artist', city='City', state='NY', phone='555-555-0101',
+                                   seeking_description='')])
+        db.session.commit()
+        Artist.query.one().available_start_time = Artist.query.one().available_end_time = None
+        db.session.commit()
+        venue_id, artist_id = Venue.query.one().id, Artist.query.one().id
+        db.session.remove()
+
+    first_booked = threading.Event()
+    results = dict()
+
+    def book(name, wait=None):
+        with app.app_context():
+            show, _, problems = book_show(artist_id, venue_id, NOON)
+            if wait is not None:
+                first_booked.set()
+                # Leaves the second booking time to check while this one is uncommitted.
+                time.sleep(wait)
+            db.session.commit()
+            results[name] = problems
+
+    first = threading.Thread(target=book, args=('first', 0.5))
+    first.start()
+    first_booked.wait(5)
+    second = threading.Thread(target=book, args=('second',))
+    second.start()
+    first.join()
+    second.join()
+    assert results == {'first': [], 'second': [VENUE_BOOKED]}
+    with app.app_context():
+        assert Show.query.count() == 1
+        db.drop_all()
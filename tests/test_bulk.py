@@ -0,0 +1,74 @@
+import datetime as dt
+import io
+import json
+import pytest
+from bulk import export_rows, import_rows, read_rows
+from models import Show, Venue
+from show_counts import check_counts
+
+
+def export(kind, fmt):
+    return b''.join(export_rows(kind, fmt, batch_size=4))
+
+
+def records(data, fmt):
+    rows = [row for _, row, _ in read_rows(io.BytesIO(data), fmt)]
+    if fmt == 'csv':
+        for row in rows:
+            row['genres'] = row['genres'].split(',')
+    return rows
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'ndjson'])
+@pytest.mark.parametrize('kind', ['venues', 'artists'])
+def test_export_import_round_trip(seed, kind, fmt):
+    seed(venues=6, artists=6, shows=0)
+    exported = export(kind, fmt)
+    report = import_rows(kind, read_rows(io.BytesIO(exported), fmt), batch_size=4)
+    assert report.as_dict() == {'inserted': 6, 'failed': 0, 'errors': [], 'errors_truncated': False}
+
+    before = records(exported, fmt)
+    after = records(export(kind, fmt), fmt)
+    assert len(after) == 12
+    for original, copy in zip(before, after[6:]):
+        assert int(copy.pop('id')) > int(original.pop('id'))
+        assert copy == original
+
+
+def test_import_issues_a_fixed_number_of_statements(seed, statements):
+    seed(venues=1, artists=1, shows=0)
+    rows = [{'name': 'Venue %d' % i, 'city': 'Boston', 'state': 'MA', 'address': '%d Main St' % i,
+             'phone': '555-555-0100', 'genres': ['Jazz', 'Blues'], 'seeking_description': ''} for i in range(50)]
+    statements.clear()
+    report = import_rows('venues', ((line, row, None) for line, row in enumerate(rows, 2)), batch_size=50)
+    assert report.inserted == 50
+    assert len([statement for statement in statements if statement.startswith('INSERT')]) == 2
+    assert len(statements) <= 4
+    assert sorted(Venue.query.filter_by(name='Venue 49').one().genre_names) == ['Blues', 'Jazz']
+
+
+def test_invalid_rows_are_reported_and_skipped(seed):
+    seed(venues=1, artists=1, shows=0)
+    data = b'{"name": "Good", "city": "Boston", "state": "MA", "address": "1 Main St", "phone": "555-555-0100",' \
+           b' "genres": ["Jazz"], "seeking_description": ""}\n' \
+           b'{"name": "", "city": "Boston", "state": "MA", "address": "1 Main St", "genres": ["Jazz"]}\n' \
+           b'not json\n'
+    report = import_rows('venues', read_rows(io.BytesIO(data), 'ndjson'))
+    assert report.inserted == 1
+    assert [error['line'] for error in report.errors] == [2, 3]
+    assert 'name' in report.errors[0]['errors']
+
+
+def test_imported_shows_are_counted_and_checked(seed):
+    venues, artists = seed(venues=1, artists=1, shows=0)
+    start = dt.datetime.today().replace(microsecond=0) + dt.timedelta(days=7)
+    lines = [{'artist_id': artists[0], 'venue_id': venues[0], 'start_time': start.isoformat()},
+             {'artist_id': artists[0], 'venue_id': venues[0], 'start_time': (start + dt.timedelta(hours=1)).isoformat()},
+             {'artist_id': artists[0], 'venue_id': venues[0] + 1, 'start_time': start.isoformat()}]
+    data = ''.join(json.dumps(line) + '\n' for line in lines).encode()
+    report = import_rows('shows', read_rows(io.BytesIO(data), 'ndjson'))
+    assert report.inserted == 1
+    assert [error['line'] for error in report.errors] == [2, 3]
+    assert Show.query.count() == 1
+    assert check_counts() == []
+    assert b'"artist_id":%d' % artists[0] in export('shows', 'ndjson')
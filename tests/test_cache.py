@@ -0,0 +1,60 @@
+import pytest
+from app_bootstrapping import db
+from cache import LocalRedis, LRUCache, RedisCache, view_cache
+from models import Venue
+
+
+@pytest.fixture
+def cached(app):
+    app.config['CACHE_ENABLED'] = True
+    # Answered in full every time, so that the view reads its data.
+    app.config['CONDITIONAL_GET'] = False
+    view_cache.clear()
+    yield view_cache
+    view_cache.clear()
+
+
+def lookups():
+    stats = view_cache.stats()
+    return stats['hits'], stats['misses']
+
+
+def test_listing_data_is_read_from_the_cache(client, seed, cached, statements):
+    seed()
+    hits, misses = lookups()
+    statements.clear()
+    client.get('/venues')
+    assert lookups() == (hits, misses + 1)
+    uncached = len(statements)
+
+    statements.clear()
+    assert client.get('/venues').status_code == 200
+    assert lookups() == (hits + 1, misses + 1)
+    assert len(statements) < uncached
+
+
+@pytest.mark.parametrize('change', ['insert', 'update', 'delete'])
+def test_venue_changes_clear_the_cache(client, seed, cached, change):
+    venues, _ = seed()
+    assert b'Venue 0' in client.get('/venues').data
+
+    if change == 'insert':
+        db.session.add(Venue(name='Fresh Venue', city='City 0', state='CA', address='2 Main St',
+                             seeking_description=''))
+    elif change == 'update':
+        Venue.query.get(venues[0]).name = 'Fresh Venue'
+    else:
+        db.session.delete(Venue.query.get(venues[0]))
+    db.session.commit()
+
+    data = client.get('/venues').data
+    assert (b'Fresh Venue' in data) == (change != 'delete')
+    assert (b'Venue 0' in data) == (change == 'insert')
+
+
+@pytest.mark.parametrize('backend', [LRUCache(), RedisCache(LocalRedis())], ids=['memory', 'redis'])
+def test_backends_forget_entries_when_cleared(backend):
+    backend.set('key', {'value': 1})
+    assert backend.get('key') == (True, {'value': 1})
+    backend.clear()
+    assert backend.get('key') == (False, None)
@@ -0,0 +1,87 @@
+import datetime as dt
+from app_bootstrapping import db
+from cache import view_cache
+from jobs import warm_view_cache
+from models import Show, Venue
+
+
+def test_detail_page_is_not_modified_for_its_etag(client, seed):
+    venues, _ = seed()
+    url = '/venues/%d' % venues[0]
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+
+def test_detail_page_is_not_modified_since_its_last_modified(client, seed):
+    _, artists = seed()
+    url = '/artists/%d' % artists[0]
+    last_modified = client.get(url).headers['Last-Modified']
+    assert client.get(url, headers={'If-Modified-Since': last_modified}).status_code == 304
+
+
+def test_detail_page_etag_changes_with_the_venue(client, seed):
+    venues, _ = seed()
+    url = '/venues/%d' % venues[0]
+    etag = client.get(url).headers['ETag']
+
+    Venue.query.get(venues[0]).name = 'Renamed Venue'
+    db.session.commit()
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert b'Renamed Venue' in response.data
+    assert response.headers['ETag'] != etag
+
+
+def test_listing_etag_changes_with_a_new_show(client, seed):
+    venues, artists = seed()
+    etag = client.get('/shows').headers['ETag']
+    assert client.get('/shows', headers={'If-None-Match': etag}).status_code == 304
+
+    db.session.add(Show(venue_id=venues[0], artist_id=artists[0],
+                        start_time=dt.datetime.today() + dt.timedelta(days=30)))
+    db.session.commit()
+
+    assert client.get('/shows', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_unknown_entity_has_no_etag(client, seed):
+    seed()
+    response = client.get('/venues/999')
+    assert response.status_code != 200
+    assert 'ETag' not in response.headers
+
+
+def test_cached_data_is_not_sent_under_a_newer_etag(app, client, seed):
+    app.config['CACHE_ENABLED'] = True
+    view_cache.clear()
+    venues, _ = seed()
+    etag = client.get('/venues').headers['ETag']
+
+    # A write of another worker: it leaves the cache of this one warm.
+    table = Venue.__table__
+    db.session.execute(table.update().where(table.c.id == venues[0]).values(name='Renamed Venue'))
+    db.session.commit()
+
+    response = client.get('/venues', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert b'Renamed Venue' in response.data
+    assert response.headers['ETag'] != etag
+    view_cache.clear()
+
+
+def test_warmed_cache_serves_pages_with_etags(app, client, seed):
+    app.config['CACHE_ENABLED'] = True
+    view_cache.clear()
+    seed()
+    warm_view_cache()
+    hits = view_cache.stats()['hits']
+    client.get('/venues')
+    assert view_cache.stats()['hits'] == hits + 1
+    view_cache.clear()
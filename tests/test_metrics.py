@@ -0,0 +1,62 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import metrics
+
+
+def test_exited_threads_are_folded_into_the_total():
+    counter = metrics.Counter('test_total', 'Test counter.', ['thread'])
+
+    def work():
+        for _ in range(10):
+            counter.inc('worker')
+
+    threads = [threading.Thread(target=work) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc('main')
+
+    assert counter.value('worker') == 200
+    assert counter.value('main') == 1
+    # Only this thread's shard is left.
+    assert list(counter._shards) == [threading.current_thread()]
+
+
+def test_requests_are_counted_without_profiling(app, client):
+    app.config['PROFILING_ENABLED'] = False
+    before = metrics.requests_total.value('pages.index', 200)
+    observed = metrics.request_seconds.snapshot().get(('pages.index',), [0])[-1]
+    assert client.get('/').status_code == 200
+    assert metrics.requests_total.value('pages.index', 200) == before + 1
+    assert metrics.request_seconds.snapshot()[('pages.index',)][-1] == observed + 1
+    assert 'Server-Timing' not in client.get('/').headers
+
+
+def test_metrics_page_lists_requests(client):
+    client.get('/venues')
+    body = client.get('/metrics').data.decode()
+    assert 'fyyur_requests_total{endpoint="venues.venues",status="200"}' in body
+    assert 'fyyur_request_duration_seconds_count{endpoint="venues.venues"}' in body
+
+
+def value(data, metric, *labelvalues):
+    series = dict((tuple(labels), values) for labels, values in data.get(metric.name, []))
+    return series.get(labelvalues, [0])[0]
+
+
+def test_gauges_of_exited_workers_are_dropped(tmp_path):
+    # Snapshots of an exited worker and of a running one (the parent process).
+    exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+    exited.wait()
+    dumped = {metrics.jobs_queued.name: [[['test'], [3]]],
+              metrics.jobs_total.name: [[['test', 'succeeded'], [5]]]}
+    for pid in (exited.pid, os.getppid()):
+        (tmp_path / ('metrics-%d.json' % pid)).write_text(json.dumps(dumped))
+
+    data = metrics.collect(str(tmp_path))
+    assert value(data, metrics.jobs_queued, 'test') == 3
+    assert value(data, metrics.jobs_total, 'test', 'succeeded') == 10
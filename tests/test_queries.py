@@ -0,0 +1,19 @@
+import pytest
+
+# Statements per listing page, whatever the number of venues, artists and shows.
+MAX_STATEMENTS = 3
+
+
+@pytest.mark.parametrize('url', ['/venues', '/artists', '/shows'])
+def test_listing_statements_do_not_grow_with_rows(client, seed, statements, url):
+    seed(venues=2, artists=2, shows=4)
+    client.get(url)
+    statements.clear()
+    assert client.get(url).status_code == 200
+    few = len(statements)
+
+    seed(venues=20, artists=20, shows=60)
+    statements.clear()
+    assert client.get(url).status_code == 200
+    assert len(statements) == few
+    assert len(statements) <= MAX_STATEMENTS
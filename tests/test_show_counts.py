@@ -0,0 +1,100 @@
+import datetime as dt
+import time
+from app_bootstrapping import db
+from models import Artist, Show, Venue
+from show_counts import check_counts, read_boundary, roll
+
+
+def counts(model, entity_id):
+    entity = model.query.get(entity_id)
+    return entity.upcoming_shows_count, entity.past_shows_count
+
+
+def test_seeded_shows_are_counted(seed):
+    venues, artists = seed(venues=2, artists=3, shows=12)
+    assert check_counts() == []
+    assert sum(sum(counts(Venue, venue_id)) for venue_id in venues) == 12
+    assert sum(sum(counts(Artist, artist_id)) for artist_id in artists) == 12
+
+
+def test_moved_and_rescheduled_shows_are_recounted(seed):
+    venues, artists = seed(venues=2, artists=2, shows=0)
+    show = Show(venue_id=venues[0], artist_id=artists[0], start_time=dt.datetime.today() + dt.timedelta(days=3))
+    db.session.add(show)
+    db.session.commit()
+    assert counts(Venue, venues[0]) == (1, 0)
+
+    show.venue_id = venues[1]
+    show.start_time = dt.datetime.today() - dt.timedelta(days=3)
+    db.session.commit()
+    assert counts(Venue, venues[0]) == (0, 0)
+    assert counts(Venue, venues[1]) == (0, 1)
+    assert counts(Artist, artists[0]) == (0, 1)
+    assert check_counts() == []
+
+    db.session.delete(show)
+    db.session.commit()
+    assert counts(Venue, venues[1]) == (0, 0)
+    assert check_counts() == []
+
+
+def test_deleting_a_venue_uncounts_its_shows(seed):
+    venues, artists = seed(venues=2, artists=3, shows=12)
+    db.session.delete(Venue.query.get(venues[0]))
+    db.session.commit()
+    assert Show.query.count() == 6
+    assert check_counts() == []
+
+
+def test_bulk_delete_keeps_counts(client, seed):
+    seed(venues=2, artists=3, shows=12)
+    ids = [show_id for show_id, in db.session.query(Show.id).order_by(Show.id).limit(5)]
+    response = client.post('/api/v1/shows/delete', json={'ids': ids})
+    assert response.get_json() == {'deleted': 5}
+    assert check_counts() == []
+
+
+def test_roll_moves_started_shows_to_past(seed):
+    venues, _ = seed(venues=1, artists=1, shows=10)
+    upcoming, past = counts(Venue, venues[0])
+    assert (upcoming, past) == (5, 5)
+
+    later = dt.datetime.today() + dt.timedelta(days=2, hours=1)
+    assert roll(later) == 3
+    assert counts(Venue, venues[0]) == (2, 8)
+    assert read_boundary(db.session.connection()) == later
+    assert check_counts() == []
+    # Rolling back in time moves nothing.
+    assert roll(later - dt.timedelta(days=1)) == 0
+
+
+def test_check_fixes_wrong_counters(seed):
+    venues, _ = seed(venues=2, artists=2, shows=4)
+    table = Venue.__table__
+    db.session.execute(table.update().where(table.c.id == venues[0]).values(upcoming_shows_count=99))
+    db.session.commit()
+
+    mismatches = check_counts()
+    assert [(model, entity_id) for model, entity_id, _, _ in mismatches] == [(Venue, venues[0])]
+    assert mismatches[0][2][0] == 99
+    check_counts(fix=True)
+    assert check_counts() == []
+    assert counts(Venue, venues[0])[0] == mismatches[0][3][0]
+
+
+
+def test_listing_etag_follows_the_counters(client, seed):
+    venues, artists = seed(venues=1, artists=1, shows=0)
+    db.session.add(Show(venue_id=venues[0], artist_id=artists[0],
+                        start_time=dt.datetime.today() + dt.timedelta(seconds=0.2)))
+    db.session.commit()
+    etag = client.get('/venues').headers['ETag']
+
+    # The show starts: the page keeps counting it as upcoming until a roll.
+    time.sleep(0.3)
+    assert client.get('/venues', headers={'If-None-Match': etag}).status_code == 304
+
+    assert roll() == 1
+    response = client.get('/venues', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
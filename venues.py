@@ -0,0 +1,321 @@
+#----------------------------------------------------------------------------#
+# Venue pages.
+#----------------------------------------------------------------------------#
+import sys
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
+from app_bootstrapping import db
+from forms import VenueForm
+from models import Venue, Show
+from queries import venue_areas, venue_detail, table_state, entity_state, genre_ids, genres_named
+from conditional import conditional_get
+from cache import view_cache
+from search import search_entities
+from pages import enqueue_follow_ups
+
+venue_pages = Blueprint('venues', __name__)
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@venue_pages.route('/venues')
+@conditional_get(lambda: table_state(Venue, Show))
+def venues():
+    # Venues grouped by city/state, with num_upcoming_shows read from the
+    # venues' show counters (see show_counts.py). ?genre= lists one genre.
+    genre = request.args.get('genre')
+    data = view_cache.get_or_set('venues:%s' % genre, lambda: venue_areas(genre=genre))
+    return render_template('pages/venues.html', areas=data, genre=genre, genres=list(genre_ids()));
+
+@venue_pages.route('/venues/search', methods=['POST'])
+def search_venues():
+    # Implement search on artists with partial string search. Ensure it is case-insensitive.
+    # seach for Hop should return "The Musical Hop".
+    # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+    search_term = request.form.get('search_term', '')
+    response = search_entities(Venue, search_term, genre=request.args.get('genre'))
+    return render_template('pages/search_venues.html', results=response, search_term=search_term)
+
+@venue_pages.route('/venues/<int:venue_id>')
+@conditional_get(lambda venue_id: entity_state(Venue, venue_id))
+def show_venue(venue_id):
+    # shows the venue page with the given venue_id
+
+    error = False
+    data = None
+    try:
+        the_venue, past_shows, next_shows = venue_detail(venue_id)
+        data = {
+            "id": the_venue.id,
+            "name": the_venue.name,
+            "genres": the_venue.genre_names,
+            "address": the_venue.address,
+            "city": the_venue.city,
+            "state": the_venue.state,
+            "phone": the_venue.phone,
+            "website": the_venue.website_link,
+            "facebook_link": the_venue.facebook_link,
+            "seeking_talent": the_venue.seeking_talent,
+            "image_link": the_venue.image_link,
+            "past_shows": [{'artist_id':p_sh.artist.id,
+                            'artist_name':p_sh.artist.name,
+                            'artist_image_link':p_sh.artist.image_link,
+                            'start_time': p_sh.start_time,
+                            } for p_sh in past_shows],
+
+            'upcoming_shows': [{'artist_id':n_sh.artist.id,
+                            'artist_name':n_sh.artist.name,
+                            'artist_image_link':n_sh.artist.image_link,
+                            'start_time': n_sh.start_time,
+                            } for n_sh in next_shows],
+            'past_shows_count': len(past_shows),
+            'upcoming_shows_count': len(next_shows),
+        }
+    except:
+        error = True
+        db.session.rollback()
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+        if error:
+            flash('An error occurred: Error during db reading. Venue could not be displayed.', 'error')
+            return redirect(url_for('.venues'))
+            # abort(404)
+        else:
+            flash('Venue ' + the_venue.name + ' was successfully displayed!')
+            # return redirect(url_for('shows.shows'))
+            # return render_template('pages/home.html')
+            # return redirect(url_for('pages.index'))
+            return render_template('pages/show_venue.html', venue=data)
+
+    # data3={
+    #     "id": 3,
+    #     "name": "Park Square Live Music & Coffee",
+    #     "genres": ["Rock n Roll", "Jazz", "Classical", "Folk"],
+    #     "address": "34 Whiskey Moore Ave",
+    #     "city": "San Francisco",
+    #     "state": "CA",
+    #     "phone": "415-000-1234",
+    #     "website": "https://www.parksquarelivemusicandcoffee.com",
+    #     "facebook_link": "https://www.facebook.com/ParkSquareLiveMusicAndCoffee",
+    #     "seeking_talent": False,
+    #     "image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
+    #     "past_shows": [{
+    #         "artist_id": 5,
+    #         "artist_name": "Matt Quevedo",
+    #         "artist_image_link": "https://images.unsplash.com/photo-1495223153807-b916f75de8c5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=334&q=80",
+    #         "start_time": "2019-06-15T23:00:00.000Z"
+    #     }],
+    #     "upcoming_shows": [{
+    #         "artist_id": 6,
+    #         "artist_name": "The Wild Sax Band",
+    #         "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
+    #         "start_time": "2035-04-01T20:00:00.000Z"
+    #     }, {
+    #         "artist_id": 6,
+    #         "artist_name": "The Wild Sax Band",
+    #         "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
+    #         "start_time": "2035-04-08T20:00:00.000Z"
+    #     }, {
+    #         "artist_id": 6,
+    #         "artist_name": "The Wild Sax Band",
+    #         "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
+    #         "start_time": "2035-04-15T20:00:00.000Z"
+    #     }],
+    #     "past_shows_count": 1,
+    #     "upcoming_shows_count": 1,
+    # }
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@venue_pages.route('/venues/create', methods=['GET'])
+def create_venue_form():
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+@venue_pages.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+    # Insert form data as a new Venue record in the db, instead
+    # modify data to be the data object returned from db insertion
+    form = VenueForm()
+    if form.validate_on_submit():
+        # on successful db insert, flash success
+        error = False
+        venue_data = {}
+        try:
+            new_venue = Venue(name=form.name.data, city=form.city.data, state=form.state.data,
+                              address =form.address.data, phone =form.phone.data,
+                              genres =genres_named(form.genres.data),
+                              facebook_link =form.facebook_link.data, image_link =form.image_link.data,
+                              website_link =form.website_link.data, seeking_talent = form.seeking_talent.data,
+                              seeking_description =form.seeking_description.data)
+
+            db.session.add(new_venue)
+            db.session.commit()
+            venue_data['name'] = new_venue.name
+            venue_data['id'] = new_venue.id
+        except:
+            error = True
+            db.session.rollback()
+            print(sys.exc_info())
+        finally:
+            db.session.close()
+            if error:
+                flash('An error occurred: Error during db insertion. Venue '
+                      + form.name.data + ' could not be listed.', 'error')
+                return render_template('forms/new_venue.html', form=form)
+                # return redirect(url_for('.venues'))
+                # abort(400)
+            else:
+                enqueue_follow_ups('venue', venue_data['id'], form.image_link.data)
+                flash('Venue ' + venue_data['name'] + ' was successfully listed!')
+                # return redirect(url_for('.venues'))
+                # return render_template('pages/home.html')
+                return redirect(url_for('pages.index'))
+    else:
+        # For unsuccessful db insert, flash an error instead.
+        # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+        # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+        flash('An error occurred: Your form is invalid. Venue ' +
+              form.name.data + ' could not be listed.', 'error')
+        return render_template('forms/new_venue.html', form=form)
+
+@venue_pages.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+    # Complete this endpoint for taking a venue_id, and using
+    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+
+    # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+    # clicking that button delete it from the db then redirect the user to the homepage
+    # Its shows and genre links are deleted by the database, not loaded.
+    venue = Venue.query.get_or_404(venue_id)
+    error = False
+    venue_data = {}
+    try:
+        venue_data['name'] = venue.name
+        venue_data['js_redirect'] = url_for('pages.index')
+        db.session.delete(venue)
+        db.session.commit()
+    except:
+        error = True
+        db.session.rollback()
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+        if error:
+            flash('An error occurred: Error during db deletion. Venue '
+                  + venue_data['name'] + ' could not be deleted.', 'error')
+            return redirect(url_for('.venues'))
+            # abort(400)
+        else:
+            enqueue_follow_ups()
+            flash('Venue ' + venue_data['name'] + ' was successfully deleted!')
+            # return redirect(url_for('.venues'))
+            # return render_template('pages/home.html')
+            # return redirect(url_for('pages.index'))
+            return jsonify(venue_data)
+
+#  Update
+#  ----------------------------------------------------------------
+
+@venue_pages.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+    error = False
+    venue = None
+    form = None
+    try:
+        the_venue = Venue.query.get(venue_id)
+        venue = {
+            "id": the_venue.id,
+            "name": the_venue.name,
+            "genres": the_venue.genre_names,
+            "address": the_venue.address,
+            "city": the_venue.city,
+            "state": the_venue.state,
+            "phone": the_venue.phone,
+            "website": the_venue.website_link,
+            "facebook_link": the_venue.facebook_link,
+            "seeking_talent": the_venue.seeking_talent,
+            "seeking_description": the_venue.seeking_description,
+            "image_link": the_venue.image_link,
+        }
+        form = VenueForm(obj=the_venue)
+        form.genres.data = the_venue.genre_names
+    except:
+        error = True
+        db.session.rollback()
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+        if error:
+            flash('An error occurred: Error during db reading. Venue could not be displayed.', 'error')
+            return redirect(url_for('.venues'))
+            # abort(404)
+        else:
+            flash('Venue ' + the_venue.name + ' was successfully displayed!')
+            # return redirect(url_for('shows.shows'))
+            # return render_template('pages/home.html')
+            # return redirect(url_for('pages.index'))
+            return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+
+@venue_pages.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+    #Take values from the form submitted, and update existing
+    # venue record with ID <venue_id> using the new attributes
+
+    error = False
+    form = VenueForm(formdata=request.form)
+    try:
+        the_venue = Venue.query.get(venue_id)
+        venue = {
+            "id": the_venue.id,
+            "name": the_venue.name,
+            "genres": the_venue.genre_names,
+            "city": the_venue.city,
+            "state": the_venue.state,
+            "phone": the_venue.phone,
+            "address": the_venue.address,
+            "website": the_venue.website_link,
+            "facebook_link": the_venue.facebook_link,
+            "seeking_talent": the_venue.seeking_talent,
+            "seeking_description": the_venue.seeking_description,
+            "image_link": the_venue.image_link,
+        }
+        if form.validate_on_submit():
+            the_venue.name = form.name.data
+            the_venue.genres = genres_named(form.genres.data)
+            the_venue.city = form.city.data
+            the_venue.state = form.state.data
+            the_venue.phone = form.phone.data
+            the_venue.address = form.address.data
+            the_venue.website_link = form.website_link.data
+            the_venue.facebook_link = form.facebook_link.data
+            the_venue.seeking_talent = form.seeking_talent.data
+            the_venue.seeking_description = form.seeking_description.data
+            the_venue.image_link = form.image_link.data
+            db.session.commit()
+        else:
+            flash('An error occurred: Your form is invalid. Venue ' +
+                  the_venue.name + ' could not be updated.', 'error')
+            return render_template('forms/edit_venue.html', form=form, venue=venue)
+            # return redirect(url_for('.edit_venue', venue_id=venue_id))
+    except:
+        error = True
+        db.session.rollback()
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+        if error:
+            flash('An error occurred: Error during db updating. Venue could not be updated.', 'error')
+            return redirect(url_for('.venues'))
+            # abort(404)
+        else:
+            enqueue_follow_ups('venue', venue_id, form.image_link.data)
+            flash('Venue ' + form.name.data + ' was successfully updated!')
+            # return redirect(url_for('shows.shows'))
+            # return render_template('pages/home.html')
+            # return redirect(url_for('pages.index'))
+            return redirect(url_for('.show_venue', venue_id=venue_id))
+
+    # return redirect(url_for('.show_venue', venue_id=venue_id))